@@ -3,11 +3,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
-from app.database import init_db
-from app.routes import products, inventory
+from app.database import engine, init_db
+from app.routes import products, inventory, embeddings, detection_stream
+from app.services.similarity_index import save_similarity_index
+from app.services.clip_encoder import load_clip_encoder
+from app.services.object_detector import load_object_detector
+from app.services.embedding_store import start_embedding_backfill
+from app.services.roboflow_service import close_async_http_client
+from app.services.frame_scheduler import stop_frame_scheduler
+from app.services.product_search import init_product_search
+from app.services.product_fields import init_product_image_urls
 
 # Initialize database
 init_db()
+# 제품 이미지 상대 URL 컬럼 (기존 DB 컬럼 추가 + 비어 있는 제품 채우기)
+init_product_image_urls(engine)
+# 제품 전문 검색 색인 (SQLite FTS5, 트리거로 자동 동기화)
+init_product_search(engine)
 
 app = FastAPI(
     title="Q-ProcureAssistant API",
@@ -38,6 +50,25 @@ if os.path.exists(product_list_picture_path):
 # Include routers
 app.include_router(products.router)
 app.include_router(inventory.router)
+app.include_router(embeddings.router)
+app.include_router(detection_stream.router)
+
+@app.on_event("startup")
+async def startup_event():
+    # 로컬 CLIP 인코더 미리 로드 (CLIP_BACKEND=onnx)
+    load_clip_encoder()
+    # 로컬 객체 감지 모델 미리 로드 + 워밍업 (DETECT_BACKEND=onnx)
+    load_object_detector()
+    # 임베딩 없는 제품 1회 채우기 (백그라운드, 검색 경로에서는 생성하지 않음)
+    start_embedding_backfill()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 증분 갱신된 유사도 인덱스를 디스크에 저장
+    save_similarity_index()
+    # 감지 스케줄러 중지 후 Roboflow 비동기 HTTP 클라이언트 커넥션 정리
+    stop_frame_scheduler()
+    await close_async_http_client()
 
 @app.get("/")
 async def root():
@@ -1,4 +1,5 @@
 from .product import Product
 from .inventory import InventoryHistory
+from .embedding import ProductEmbedding
 
-__all__ = ["Product", "InventoryHistory"]
+__all__ = ["Product", "InventoryHistory", "ProductEmbedding"]
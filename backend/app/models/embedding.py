@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import numpy as np
+from app.database import Base
+
+class ProductEmbedding(Base):
+    """제품 이미지 CLIP 임베딩 저장 테이블 (이미지 내용 해시 기준)"""
+    __tablename__ = "product_embeddings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    qcode = Column(String, ForeignKey("products.qcode"), nullable=False, index=True)
+
+    # 임베딩 원본 이미지
+    image_path = Column(String, nullable=False)          # 임베딩 생성 당시 이미지 경로
+    image_hash = Column(String, nullable=False, index=True)  # 이미지 내용 SHA-256
+
+    # 임베딩 벡터
+    model = Column(String, nullable=False, default="roboflow-clip")  # 임베딩 생성 모델
+    dim = Column(Integer, nullable=False)                # 벡터 차원
+    vector = Column(LargeBinary, nullable=False)         # float32 바이트
+
+    # 타임스탬프
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationship
+    product = relationship("Product", back_populates="embeddings")
+
+    def to_numpy(self) -> np.ndarray:
+        return np.frombuffer(self.vector, dtype=np.float32, count=self.dim)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "qcode": self.qcode,
+            "image_path": self.image_path,
+            "image_hash": self.image_hash,
+            "model": self.model,
+            "dim": self.dim,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
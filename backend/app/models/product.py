@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -11,6 +11,25 @@ def generate_qcode():
     random_suffix = ''.join(random.choices(string.digits, k=4))
     return f"Q-{timestamp}-{random_suffix}"
 
+def to_image_url(image_path):
+    """절대 이미지 경로 -> 프론트엔드용 상대 URL (product_list_picture/..., uploads/...)"""
+    if not image_path:
+        return image_path
+
+    # Convert Windows backslashes to forward slashes
+    image_url = image_path.replace("\\", "/")
+
+    # Extract path after "product_list_picture/"
+    if "product_list_picture/" in image_url:
+        relative_path = image_url.split("product_list_picture/")[1]
+        return f"product_list_picture/{relative_path}"
+    # Extract path after "uploads/"
+    elif "uploads/" in image_url:
+        relative_path = image_url.split("uploads/")[1]
+        return f"uploads/{relative_path}"
+
+    return image_url
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -20,6 +39,7 @@ class Product(Base):
     category = Column(String, default="미분류")
     description = Column(Text)
     image_path = Column(String)
+    image_url = Column(String)  # 프론트엔드용 상대 URL (image_path 저장 시 계산)
 
     # Spec fields for text-based search
     diameter = Column(String)  # 직경
@@ -63,24 +83,11 @@ class Product(Base):
 
     # Relationships
     history = relationship("InventoryHistory", back_populates="product", cascade="all, delete-orphan")
+    embeddings = relationship("ProductEmbedding", back_populates="product", cascade="all, delete-orphan")
 
     def to_dict(self, for_api=True):
-        # Convert absolute image path to relative URL for frontend
-        image_url = self.image_path
-
-        # Only convert to relative path if this is for API response
-        if for_api and image_url:
-            # Convert Windows backslashes to forward slashes
-            image_url = image_url.replace("\\", "/")
-
-            # Extract path after "product_list_picture/"
-            if "product_list_picture/" in image_url:
-                relative_path = image_url.split("product_list_picture/")[1]
-                image_url = f"product_list_picture/{relative_path}"
-            # Extract path after "uploads/"
-            elif "uploads/" in image_url:
-                relative_path = image_url.split("uploads/")[1]
-                image_url = f"uploads/{relative_path}"
+        # API 응답은 저장된 상대 URL, 내부용은 절대 경로 (파일 접근)
+        image_url = self.image_url if for_api else self.image_path
 
         return {
             "id": self.id,
@@ -122,3 +129,9 @@ class Product(Base):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
+
+
+@event.listens_for(Product.image_path, "set")
+def _set_image_url(target, value, oldvalue, initiator):
+    """image_path가 바뀔 때 상대 URL도 한 번만 계산해서 저장"""
+    target.image_url = to_image_url(value)
@@ -0,0 +1,166 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Dict, Optional
+import asyncio
+import json
+import time
+import uuid
+
+from app.database import SessionLocal
+from app.services.detection_service import parse_qcode_filter, process_frame_async, release_camera
+from app.services.detection_response import format_detection_response, normalize_response_format
+from app.services.frame_gate import get_frame_gate_stats
+from app.services.frame_retention import get_frame_retention_stats
+from app.services.frame_scheduler import get_frame_scheduler_stats
+
+router = APIRouter(prefix="/api", tags=["detection"])
+
+
+class LatestFrame:
+    """
+    최신 프레임 1장만 보관하는 슬롯
+    - 추론 중 새 프레임이 오면 처리 대기 중이던 이전 프레임은 버림 (대기열 없음)
+    """
+
+    def __init__(self):
+        self.frame: Optional[Dict] = None
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+        self._event = asyncio.Event()
+
+    def put(self, data: bytes):
+        self.received += 1
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = {"seq": self.received, "data": data, "received_at": time.perf_counter()}
+        self._event.set()
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+    async def get(self) -> Optional[Dict]:
+        """
+        다음 처리할 프레임 (연결 종료 시 None)
+        """
+        while self.frame is None:
+            if self.closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self.frame = self.frame, None
+        return frame
+
+
+async def _process_frame(data: bytes, qcode_filter, camera_id: str) -> Dict:
+    """
+    프레임 1장 감지 + 재고 반영 (감지 API는 await, DB 작업은 스레드)
+    """
+    db = SessionLocal()
+    try:
+        return await process_frame_async(db, data, qcode_filter, camera_id)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@router.websocket("/ws/detect")
+async def detect_stream(websocket: WebSocket):
+    """
+    웹캠 프레임 스트림 감지 (WebSocket)
+
+    - 클라이언트 -> 서버: 바이너리 메시지 = JPEG 프레임 1장
+                         텍스트 메시지 = 설정 JSON (예: {"selected_qcodes": "Q1208172,Q13425723"})
+    - 서버 -> 클라이언트: 프레임마다 /api/detect-qcode와 같은 형식의 JSON
+                         + frame_seq, received_frames, dropped_frames, latency_ms
+    - 추론이 밀리면 대기 중인 프레임은 버리고 가장 최근 프레임만 처리
+    - 쿼리 파라미터 selected_qcodes로 초기 필터, camera_id로 카메라(기기) 지정
+      (없으면 연결마다 새 ID, 연결 종료 시 해당 카메라의 장면 비교/추적 상태 해제)
+    - 쿼리 파라미터 format: "full" (기본) | "compact" (JSON) | "msgpack" (바이너리 메시지)
+    """
+    try:
+        response_format = normalize_response_format(websocket.query_params.get("format"))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    print("[WS] /api/ws/detect - 스트림 연결")
+
+    state = {"qcode_filter": parse_qcode_filter(websocket.query_params.get("selected_qcodes"))}
+    camera_id = websocket.query_params.get("camera_id") or f"ws-{uuid.uuid4().hex[:8]}"
+    slot = LatestFrame()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    slot.put(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        config = json.loads(message["text"])
+                    except ValueError:
+                        continue
+                    if "selected_qcodes" in config:
+                        state["qcode_filter"] = parse_qcode_filter(config["selected_qcodes"])
+                        print(f"[WS] 선택된 제품 필터: {state['qcode_filter'] or '전체'}")
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    processed = 0
+    try:
+        while True:
+            frame = await slot.get()
+            if frame is None:
+                break
+
+            try:
+                result = await _process_frame(frame["data"], state["qcode_filter"], camera_id)
+            except Exception as e:
+                print(f"[ERROR] detect_stream: {e}")
+                result = {
+                    "success": False,
+                    "message": "제품 감지 실패",
+                    "detected_products": [],
+                    "error": str(e)
+                }
+
+            processed += 1
+            result.update({
+                "frame_seq": frame["seq"],
+                "received_frames": slot.received,
+                "processed_frames": processed,
+                "dropped_frames": slot.dropped,
+                "latency_ms": round((time.perf_counter() - frame["received_at"]) * 1000, 1)
+            })
+            payload = format_detection_response(result, response_format)
+            if response_format == "msgpack":
+                await websocket.send_bytes(payload)
+            else:
+                await websocket.send_json(payload)
+
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        release_camera(camera_id)
+        print(f"[WS] 스트림 종료 ({camera_id}): {slot.received} received, {processed} processed, {slot.dropped} dropped")
+
+
+@router.get("/detection/stats")
+async def detection_stats():
+    """
+    프레임 건너뛰기 통계 (추론한 프레임 / 장면 변화 없어 건너뛴 프레임)
+    + 프레임 보관 통계 + 다중 카메라 스케줄러 통계
+    """
+    return {
+        **get_frame_gate_stats(),
+        "retention": get_frame_retention_stats(),
+        "scheduler": get_frame_scheduler_stats()
+    }
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from app.services.query_cache import get_query_cache_stats
+from app.services.reindex_service import (
+    REINDEX_WORKERS,
+    get_reindex_status,
+    start_reindex_background
+)
+
+router = APIRouter(prefix="/api", tags=["embeddings"])
+
+@router.post("/embeddings/reindex")
+async def start_reindex(
+    workers: Optional[int] = REINDEX_WORKERS,
+    resume: bool = True
+):
+    """
+    카탈로그 임베딩 재색인 작업 시작 (백그라운드)
+
+    Args:
+        workers: 동시 임베딩 워커 수
+        resume: 이전 체크포인트 이어받기 (이미 저장된 이미지는 항상 건너뜀)
+    """
+    if workers is None or workers < 1:
+        raise HTTPException(status_code=400, detail="workers must be >= 1")
+
+    status = start_reindex_background(workers=workers, resume=resume)
+    if status is None:
+        raise HTTPException(status_code=409, detail="재색인 작업이 이미 실행 중입니다")
+
+    return {
+        "success": True,
+        "message": "재색인 작업이 백그라운드에서 시작되었습니다.",
+        "job": status
+    }
+
+@router.get("/embeddings/reindex/status")
+async def reindex_status():
+    """
+    재색인 작업 진행 상황 (처리 이미지 수, images/sec)
+    """
+    return get_reindex_status()
+
+@router.get("/embeddings/query-cache/stats")
+async def query_cache_stats():
+    """
+    쿼리 이미지 임베딩 캐시 적중/미스 통계
+    """
+    return get_query_cache_stats()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -10,6 +10,8 @@ from botocore.exceptions import ClientError
 from app.database import get_db
 from app.models.product import Product
 from app.models.inventory import InventoryHistory
+from app.services.product_fields import field_columns, parse_fields, rows_to_dicts
+from app.services.response_cache import bump_data_version, cached_json_response
 from app.services.prediction_service import (
     predict_reorder_date,
     get_all_predictions,
@@ -18,40 +20,63 @@ from app.services.prediction_service import (
 
 router = APIRouter(prefix="/api")
 
+# 재고 상태(stock_status) 계산에 필요한 컬럼
+STOCK_STATUS_FIELDS = ("current_stock", "min_stock", "reorder_point")
+
+def _stock_status(current_stock: int, min_stock: int, reorder_point: int) -> str:
+    if current_stock <= min_stock:
+        return "critical"
+    elif current_stock <= reorder_point:
+        return "warning"
+    return "safe"
+
+
+def _current_inventory(db: Session, field_names: Optional[List[str]]) -> dict:
+    # ORM 객체 대신 필요한 컬럼(+ 상태 계산용 재고 컬럼)만 행 튜플로 조회
+    rows = db.query(*field_columns(field_names, required=STOCK_STATUS_FIELDS)).all()
+    inventory = rows_to_dicts(rows, field_names)
+    include_status = field_names is None or "stock_status" in field_names
+
+    # 재고 상태 추가 + 상태별 카운트
+    status_counts = {"critical": 0, "warning": 0, "safe": 0}
+    for row, product_dict in zip(rows, inventory):
+        status = _stock_status(row.current_stock, row.min_stock, row.reorder_point)
+        status_counts[status] += 1
+        if include_status:
+            product_dict["stock_status"] = status
+
+    return {
+        "total_products": len(inventory),
+        "critical_count": status_counts["critical"],
+        "warning_count": status_counts["warning"],
+        "safe_count": status_counts["safe"],
+        "products": inventory
+    }
+
+
 @router.get("/inventory/current")
-async def get_current_inventory(db: Session = Depends(get_db)):
+async def get_current_inventory(
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """
     전체 제품의 현재 재고 현황 조회
-    """
-    try:
-        products = db.query(Product).all()
-
-        inventory = []
-        for product in products:
-            product_dict = product.to_dict()
 
-            # 재고 상태 추가
-            if product.current_stock <= product.min_stock:
-                product_dict["stock_status"] = "critical"
-            elif product.current_stock <= product.reorder_point:
-                product_dict["stock_status"] = "warning"
-            else:
-                product_dict["stock_status"] = "safe"
-
-            inventory.append(product_dict)
+    Args:
+        fields: 응답에 담을 필드 (쉼표 구분, 예: "qcode,name,current_stock,stock_status")
+                해당 컬럼(+ 상태 계산용 재고 컬럼)만 SELECT, 없으면 전체 필드
 
-        # 상태별 카운트
-        critical_count = sum(1 for p in inventory if p["stock_status"] == "critical")
-        warning_count = sum(1 for p in inventory if p["stock_status"] == "warning")
-        safe_count = sum(1 for p in inventory if p["stock_status"] == "safe")
+    제품/재고가 바뀌지 않았으면 캐시된 응답 재사용, If-None-Match가 ETag와 같으면 304
+    """
+    try:
+        field_names = parse_fields(fields, extra=("stock_status",))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return {
-            "total_products": len(inventory),
-            "critical_count": critical_count,
-            "warning_count": warning_count,
-            "safe_count": safe_count,
-            "products": inventory
-        }
+    try:
+        key = ("inventory/current", tuple(field_names) if field_names else None)
+        return cached_json_response(key, lambda: _current_inventory(db, field_names), if_none_match)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -144,6 +169,7 @@ async def get_prediction_by_qcode(qcode: str, db: Session = Depends(get_db)):
 @router.get("/inventory/alerts")
 async def get_alerts(
     selected_qcodes: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -152,6 +178,8 @@ async def get_alerts(
     Args:
         selected_qcodes: 선택된 Q-CODE 목록 (쉼표로 구분, 예: "Q1,Q2,Q3")
                         None이면 전체 제품 조회
+
+    제품/재고가 바뀌지 않았으면 캐시된 응답 재사용, If-None-Match가 ETag와 같으면 304
     """
     try:
         # 선택된 제품 목록 파싱
@@ -159,12 +187,15 @@ async def get_alerts(
         if selected_qcodes and selected_qcodes.strip():
             qcode_list = [qc.strip() for qc in selected_qcodes.split(',') if qc.strip()]
 
-        alerts = get_low_stock_alerts(db, qcode_list)
+        def build():
+            alerts = get_low_stock_alerts(db, qcode_list)
+            return {
+                "alert_count": len(alerts),
+                "alerts": alerts
+            }
 
-        return {
-            "alert_count": len(alerts),
-            "alerts": alerts
-        }
+        key = ("inventory/alerts", tuple(sorted(set(qcode_list))) if qcode_list else None)
+        return cached_json_response(key, build, if_none_match)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -207,6 +238,7 @@ async def record_inventory(
         )
         db.add(history_entry)
         db.commit()
+        bump_data_version()
 
         return {
             "success": True,
@@ -1,16 +1,30 @@
-from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile, Form, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional, List
-import shutil
 import os
 from datetime import datetime
 import json
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models.product import Product, generate_qcode
-from app.services.roboflow_service import (
-    search_similar_products_roboflow,
-    detect_products_in_frame
+from app.services.roboflow_service import search_similar_products_roboflow_async
+from app.services.embedding_store import EMBEDDING_MODEL, sync_product_embeddings
+from app.services.similarity_index import update_similarity_index, update_similarity_metadata
+from app.services.detection_service import parse_qcode_filter, process_frame_async
+from app.services.product_search import apply_product_search
+from app.services.response_cache import bump_data_version
+from app.services.product_fields import field_columns, json_response, parse_fields, rows_to_dicts
+from app.services.product_pagination import (
+    TOTAL_MODES,
+    count_products,
+    invalidate_product_totals,
+    paginate_products
+)
+from app.services.detection_response import (
+    MSGPACK_MEDIA_TYPE,
+    format_detection_response,
+    normalize_response_format
 )
 # 사용하지 않는 서비스 주석처리
 # from app.services.ai_service import (
@@ -32,6 +46,29 @@ router = APIRouter(prefix="/api", tags=["products"])
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+
+def _write_file(file_path: str, data: bytes):
+    with open(file_path, "wb") as buffer:
+        buffer.write(data)
+
+
+def _sync_embeddings_background(qcode: str):
+    """
+    제품 뷰 임베딩 생성/갱신 (응답 후 스레드풀에서 실행, 요청 세션과 별도 세션 사용)
+    실패해도 제품은 이미 저장됨 (유사도 검색 인덱스에만 빠짐, 재색인 작업에서 재시도)
+    """
+    db = SessionLocal()
+    try:
+        product = db.query(Product).filter(Product.qcode == qcode).first()
+        if product:
+            sync_product_embeddings(db, product)
+    except Exception as embed_error:
+        db.rollback()
+        print(f"[WARN] Embedding sync failed for {qcode} (non-fatal): {embed_error}")
+    finally:
+        db.close()
+
+
 @router.post("/analyze-image")
 async def analyze_image(
     file: UploadFile = File(...),
@@ -41,6 +78,9 @@ async def analyze_image(
     diameter: Optional[str] = Form(None),
     length: Optional[str] = Form(None),
     specs: Optional[str] = Form(None),
+    manufacturer: Optional[str] = Form(None),
+    sourcing_group: Optional[str] = Form(None),
+    leaf_class: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -48,6 +88,8 @@ async def analyze_image(
 
     OpenAI/Gemini 제거 - 사용자가 기본 정보 직접 입력
     Roboflow CLIP으로 기존 제품과 유사도 비교
+    category/manufacturer/sourcing_group/leaf_class 입력 시 해당 제품만 비교
+    name/material/diameter/length/specs 입력 시 텍스트 유사도와 하이브리드 랭킹
     """
     try:
         # 1. 이미지 저장
@@ -56,18 +98,27 @@ async def analyze_image(
         filename = f"product_{timestamp}{file_extension}"
         file_path = os.path.join(UPLOAD_DIR, filename)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 업로드 읽기는 await, 디스크 쓰기는 스레드에서 (이벤트 루프 차단 방지)
+        data = await file.read()
+        await run_in_threadpool(_write_file, file_path, data)
 
         print(f"[*] Image uploaded: {file_path}")
 
-        # 2. Roboflow CLIP 유사도 검색
-        existing_products = db.query(Product).all()
-        # Use for_api=False to keep absolute paths for file access
-        existing_products_dict = [p.to_dict(for_api=False) for p in existing_products]
+        # 2. Roboflow CLIP 유사도 검색 (입력된 메타데이터로 사전 필터링)
+        filters = {
+            "category": category,
+            "manufacturer": manufacturer,
+            "sourcing_group": sourcing_group,
+            "leaf_class": leaf_class
+        }
+        filters = {field: value for field, value in filters.items() if value}
+
+        query_text = " ".join(
+            value for value in [name, material, diameter, length, specs] if value
+        )
 
-        roboflow_results = search_similar_products_roboflow(
-            file_path, existing_products_dict
+        roboflow_results = await search_similar_products_roboflow_async(
+            file_path, filters=filters, query_text=query_text
         )
 
         # 3. 사용자 입력 데이터
@@ -77,7 +128,10 @@ async def analyze_image(
             "material": material,
             "diameter": diameter,
             "length": length,
-            "specs": specs
+            "specs": specs,
+            "manufacturer": manufacturer,
+            "sourcing_group": sourcing_group,
+            "leaf_class": leaf_class
         }
 
         return {
@@ -85,9 +139,10 @@ async def analyze_image(
             "image_path": file_path,
             "user_input": user_input,
             "similar_products": roboflow_results.get("similar_products", []),
-            "similarity_method": "roboflow_clip",
+            "similarity_method": "hybrid_clip_tfidf" if query_text else "roboflow_clip",
             "roboflow_success": roboflow_results["success"],
-            "roboflow_error": roboflow_results.get("error")
+            "roboflow_error": roboflow_results.get("error"),
+            "query_cache": roboflow_results.get("query_cache")
         }
 
     except Exception as e:
@@ -95,6 +150,7 @@ async def analyze_image(
 
 @router.post("/products")
 async def create_product(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     category: str = Form("미분류"),
     description: Optional[str] = Form(None),
@@ -117,6 +173,7 @@ async def create_product(
     """
     Register a new product with Q-CODE
     확장 필드: model_name, manufacturer, n2b_product_code, attributes (JSON)
+    CLIP 임베딩은 응답 후 백그라운드에서 생성 (실패해도 제품 등록은 유지)
     """
     try:
         # Generate Q-CODE
@@ -149,6 +206,11 @@ async def create_product(
         db.add(new_product)
         db.commit()
         db.refresh(new_product)
+        invalidate_product_totals()
+        bump_data_version()
+
+        # 모든 뷰 CLIP 임베딩은 응답 후 백그라운드에서 생성 (원격/로컬 CLIP 호출이 이벤트 루프를 막지 않도록)
+        background_tasks.add_task(_sync_embeddings_background, new_product.qcode)
 
         # Vision API 사용 안 함 - Roboflow로 대체
         # vision_registered = False
@@ -192,6 +254,9 @@ async def create_product(
 async def list_products(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    total: str = "cached",
+    fields: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
     manufacturer: Optional[str] = None,
@@ -204,10 +269,29 @@ async def list_products(
     Filters:
     - category: 제품 카테고리
     - search: 제품명, Q-CODE, 스펙, 모델명, 제조사, 엔투비품번, 재질 검색
+              (FTS5 전문 검색, BM25 관련도 순 정렬 / 띄어쓰기로 여러 검색어 AND)
     - manufacturer: 제조사 필터
     - sourcing_group: 표준소싱그룹 필터
+
+    Paging:
+    - cursor: 이전 응답의 next_cursor (커서 페이지, 페이지 깊이와 무관하게 일정한 속도 / 있으면 skip 무시)
+    - skip: OFFSET 페이지 (기존 방식)
+    - total: "cached" (기본, 제품 변경 시 무효화되는 캐시) | "exact" (매번 COUNT) | "none" (생략, null)
+
+    Fields:
+    - fields: 응답에 담을 필드 (쉼표 구분, 예: "qcode,name,image_path,current_stock")
+              해당 컬럼만 SELECT, 없으면 전체 필드 (to_dict)
     """
-    query = db.query(Product)
+    if total not in TOTAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported total: {total} (use one of {', '.join(TOTAL_MODES)})")
+
+    try:
+        field_names = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # ORM 객체 대신 필요한 컬럼만 행 튜플로 조회
+    query = db.query(*field_columns(field_names))
 
     if category:
         query = query.filter(Product.category == category)
@@ -218,26 +302,20 @@ async def list_products(
     if sourcing_group:
         query = query.filter(Product.sourcing_group == sourcing_group)
 
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Product.name.like(search_term)) |
-            (Product.description.like(search_term)) |
-            (Product.qcode.like(search_term)) |
-            (Product.material.like(search_term)) |
-            (Product.specs.like(search_term)) |
-            (Product.model_name.like(search_term)) |
-            (Product.manufacturer.like(search_term)) |
-            (Product.standard_name.like(search_term)) |
-            (Product.n2b_product_code.like(search_term))
-        )
+    query, rank = apply_product_search(query, search)
+
+    try:
+        products, next_cursor = paginate_products(query, limit, cursor=cursor, skip=skip, rank=rank)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    products = query.offset(skip).limit(limit).all()
+    filter_key = (category, manufacturer, sourcing_group, " ".join(search.split()) if search else None)
 
-    return {
-        "total": query.count(),
-        "products": [p.to_dict() for p in products]
-    }
+    return json_response({
+        "total": count_products(query, filter_key, total),
+        "products": rows_to_dicts(products, field_names),
+        "next_cursor": next_cursor
+    })
 
 @router.get("/products/{qcode}")
 async def get_product(qcode: str, db: Session = Depends(get_db)):
@@ -254,6 +332,7 @@ async def get_product(qcode: str, db: Session = Depends(get_db)):
 @router.put("/products/{qcode}")
 async def update_product(
     qcode: str,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = Form(None),
     category: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
@@ -262,10 +341,12 @@ async def update_product(
     material: Optional[str] = Form(None),
     specs: Optional[str] = Form(None),
     last_price: Optional[float] = Form(None),
+    image_path: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     """
     Update an existing product
+    image_path 변경 시 저장된 CLIP 임베딩도 갱신 (응답 후 백그라운드)
     """
     product = db.query(Product).filter(Product.qcode == qcode).first()
 
@@ -289,8 +370,19 @@ async def update_product(
     if last_price is not None:
         product.last_price = last_price
 
+    image_changed = image_path is not None and image_path != product.image_path
+    if image_changed:
+        product.image_path = image_path
+
     db.commit()
     db.refresh(product)
+    invalidate_product_totals()
+    bump_data_version()
+    update_similarity_metadata(product)
+
+    if image_changed:
+        # 임베딩 갱신은 응답 후 백그라운드에서
+        background_tasks.add_task(_sync_embeddings_background, product.qcode)
 
     return product.to_dict()
 
@@ -306,6 +398,11 @@ async def delete_product(qcode: str, db: Session = Depends(get_db)):
 
     db.delete(product)
     db.commit()
+    invalidate_product_totals()
+    bump_data_version()
+
+    # 유사도 인덱스에서 제거 (증분 갱신)
+    update_similarity_index(db, qcode, None, EMBEDDING_MODEL)
 
     return {"message": "제품이 삭제되었습니다", "qcode": qcode}
 
@@ -348,8 +445,12 @@ async def delete_product(qcode: str, db: Session = Depends(get_db)):
 
 @router.post("/detect-qcode")
 async def detect_qcode(
+    request: Request,
     file: UploadFile = File(...),
     selected_qcodes: Optional[str] = Form(None),  # 쉼표로 구분된 Q-CODE 목록
+    camera_id: Optional[str] = Form(None),
+    response_format: Optional[str] = Form(None, alias="format"),
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -360,111 +461,40 @@ async def detect_qcode(
         file: 웹캠 프레임 이미지
         selected_qcodes: 감지할 제품 Q-CODE 목록 (쉼표 구분, 예: "Q1208172,Q13425723")
                         None이면 전체 제품 감지
+        camera_id: 카메라(기기) 식별자 (카메라별 장면 비교/추적 후 수량이 안정될 때만 재고 반영)
+                   없으면 클라이언트 주소별로 구분 ("http-<host>")
+        format: 응답 형식 "full" (기본) | "compact" | "msgpack"
+                (Accept: application/msgpack 헤더로도 msgpack 요청 가능)
     """
     print("\n" + "="*80)
     print("[API CALL] /api/detect-qcode - 웹캠 프레임 수신")
 
+    try:
+        response_format = normalize_response_format(response_format, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not camera_id:
+        camera_id = f"http-{request.client.host}" if request.client else "http"
+
     # 선택된 제품 목록 파싱
-    qcode_filter = None
-    if selected_qcodes and selected_qcodes.strip():
-        qcode_filter = set(qc.strip() for qc in selected_qcodes.split(',') if qc.strip())
+    qcode_filter = parse_qcode_filter(selected_qcodes)
+    if qcode_filter:
         print(f"[*] 선택된 제품 필터: {qcode_filter}")
     else:
         print("[*] 전체 제품 감지 모드")
     print("="*80)
 
     try:
-        # 1. 웹캠 프레임 저장
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"webcam_{timestamp}.jpg"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        print(f"[*] Webcam frame saved: {file_path}")
-
-        # 2. Roboflow Object Detection으로 제품 감지
-        detection_result = detect_products_in_frame(file_path)
-
-        if not detection_result["success"]:
-            return {
-                "success": False,
-                "message": "제품 감지 실패",
-                "detected_products": [],
-                "error": detection_result.get("error")
-            }
-
-        if not detection_result.get("detected_products"):
-            return {
-                "success": True,
-                "message": "감지된 제품 없음",
-                "detected_products": [],
-                "total_count": 0
-            }
-
-        # 3. 재고 업데이트 및 이력 기록
-        from app.models.inventory import InventoryHistory
-        detected_products_info = []
-
-        for detected in detection_result["detected_products"]:
-            qcode = detected["qcode"]
-            count = detected["count"]
-            confidence = detected["confidence"]
-
-            # 선택된 제품 필터링
-            if qcode_filter and qcode not in qcode_filter:
-                print(f"[SKIP] {qcode} - 선택된 제품이 아님")
-                continue
-
-            # 해당 Q-CODE의 제품 조회
-            product = db.query(Product).filter(Product.qcode == qcode).first()
-
-            if product:
-                # 이전 재고 수량
-                previous_stock = product.current_stock
-
-                # 현재 재고 업데이트
-                product.current_stock = count
-
-                # 재고 변화량 계산
-                quantity_change = count - previous_stock
-
-                # 재고 이력 기록
-                history_entry = InventoryHistory(
-                    qcode=qcode,
-                    quantity=count,
-                    quantity_change=quantity_change,
-                    detection_confidence=confidence,
-                    detection_method="roboflow_object_detection",
-                    frame_path=file_path,
-                    timestamp=datetime.utcnow()
-                )
-                db.add(history_entry)
-
-                # 감지된 제품 정보 추가
-                product_info = product.to_dict()
-                product_info["detected_count"] = count
-                product_info["confidence"] = confidence
-                product_info["quantity_change"] = quantity_change
-                detected_products_info.append(product_info)
-
-                print(f"[OK] {qcode}: {count} items detected (change: {quantity_change:+d})")
-            else:
-                print(f"[WARN] Detected Q-CODE {qcode} not found in database")
-
-        # DB 커밋
-        db.commit()
-
-        return {
-            "success": True,
-            "message": f"{len(detected_products_info)}개 제품 감지됨",
-            "detected_products": detected_products_info,
-            "total_count": detection_result["total_count"],
-            "detection_method": "roboflow_yolov8",
-            "frame_path": file_path,
-            "raw_predictions": detection_result.get("raw_predictions", [])  # 바운딩 박스 정보 추가
-        }
+        # 장면 변화 확인 -> 메모리에서 감지 (await) -> 추적 후 재고 업데이트 및 이력 기록
+        data = await file.read()
+        result = await process_frame_async(db, data, qcode_filter, camera_id)
+
+        # compact/msgpack: 변화 정보 + 열 단위 박스 배열만 전송
+        body = format_detection_response(result, response_format)
+        if response_format == "msgpack":
+            return Response(content=body, media_type=MSGPACK_MEDIA_TYPE)
+        return body
 
     except Exception as e:
         db.rollback()
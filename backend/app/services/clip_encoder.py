@@ -0,0 +1,143 @@
+"""
+로컬 CPU CLIP 이미지 인코더 (ONNX Runtime)
+- Roboflow CLIP API 대신 로컬에서 임베딩 생성 (네트워크 지연/외부 의존성 제거)
+- 여러 이미지를 한 번의 forward pass로 배치 인코딩
+- 서버 시작 시 1회 로드 후 재사용
+
+설정 (.env):
+- CLIP_BACKEND: "roboflow" (기본) | "onnx"
+- CLIP_ONNX_MODEL_PATH: ONNX 모델 경로 (기본 models/clip_vision.onnx, export_clip_onnx.py로 생성)
+- CLIP_BATCH_SIZE: 배치 인코딩 크기 (기본 16)
+- CLIP_NUM_THREADS: ONNX Runtime intra-op 스레드 수 (기본 0 = 자동)
+"""
+import os
+import threading
+import numpy as np
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CLIP_BACKEND = os.getenv("CLIP_BACKEND", "roboflow").lower()
+CLIP_ONNX_MODEL_PATH = os.getenv("CLIP_ONNX_MODEL_PATH", os.path.join("models", "clip_vision.onnx"))
+CLIP_BATCH_SIZE = int(os.getenv("CLIP_BATCH_SIZE", "16"))
+CLIP_NUM_THREADS = int(os.getenv("CLIP_NUM_THREADS", "0"))
+
+# CLIP 전처리 상수 (OpenAI CLIP 정규화 값)
+CLIP_INPUT_SIZE = 224
+CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+
+def get_embedding_model_name() -> str:
+    """
+    현재 설정된 임베딩 모델 이름 (모델이 다르면 임베딩 공간이 달라 저장소에서 구분)
+    """
+    if CLIP_BACKEND == "onnx":
+        model_name = os.path.splitext(os.path.basename(CLIP_ONNX_MODEL_PATH))[0]
+        return f"onnx-clip:{model_name}"
+    return "roboflow-clip"
+
+
+def preprocess_clip_image(image_path: str, size: int = CLIP_INPUT_SIZE) -> np.ndarray:
+    """
+    CLIP 입력 전처리: 짧은 변 기준 리사이즈 -> 중앙 크롭 -> 정규화 (CHW float32)
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        width, height = image.size
+        scale = size / min(width, height)
+        image = image.resize(
+            (max(size, round(width * scale)), max(size, round(height * scale))),
+            Image.BICUBIC
+        )
+        width, height = image.size
+        left = (width - size) // 2
+        top = (height - size) // 2
+        image = image.crop((left, top, left + size, top + size))
+        pixels = np.asarray(image, dtype=np.float32) / 255.0
+
+    pixels = (pixels - CLIP_MEAN) / CLIP_STD
+    return pixels.transpose(2, 0, 1)
+
+
+class OnnxClipEncoder:
+    """
+    ONNX Runtime CPU 기반 CLIP 이미지 인코더
+    """
+
+    def __init__(self, model_path: str = CLIP_ONNX_MODEL_PATH, batch_size: int = CLIP_BATCH_SIZE):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise Exception("onnxruntime is not installed. Run: pip install onnxruntime")
+
+        if not os.path.exists(model_path):
+            raise Exception(f"CLIP ONNX model not found: {model_path} (run export_clip_onnx.py)")
+
+        options = ort.SessionOptions()
+        if CLIP_NUM_THREADS > 0:
+            options.intra_op_num_threads = CLIP_NUM_THREADS
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # 입력 크기 (모델에 고정되어 있으면 그 값 사용)
+        self.input_size = model_input.shape[-1] if isinstance(model_input.shape[-1], int) else CLIP_INPUT_SIZE
+        # 배치 차원이 1로 고정된 모델이면 1장씩 처리
+        self.batch_size = 1 if model_input.shape[0] == 1 else max(1, batch_size)
+
+        output_names = [output.name for output in self.session.get_outputs()]
+        self.output_name = "image_embeds" if "image_embeds" in output_names else output_names[0]
+
+        self.model_path = model_path
+        print(f"[*] CLIP ONNX encoder loaded: {model_path} (batch: {self.batch_size}, input: {self.input_size})")
+
+    def encode(self, image_paths: List[str]) -> np.ndarray:
+        """
+        이미지 여러 장을 배치로 인코딩
+
+        Args:
+            image_paths: 이미지 파일 경로 목록
+
+        Returns:
+            numpy array: (N, D) CLIP 임베딩
+        """
+        embeddings = []
+        for start in range(0, len(image_paths), self.batch_size):
+            batch_paths = image_paths[start:start + self.batch_size]
+            batch = np.stack([preprocess_clip_image(path, self.input_size) for path in batch_paths])
+            output = self.session.run([self.output_name], {self.input_name: batch})[0]
+            embeddings.append(np.asarray(output, dtype=np.float32).reshape(len(batch_paths), -1))
+        return np.vstack(embeddings)
+
+
+_encoder: Optional[OnnxClipEncoder] = None
+_encoder_lock = threading.Lock()
+
+
+def get_clip_encoder() -> OnnxClipEncoder:
+    """
+    전역 로컬 인코더 조회 (최초 1회 로드)
+    """
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = OnnxClipEncoder()
+        return _encoder
+
+
+def load_clip_encoder():
+    """
+    서버 시작 시 로컬 인코더 미리 로드 (CLIP_BACKEND=onnx일 때만)
+    """
+    if CLIP_BACKEND != "onnx":
+        return
+    try:
+        get_clip_encoder()
+    except Exception as e:
+        print(f"[WARN] CLIP ONNX encoder not loaded: {e}")
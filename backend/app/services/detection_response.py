@@ -0,0 +1,111 @@
+"""
+감지 응답 형식 변환
+- full (기본): 제품 전체 정보(to_dict) + raw_predictions (기존 형식)
+- compact: 제품은 변화 정보만 (qcode, count, change, stock), 박스는 열 단위 숫자 배열 (struct-of-arrays)
+- msgpack: compact를 MessagePack 바이너리로 인코딩 (msgpack 패키지 필요)
+
+compact 형식:
+{
+    "success": true,
+    "message": "...",
+    "total_count": 5,
+    "stock_updates": 1,
+    "frame_skipped": false,
+    "products": {"qcode": [...], "count": [...], "detected": [...], "change": [...], "stock": [...], "committed": [...]},
+    "boxes": {"x": [...], "y": [...], "w": [...], "h": [...], "confidence": [...], "class_id": [...]},
+    "classes": ["Egg", ...]
+}
+- count: 평활화 수량, detected: 이번 프레임 감지 수량, change: 이번 프레임에 반영된 재고 변화량, stock: 반영 후 현재 재고
+- 박스 좌표는 정수 픽셀(중심 x/y + 너비/높이), confidence는 소수 3자리, 클래스는 classes 목록 번호
+"""
+from typing import Dict, Optional
+
+RESPONSE_FORMATS = ("full", "compact", "msgpack")
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# 응답에 그대로 싣는 프레임 단위 필드
+FRAME_FIELDS = (
+    "success", "message", "error", "total_count", "stock_updates",
+    "frame_skipped", "frame_dropped", "frame_path",
+    # WebSocket 스트림 필드
+    "frame_seq", "received_frames", "processed_frames", "dropped_frames", "latency_ms",
+)
+
+
+def normalize_response_format(response_format: Optional[str], accept: Optional[str] = None) -> str:
+    """
+    요청한 응답 형식 확인 (format 파라미터 우선, 없으면 Accept 헤더)
+
+    Raises:
+        ValueError: 지원하지 않는 형식
+    """
+    if response_format:
+        response_format = response_format.strip().lower()
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"Unsupported format: {response_format} (use one of {', '.join(RESPONSE_FORMATS)})")
+        return response_format
+    if accept and MSGPACK_MEDIA_TYPE in accept:
+        return "msgpack"
+    return "full"
+
+
+def to_compact(result: Dict) -> Dict:
+    """
+    detect-qcode 응답(full)을 compact 형식으로 변환
+    """
+    compact = {field: result[field] for field in FRAME_FIELDS if result.get(field) is not None}
+
+    products = result.get("detected_products", [])
+    compact["products"] = {
+        "qcode": [p["qcode"] for p in products],
+        "count": [p.get("smoothed_count", p.get("detected_count", 0)) for p in products],
+        "detected": [p.get("detected_count", 0) for p in products],
+        "change": [p.get("quantity_change", 0) for p in products],
+        "stock": [p.get("current_stock") for p in products],
+        "committed": [bool(p.get("stock_committed")) for p in products],
+    }
+
+    predictions = result.get("raw_predictions", [])
+    classes = []
+    class_ids = {}
+    boxes = {"x": [], "y": [], "w": [], "h": [], "confidence": [], "class_id": []}
+    for prediction in predictions:
+        class_name = prediction.get("class", "unknown")
+        if class_name not in class_ids:
+            class_ids[class_name] = len(classes)
+            classes.append(class_name)
+        boxes["x"].append(round(prediction.get("x") or 0))
+        boxes["y"].append(round(prediction.get("y") or 0))
+        boxes["w"].append(round(prediction.get("width") or 0))
+        boxes["h"].append(round(prediction.get("height") or 0))
+        boxes["confidence"].append(round(float(prediction.get("confidence", 0.0)), 3))
+        boxes["class_id"].append(class_ids[class_name])
+    compact["boxes"] = boxes
+    compact["classes"] = classes
+    return compact
+
+
+def encode_msgpack(payload: Dict) -> bytes:
+    """
+    MessagePack 인코딩 (msgpack 패키지 필요)
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise Exception("msgpack is not installed. Run: pip install msgpack")
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def format_detection_response(result: Dict, response_format: str):
+    """
+    응답 형식에 맞게 변환
+
+    Returns:
+        full/compact: dict (JSON 응답), msgpack: bytes
+    """
+    if response_format == "full":
+        return result
+    compact = to_compact(result)
+    if response_format == "msgpack":
+        return encode_msgpack(compact)
+    return compact
@@ -0,0 +1,322 @@
+"""
+웹캠 프레임 감지 결과 처리
+- 프레임은 메모리에서 감지하고, 보관 정책에 해당하는 프레임만 저장 (frame_retention)
+- 장면이 바뀌지 않은 프레임은 추론 없이 이전 결과 재사용 (frame_gate)
+- 카메라별 추적으로 수량을 평활화하고, 안정된 수량 변화만 재고/이력에 반영 (stock_tracker)
+- DB 작업은 프레임당 제품 수와 무관하게 고정: IN 조회 1회 + 재고 일괄 UPDATE + 이력 일괄 INSERT
+- API 응답 형식으로 변환
+- /api/detect-qcode (HTTP)와 /api/ws/detect (WebSocket 스트림)가 공유
+  (async 라우트는 process_frame_async: 감지 API 호출은 await, 서명 계산/DB 작업은 스레드)
+- async 경로의 감지는 다중 카메라 스케줄러를 거침 (카메라별 처리율 상한 + 카메라 간 배치, frame_scheduler)
+- 카메라(기기/연결)별 상태는 WebSocket 종료 시 또는 일정 시간 프레임이 없으면 해제
+
+설정 (.env):
+- DETECT_CAMERA_IDLE_TIMEOUT: 프레임이 없는 카메라 상태를 해제할 시간(초) (기본 600)
+"""
+import os
+import time
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set
+from dotenv import load_dotenv
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.inventory import InventoryHistory
+from app.services.object_detector import DETECT_BACKEND
+from app.services.roboflow_service import detect_products_in_frame
+from app.services.frame_scheduler import release_scheduled_camera, schedule_detection
+from app.services.frame_gate import compute_frame_signature, forget_source, lookup_cached_result, store_result
+from app.services.frame_retention import FrameHandle
+from app.services.response_cache import bump_data_version
+from app.services.stock_tracker import reset_camera_tracker, update_camera_tracker
+
+load_dotenv()
+
+DETECT_CAMERA_IDLE_TIMEOUT = float(os.getenv("DETECT_CAMERA_IDLE_TIMEOUT", "600"))
+
+# 감지 방식 기록값 (실제 사용 중인 감지 백엔드 기준: roboflow | onnx)
+_DETECT_SOURCE = "onnx" if DETECT_BACKEND == "onnx" else "roboflow"
+HISTORY_DETECTION_METHOD = f"{_DETECT_SOURCE}_object_detection"
+RESPONSE_DETECTION_METHOD = f"{_DETECT_SOURCE}_yolov8"
+
+_camera_seen: Dict[str, float] = {}
+_camera_lock = threading.Lock()
+
+
+def parse_qcode_filter(selected_qcodes: Optional[str]) -> Optional[Set[str]]:
+    """
+    쉼표로 구분된 Q-CODE 목록 파싱 (비어 있으면 None = 전체 제품)
+    """
+    if selected_qcodes and selected_qcodes.strip():
+        return set(qc.strip() for qc in selected_qcodes.split(',') if qc.strip())
+    return None
+
+
+def record_detection_result(
+    db: Session,
+    detection_result: Dict,
+    qcode_filter: Optional[Set[str]] = None,
+    frame: Optional[FrameHandle] = None,
+    camera_id: str = "default"
+) -> Dict:
+    """
+    감지 결과를 카메라 추적기에 반영하고, 수량이 안정된 제품만 재고/이력에 기록
+
+    Args:
+        db: 데이터베이스 세션
+        detection_result: detect_products_in_frame() 결과
+        qcode_filter: 반영할 Q-CODE 집합 (None이면 전체)
+        frame: 감지한 프레임 (재고 반영 시 보관 정책에 따라 저장)
+        camera_id: 카메라 식별자 (추적 상태 구분)
+
+    Returns:
+        /api/detect-qcode 응답 형식
+    """
+    if not detection_result["success"]:
+        return {
+            "success": False,
+            "message": "제품 감지 실패",
+            "detected_products": [],
+            "error": detection_result.get("error")
+        }
+
+    # 프레임 간 추적 + 수량 평활화 (감지가 없는 프레임도 반영해야 0개로 수렴)
+    tracked = update_camera_tracker(camera_id, detection_result.get("detected_products", []))
+
+    # 선택된 제품 필터링
+    selected = []
+    for item in tracked:
+        if qcode_filter and item["qcode"] not in qcode_filter:
+            if item["raw_count"]:
+                print(f"[SKIP] {item['qcode']} - 선택된 제품이 아님")
+            continue
+        selected.append(item)
+
+    # 감지/추적 중인 Q-CODE 제품을 한 번에 조회
+    qcodes = [item["qcode"] for item in selected]
+    products = {
+        product.qcode: product
+        for product in db.query(Product).filter(Product.qcode.in_(qcodes)).all()
+    } if qcodes else {}
+
+    detected_products_info = []
+    stock_rows = []
+    history_rows = []
+    now = datetime.utcnow()
+
+    for item in selected:
+        qcode = item["qcode"]
+        product = products.get(qcode)
+
+        if not product:
+            if item["raw_count"]:
+                print(f"[WARN] Detected Q-CODE {qcode} not found in database")
+            continue
+
+        count = item["smoothed_count"]
+        confidence = item["confidence"]
+        previous_stock = product.current_stock
+        quantity_change = 0
+        committed = False
+
+        # 평활화 수량이 N 프레임 연속 유지되고 현재 재고와 다를 때만 반영
+        if item["stable"] and count != previous_stock:
+            # 재고 변화량 계산
+            quantity_change = count - (previous_stock or 0)
+
+            # 현재 재고 / 재고 이력 (아래에서 일괄 실행, on_change 정책이면 이 프레임을 보관)
+            stock_rows.append({"id": product.id, "current_stock": count, "updated_at": now})
+            history_rows.append({
+                "qcode": qcode,
+                "quantity": count,
+                "quantity_change": quantity_change,
+                "detection_confidence": confidence,
+                "detection_method": HISTORY_DETECTION_METHOD,
+                "frame_path": frame.keep_on_stock_change() if frame else None,
+                "timestamp": now
+            })
+            committed = True
+
+            print(f"[OK] {qcode}: stock {previous_stock} -> {count} (change: {quantity_change:+d}, "
+                  f"stable {item['stable_frames']} frames)")
+
+        if not item["raw_count"] and not committed:
+            continue
+
+        # 감지된 제품 정보 추가 (커밋 후 만료된 객체를 다시 읽지 않도록 미리 변환)
+        product_info = product.to_dict()
+        if committed:
+            product_info["current_stock"] = count
+            product_info["updated_at"] = now.isoformat()
+        product_info["detected_count"] = item["raw_count"]
+        product_info["smoothed_count"] = count
+        product_info["stable_frames"] = item["stable_frames"]
+        product_info["stock_committed"] = committed
+        product_info["confidence"] = confidence
+        product_info["quantity_change"] = quantity_change
+        detected_products_info.append(product_info)
+
+    # 재고가 바뀐 경우에만 일괄 UPDATE/INSERT 후 DB 커밋
+    stock_updates = len(stock_rows)
+    if stock_updates:
+        db.execute(update(Product), stock_rows)
+        db.execute(insert(InventoryHistory), history_rows)
+        db.commit()
+        bump_data_version()
+
+    if not detected_products_info:
+        return {
+            "success": True,
+            "message": "감지된 제품 없음",
+            "detected_products": [],
+            "total_count": 0,
+            "stock_updates": 0
+        }
+
+    return {
+        "success": True,
+        "message": f"{len(detected_products_info)}개 제품 감지됨",
+        "detected_products": detected_products_info,
+        "total_count": detection_result["total_count"],
+        "stock_updates": stock_updates,
+        "detection_method": RESPONSE_DETECTION_METHOD,
+        "frame_path": frame.path if frame else None,
+        "raw_predictions": detection_result.get("raw_predictions", [])  # 바운딩 박스 정보 추가
+    }
+
+
+def release_camera(camera_id: str):
+    """
+    카메라 상태 해제 (장면 비교용 마지막 프레임 + 추적/재고 안정화 상태 + 스케줄러 대기열)
+    WebSocket 연결 종료 시 호출
+    """
+    with _camera_lock:
+        _camera_seen.pop(camera_id, None)
+    forget_source(camera_id)
+    reset_camera_tracker(camera_id)
+    release_scheduled_camera(camera_id)
+
+
+def _touch_camera(camera_id: str):
+    """
+    카메라 마지막 프레임 시각 갱신 + 오래 프레임이 없는 카메라 상태 해제 (HTTP 클라이언트는 종료 신호가 없음)
+    """
+    now = time.monotonic()
+    with _camera_lock:
+        _camera_seen[camera_id] = now
+        idle = [
+            camera for camera, seen in _camera_seen.items()
+            if now - seen > DETECT_CAMERA_IDLE_TIMEOUT
+        ]
+    for camera in idle:
+        print(f"[*] Releasing idle camera state: {camera}")
+        release_camera(camera)
+
+
+def _check_frame_gate(data: bytes, camera_id: str):
+    """
+    프레임 서명 계산 후 장면 변화 확인
+
+    Returns:
+        (FrameHandle, 서명, 장면이 그대로면 이전 감지 결과 아니면 None)
+    """
+    _touch_camera(camera_id)
+    try:
+        signature = compute_frame_signature(data)
+    except Exception as e:
+        print(f"[WARN] Frame signature failed, running detection: {e}")
+        signature = None
+
+    frame = FrameHandle(data, camera_id)
+    cached = lookup_cached_result(camera_id, signature)
+    if cached is not None:
+        print(f"[SKIP] {camera_id}: 장면 변화 없음, 이전 감지 결과 재사용")
+    elif frame.keep_on_arrival():
+        # all / sampled 정책이면 추론 전에 저장
+        print(f"[*] Webcam frame retained: {frame.path}")
+    return frame, signature, cached
+
+
+def _record_frame(
+    db: Session,
+    detection_result: Dict,
+    signature: Optional[Dict],
+    frame: FrameHandle,
+    qcode_filter: Optional[Set[str]],
+    camera_id: str
+) -> Dict:
+    """
+    새로 추론한 감지 결과를 장면 비교용으로 저장하고 추적/재고 반영
+    """
+    # 감지 실패한 프레임은 다음 프레임에서 다시 추론
+    store_result(camera_id, signature if detection_result["success"] else None, detection_result)
+
+    # 추적 + 재고 업데이트 및 이력 기록
+    result = record_detection_result(db, detection_result, qcode_filter, frame, camera_id)
+    return {**result, "frame_skipped": False}
+
+
+def process_frame(
+    db: Session,
+    data: bytes,
+    qcode_filter: Optional[Set[str]] = None,
+    camera_id: str = "default"
+) -> Dict:
+    """
+    웹캠 프레임 1장 처리: 장면 변화 확인 -> 메모리에서 감지 -> 추적/재고 반영
+    (프레임은 보관 정책에 해당할 때만 디스크에 저장)
+
+    Args:
+        db: 데이터베이스 세션
+        data: 프레임 이미지 바이트
+        qcode_filter: 반영할 Q-CODE 집합 (None이면 전체)
+        camera_id: 카메라 식별자 (장면 비교/추적 상태 구분)
+
+    Returns:
+        /api/detect-qcode 응답 형식 + frame_skipped
+    """
+    frame, signature, cached = _check_frame_gate(data, camera_id)
+
+    # 장면이 그대로면 추론 없이 이전 감지 결과 사용 (추적기에는 그대로 반영해 수량 안정화 진행)
+    if cached is not None:
+        result = record_detection_result(db, cached, qcode_filter, frame, camera_id)
+        return {**result, "frame_skipped": True}
+
+    # 메모리의 프레임 바이트로 제품 감지 (디스크 쓰기 없음)
+    detection_result = detect_products_in_frame(data)
+    return _record_frame(db, detection_result, signature, frame, qcode_filter, camera_id)
+
+
+async def process_frame_async(
+    db: Session,
+    data: bytes,
+    qcode_filter: Optional[Set[str]] = None,
+    camera_id: str = "default"
+) -> Dict:
+    """
+    process_frame()의 비동기 버전 (감지 API 응답을 기다리는 동안 이벤트 루프를 막지 않음)
+    감지는 스케줄러 대기열에서 차례를 기다렸다가 다른 카메라 프레임과 함께 배치로 실행
+    """
+    frame, signature, cached = await asyncio.to_thread(_check_frame_gate, data, camera_id)
+
+    if cached is not None:
+        result = await asyncio.to_thread(record_detection_result, db, cached, qcode_filter, frame, camera_id)
+        return {**result, "frame_skipped": True}
+
+    detection_result = await schedule_detection(camera_id, data)
+    if detection_result.get("dropped"):
+        # 같은 카메라의 더 최신 프레임으로 교체됨 (추적/재고 반영 없음)
+        return {
+            "success": False,
+            "message": "프레임 건너뜀 (더 최신 프레임 처리)",
+            "detected_products": [],
+            "error": detection_result.get("error"),
+            "frame_skipped": False,
+            "frame_dropped": True
+        }
+    return await asyncio.to_thread(
+        _record_frame, db, detection_result, signature, frame, qcode_filter, camera_id
+    )
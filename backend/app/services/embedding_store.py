@@ -0,0 +1,283 @@
+"""
+제품 이미지 임베딩 저장소
+- 이미지 내용(SHA-256) 기준으로 CLIP 임베딩을 DB에 영구 저장
+- 제품 등록 시 1회 생성, image_path 변경 시 무효화
+- Q-CODE 폴더(product_list_picture/<qcode>/)의 모든 뷰 이미지를 함께 저장 (멀티뷰)
+- 유사도 검색 시에는 저장된 임베딩만 사용 (쿼리 이미지 1회만 원격 호출)
+- 임베딩이 없는 제품은 서버 시작 시 백그라운드에서 1회 채움 (검색 경로에서는 생성하지 않음)
+"""
+import os
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.product import Product
+from app.models.embedding import ProductEmbedding
+from app.services.clip_encoder import get_embedding_model_name
+from app.services.roboflow_service import get_clip_embeddings, get_clip_batch_size
+from app.services.similarity_index import get_similarity_index, product_metadata, update_similarity_index
+
+# 임베딩 생성 모델 이름 (다른 모델의 임베딩과 섞이지 않도록 구분)
+EMBEDDING_MODEL = get_embedding_model_name()
+
+# 제품당 저장할 최대 뷰 이미지 수
+MAX_VIEWS_PER_PRODUCT = int(os.getenv("MAX_VIEWS_PER_PRODUCT", "32"))
+
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif"]
+
+# 백필을 시도한 (qcode, image_path) - 이미지가 없거나 임베딩에 실패한 제품을 매번 다시 시도하지 않음
+_backfill_attempted: Set[Tuple[str, str]] = set()
+_backfill_lock = threading.Lock()
+
+
+def list_view_images(directory: str) -> List[str]:
+    """
+    폴더 내 제품 뷰 이미지 목록 (origin 원본 제외, 파일명 순)
+    """
+    images = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        if "origin" in name.lower():
+            continue
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+            images.append(path.replace("\\", "/"))
+    return images
+
+
+def list_product_views(product: Product) -> List[str]:
+    """
+    제품의 임베딩 대상 이미지 목록
+    - 대표 이미지(image_path)는 항상 첫 번째
+    - 대표 이미지가 Q-CODE 폴더 안에 있으면 같은 폴더의 다른 뷰도 포함
+    """
+    if not product.image_path or not os.path.exists(product.image_path):
+        return []
+
+    views = [product.image_path]
+    directory = os.path.dirname(product.image_path)
+    if os.path.basename(directory) == product.qcode:
+        representative = os.path.normpath(product.image_path)
+        for path in list_view_images(directory):
+            if os.path.normpath(path) != representative:
+                views.append(path)
+
+    return views[:MAX_VIEWS_PER_PRODUCT]
+
+
+def compute_image_hash(image_path: str) -> str:
+    """
+    이미지 파일 내용의 SHA-256 해시 계산
+    """
+    sha256 = hashlib.sha256()
+    with open(image_path, "rb") as image_file:
+        for chunk in iter(lambda: image_file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _find_vectors_by_hash(db: Session, image_hashes: List[str]) -> Dict[str, np.ndarray]:
+    """
+    같은 내용의 이미지로 이미 생성된 임베딩이 있으면 재사용
+    """
+    rows = db.query(ProductEmbedding)\
+        .filter(ProductEmbedding.image_hash.in_(image_hashes))\
+        .filter(ProductEmbedding.model == EMBEDDING_MODEL)\
+        .all()
+    return {row.image_hash: row.to_numpy() for row in rows}
+
+
+def _embed_images(image_paths: List[str]) -> Dict[str, np.ndarray]:
+    """
+    이미지 임베딩을 배치 단위로 생성 (실패한 배치는 건너뜀)
+
+    Returns:
+        {image_path: 임베딩 벡터}
+    """
+    vectors = {}
+    batch_size = get_clip_batch_size()
+    last_error = None
+    for start in range(0, len(image_paths), batch_size):
+        batch = image_paths[start:start + batch_size]
+        try:
+            for path, vector in zip(batch, get_clip_embeddings(batch)):
+                vectors[path] = vector
+        except Exception as e:
+            last_error = e
+            print(f"    [WARN] Embedding {len(batch)} image(s) failed: {e}")
+
+    if last_error is not None and not vectors:
+        raise last_error
+    return vectors
+
+
+def new_embedding_row(qcode: str, image_path: str, image_hash: str, vector: np.ndarray) -> ProductEmbedding:
+    """
+    현재 모델 기준 임베딩 행 생성 (db.add는 호출자 책임)
+    """
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return ProductEmbedding(
+        qcode=qcode,
+        image_path=image_path,
+        image_hash=image_hash,
+        model=EMBEDDING_MODEL,
+        dim=int(vector.shape[0]),
+        vector=vector.tobytes()
+    )
+
+
+def get_or_create_embeddings(db: Session, qcode: str, image_paths: List[str],
+                             embed_missing: bool = True) -> List[ProductEmbedding]:
+    """
+    제품 이미지 임베딩 조회, 없는 이미지만 배치로 생성 후 저장 (commit은 호출자 책임)
+
+    Args:
+        db: 데이터베이스 세션
+        qcode: 제품 Q-CODE
+        image_paths: 제품 이미지 경로 목록
+        embed_missing: False면 저장소에 없는 이미지는 새로 생성하지 않고 제외
+
+    Returns:
+        ProductEmbedding 목록 (image_paths 순서, 생성 실패한 이미지는 제외)
+    """
+    hashes = {path: compute_image_hash(path) for path in image_paths}
+
+    existing = db.query(ProductEmbedding)\
+        .filter(ProductEmbedding.qcode == qcode)\
+        .filter(ProductEmbedding.image_hash.in_(list(hashes.values())))\
+        .filter(ProductEmbedding.model == EMBEDDING_MODEL)\
+        .all()
+    by_hash = {row.image_hash: row for row in existing}
+
+    # 동일 이미지 내용의 임베딩이 있으면 원격 호출 없이 재사용
+    missing = [path for path in image_paths if hashes[path] not in by_hash]
+    reusable = _find_vectors_by_hash(db, [hashes[path] for path in missing]) if missing else {}
+    vectors = {path: reusable[hashes[path]] for path in missing if hashes[path] in reusable}
+
+    to_embed = [path for path in missing if path not in vectors]
+    if to_embed and embed_missing:
+        vectors.update(_embed_images(to_embed))
+
+    embeddings = []
+    seen = set()
+    for path in image_paths:
+        image_hash = hashes[path]
+        if image_hash in seen:
+            continue
+        seen.add(image_hash)
+        if image_hash in by_hash:
+            row = by_hash[image_hash]
+            if row.image_path != path:
+                row.image_path = path
+            embeddings.append(row)
+            continue
+        if path not in vectors:
+            continue
+
+        row = new_embedding_row(qcode, path, image_hash, vectors[path])
+        db.add(row)
+        by_hash[image_hash] = row
+        embeddings.append(row)
+
+    return embeddings
+
+
+def sync_product_embeddings(db: Session, product: Product, embed_missing: bool = True) -> List[ProductEmbedding]:
+    """
+    제품의 현재 image_path 기준으로 모든 뷰 임베딩 동기화
+    - 저장되지 않은 뷰 이미지만 배치로 새로 생성
+    - image_path 또는 이미지 내용이 바뀐 이전 임베딩은 삭제 (무효화)
+
+    Args:
+        db: 데이터베이스 세션
+        product: 제품
+        embed_missing: False면 원격/로컬 인코딩 없이 저장된 임베딩만 연결 (재색인 작업용)
+
+    Returns:
+        ProductEmbedding 목록 (대표 이미지 먼저, 이미지 없으면 빈 목록)
+    """
+    embeddings = get_or_create_embeddings(db, product.qcode, list_product_views(product), embed_missing)
+    db.flush()
+
+    stale = db.query(ProductEmbedding)\
+        .filter(ProductEmbedding.qcode == product.qcode)\
+        .filter(ProductEmbedding.model == EMBEDDING_MODEL)\
+        .filter(ProductEmbedding.id.notin_([e.id for e in embeddings]))
+    for row in stale.all():
+        db.delete(row)
+
+    db.commit()
+
+    # 메모리 인덱스 증분 갱신 (뷰 전체를 한 번에 교체)
+    update_similarity_index(
+        db, product.qcode,
+        np.vstack([e.to_numpy() for e in embeddings]) if embeddings else None,
+        EMBEDDING_MODEL,
+        product_metadata(product)
+    )
+    return embeddings
+
+
+def backfill_missing_embeddings(db: Session, indexed_qcodes) -> int:
+    """
+    저장된 임베딩이 없거나 image_path가 바뀐 제품만 새로 생성
+    (qcode + image_path마다 1회만 시도, 실패한 제품은 재색인 작업에서 재시도)
+
+    Args:
+        db: 데이터베이스 세션
+        indexed_qcodes: 이미 인덱스에 있는 qcode 목록
+
+    Returns:
+        int: 새로 저장한 임베딩 수
+    """
+    indexed = set(indexed_qcodes)
+    with _backfill_lock:
+        missing = [
+            (qcode, image_path)
+            for qcode, image_path in db.query(Product.qcode, Product.image_path).filter(Product.image_path.isnot(None))
+            if qcode not in indexed and (qcode, image_path) not in _backfill_attempted
+        ]
+        _backfill_attempted.update(missing)
+
+    stored_count = 0
+    for qcode, _ in missing:
+        product = db.query(Product).filter(Product.qcode == qcode).first()
+        if not product:
+            continue
+        try:
+            embeddings = sync_product_embeddings(db, product)
+            if embeddings:
+                stored_count += len(embeddings)
+                print(f"    [EMBED] {qcode}: {len(embeddings)} view embeddings stored")
+            else:
+                print(f"    [SKIP] Product {qcode}: image not found at {product.image_path}")
+        except Exception as e:
+            db.rollback()
+            print(f"    [ERROR] Embedding product {qcode}: {e}")
+
+    return stored_count
+
+
+def _backfill_job():
+    db = SessionLocal()
+    try:
+        index = get_similarity_index(db, EMBEDDING_MODEL)
+        stored_count = backfill_missing_embeddings(db, index.qcodes)
+        print(f"[OK] Embedding backfill finished: {stored_count} view embeddings stored")
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Embedding backfill: {e}")
+    finally:
+        db.close()
+
+
+def start_embedding_backfill():
+    """
+    서버 시작 시 임베딩 없는 제품 채우기 (백그라운드 스레드, 유사도 검색은 기다리지 않음)
+    """
+    thread = threading.Thread(target=_backfill_job, name="embedding-backfill", daemon=True)
+    thread.start()
@@ -0,0 +1,120 @@
+"""
+정적 장면 프레임 건너뛰기
+- 마지막으로 추론한 프레임과 비교해 장면이 바뀌지 않았으면 추론 없이 이전 감지 결과 재사용
+- 비교 기준: difference hash (64bit) 해밍 거리 + 32x32 흑백 축소 이미지 평균 픽셀 차이
+- 카메라(소스)별로 마지막 추론 프레임 유지
+- 건너뛴 프레임 / 추론한 프레임 수 기록
+
+설정 (.env):
+- FRAME_GATE_ENABLED: "true" (기본) | "false"
+- FRAME_HASH_THRESHOLD: 같은 장면으로 볼 최대 해밍 거리 (기본 4 / 64bit)
+- FRAME_DIFF_THRESHOLD: 같은 장면으로 볼 최대 평균 픽셀 차이 (기본 6.0 / 255)
+- FRAME_GATE_MAX_AGE: 장면이 그대로여도 이 시간(초)이 지나면 다시 추론 (기본 30)
+"""
+import io
+import os
+import time
+import threading
+import numpy as np
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FRAME_GATE_ENABLED = os.getenv("FRAME_GATE_ENABLED", "true").lower() == "true"
+FRAME_HASH_THRESHOLD = int(os.getenv("FRAME_HASH_THRESHOLD", "4"))
+FRAME_DIFF_THRESHOLD = float(os.getenv("FRAME_DIFF_THRESHOLD", "6.0"))
+FRAME_GATE_MAX_AGE = float(os.getenv("FRAME_GATE_MAX_AGE", "30"))
+
+_entries: Dict[str, Dict] = {}
+_lock = threading.Lock()
+_stats = {
+    "inferred_frames": 0,
+    "skipped_frames": 0,
+}
+
+
+def compute_frame_signature(data: bytes) -> Dict:
+    """
+    프레임 비교용 서명 (difference hash + 32x32 흑백 축소 이미지)
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        gray = image.convert("L")
+        # dHash: 9x8로 축소 후 가로 방향 인접 픽셀 대소 비교
+        pixels = np.asarray(gray.resize((9, 8), Image.BILINEAR), dtype=np.int16)
+        thumbnail = np.asarray(gray.resize((32, 32), Image.BILINEAR), dtype=np.float32)
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return {
+        "hash": int(np.packbits(bits).view(">u8")[0]),
+        "thumbnail": thumbnail,
+    }
+
+
+def _is_same_scene(previous: Dict, current: Dict) -> bool:
+    distance = bin(previous["hash"] ^ current["hash"]).count("1")
+    if distance > FRAME_HASH_THRESHOLD:
+        return False
+    difference = float(np.abs(previous["thumbnail"] - current["thumbnail"]).mean())
+    return difference <= FRAME_DIFF_THRESHOLD
+
+
+def lookup_cached_result(source: str, signature: Optional[Dict]) -> Optional[Dict]:
+    """
+    장면이 바뀌지 않았으면 마지막 감지 결과 반환 (바뀌었으면 None)
+
+    Args:
+        source: 카메라/연결 식별자
+        signature: compute_frame_signature() 결과 (None이면 항상 추론)
+    """
+    if not FRAME_GATE_ENABLED or signature is None:
+        return None
+
+    with _lock:
+        entry = _entries.get(source)
+        if (
+            entry is not None
+            and time.time() - entry["inferred_at"] <= FRAME_GATE_MAX_AGE
+            and _is_same_scene(entry["signature"], signature)
+        ):
+            _stats["skipped_frames"] += 1
+            return entry["result"]
+    return None
+
+
+def store_result(source: str, signature: Optional[Dict], result: Dict):
+    """
+    추론한 프레임의 서명과 감지 결과 저장
+    """
+    with _lock:
+        _stats["inferred_frames"] += 1
+        if signature is None:
+            _entries.pop(source, None)
+            return
+        _entries[source] = {
+            "signature": signature,
+            "result": result,
+            "inferred_at": time.time(),
+        }
+
+
+def forget_source(source: str):
+    """
+    연결 종료된 소스의 마지막 프레임 정보 삭제
+    """
+    with _lock:
+        _entries.pop(source, None)
+
+
+def get_frame_gate_stats() -> Dict:
+    """
+    프레임 건너뛰기 누적 통계
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["sources"] = len(_entries)
+    total = stats["inferred_frames"] + stats["skipped_frames"]
+    stats["skip_rate"] = round(stats["skipped_frames"] / total, 4) if total else 0.0
+    return stats
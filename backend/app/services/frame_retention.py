@@ -0,0 +1,156 @@
+"""
+웹캠 프레임 보관 정책
+- 감지는 메모리의 프레임 바이트로 수행하고, 정책에 해당하는 프레임만 디스크에 저장
+- 보관 폴더는 용량 상한이 있는 링 버퍼 (상한을 넘으면 오래된 프레임부터 삭제)
+  (삭제된 프레임은 InventoryHistory.frame_path가 남아 있어도 파일이 없음)
+- 파일명은 카메라 + 마이크로초 타임스탬프 (같은 초의 프레임도 충돌 없음)
+
+설정 (.env):
+- FRAME_RETENTION: 보관 정책 (쉼표로 여러 개 지정 가능, 기본 "on_change")
+    - "none": 저장하지 않음
+    - "on_change": 재고 변화를 반영한 프레임만 저장 (InventoryHistory.frame_path)
+    - "sampled": FRAME_SAMPLE_RATE 비율만큼 무작위 저장
+    - "all": 추론한 모든 프레임 저장 (링 버퍼 상한 안에서)
+- FRAME_SAMPLE_RATE: sampled 정책의 저장 비율 (기본 0.05)
+- FRAME_DIR: 프레임 보관 폴더 (기본 uploads/frames)
+- FRAME_RETENTION_MAX_MB: 보관 폴더 용량 상한 MB (기본 500, 0이면 무제한)
+"""
+import os
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FRAME_RETENTION = {
+    policy.strip().lower()
+    for policy in os.getenv("FRAME_RETENTION", "on_change").split(",")
+    if policy.strip()
+}
+FRAME_SAMPLE_RATE = float(os.getenv("FRAME_SAMPLE_RATE", "0.05"))
+FRAME_DIR = os.getenv("FRAME_DIR", os.path.join("uploads", "frames"))
+FRAME_RETENTION_MAX_MB = float(os.getenv("FRAME_RETENTION_MAX_MB", "500"))
+
+_lock = threading.Lock()
+_ring: Optional[deque] = None  # (경로, 크기) 저장 순서
+_ring_bytes = 0
+_stats = {
+    "frames": 0,
+    "saved_frames": 0,
+    "evicted_frames": 0,
+}
+
+
+def _load_ring():
+    """
+    보관 폴더의 기존 프레임을 수정 시각 순으로 읽어 링 버퍼 초기화 (최초 1회, 잠금 안에서 호출)
+    """
+    global _ring, _ring_bytes
+    os.makedirs(FRAME_DIR, exist_ok=True)
+    entries = []
+    for name in os.listdir(FRAME_DIR):
+        path = os.path.join(FRAME_DIR, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, path, stat.st_size))
+    entries.sort()
+    _ring = deque((path, size) for _, path, size in entries)
+    _ring_bytes = sum(size for _, _, size in entries)
+
+
+def _evict():
+    """
+    용량 상한을 넘으면 오래된 프레임부터 삭제 (잠금 안에서 호출)
+    """
+    global _ring_bytes
+    if FRAME_RETENTION_MAX_MB <= 0:
+        return
+    limit = FRAME_RETENTION_MAX_MB * 1024 * 1024
+    # 방금 저장한 프레임은 남김
+    while _ring_bytes > limit and len(_ring) > 1:
+        path, size = _ring.popleft()
+        _ring_bytes -= size
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        _stats["evicted_frames"] += 1
+
+
+def write_frame(data: bytes, camera_id: str = "default") -> str:
+    """
+    프레임을 보관 폴더에 저장하고 링 버퍼 상한 적용
+
+    Returns:
+        저장된 파일 경로
+    """
+    global _ring_bytes
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    camera = "".join(c if c.isalnum() or c in "-_" else "_" for c in camera_id)
+    file_path = os.path.join(FRAME_DIR, f"webcam_{camera}_{timestamp}.jpg")
+
+    with _lock:
+        if _ring is None:
+            _load_ring()
+        with open(file_path, "wb") as buffer:
+            buffer.write(data)
+        _ring.append((file_path, len(data)))
+        _ring_bytes += len(data)
+        _stats["saved_frames"] += 1
+        _evict()
+    return file_path
+
+
+class FrameHandle:
+    """
+    메모리의 프레임 1장 (정책에 해당할 때만 keep()으로 디스크에 저장)
+    """
+
+    def __init__(self, data: bytes, camera_id: str = "default"):
+        self.data = data
+        self.camera_id = camera_id
+        self.path: Optional[str] = None
+        with _lock:
+            _stats["frames"] += 1
+
+    def keep(self) -> str:
+        """
+        프레임 저장 (이미 저장했으면 기존 경로 반환)
+        """
+        if self.path is None:
+            self.path = write_frame(self.data, self.camera_id)
+        return self.path
+
+    def keep_on_arrival(self) -> Optional[str]:
+        """
+        추론 전 정책 적용: all / sampled
+        """
+        if "all" in FRAME_RETENTION or (
+            "sampled" in FRAME_RETENTION and random.random() < FRAME_SAMPLE_RATE
+        ):
+            return self.keep()
+        return None
+
+    def keep_on_stock_change(self) -> Optional[str]:
+        """
+        재고 반영 시 정책 적용: on_change (이미 저장된 프레임은 그 경로 사용)
+        """
+        if "on_change" in FRAME_RETENTION:
+            return self.keep()
+        return self.path
+
+
+def get_frame_retention_stats() -> Dict:
+    """
+    프레임 보관 통계
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["retained_frames"] = len(_ring) if _ring is not None else None
+        stats["retained_mb"] = round(_ring_bytes / (1024 * 1024), 2) if _ring is not None else None
+    stats["policy"] = sorted(FRAME_RETENTION)
+    stats["max_mb"] = FRAME_RETENTION_MAX_MB
+    return stats
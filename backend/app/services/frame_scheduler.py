@@ -0,0 +1,280 @@
+"""
+다중 카메라 프레임 감지 스케줄러
+- 카메라별 대기열 (가득 차면 가장 오래된 프레임을 버리고 최신 프레임 유지)
+  카메라 ID는 기기/연결별 ID (프론트엔드 기기 ID, WebSocket 연결 ID, HTTP 클라이언트 주소)
+- 카메라별 처리율 상한 (초당 추론 프레임 수)
+- 카메라 간 라운드 로빈으로 공정하게 선택 (배치 1개에 카메라당 최대 1프레임)
+- 여러 카메라 프레임을 모아 배치 1회로 감지 (로컬 ONNX 배치 추론 / Roboflow 동시 요청)
+- /api/detect-qcode와 /api/ws/detect가 같은 스케줄러 공유
+
+설정 (.env):
+- DETECT_SCHEDULER_ENABLED: "true" (기본) | "false" (프레임마다 바로 감지)
+- DETECT_CAMERA_MAX_FPS: 카메라별 초당 최대 추론 프레임 수 (기본 2.0, 0이면 제한 없음)
+- DETECT_CAMERA_QUEUE_SIZE: 카메라별 대기 프레임 수 (기본 1)
+- DETECT_BATCH_SIZE: 배치 1회 최대 프레임 수 (기본 8)
+- DETECT_BATCH_WAIT_MS: 다른 카메라 프레임을 모으기 위해 기다리는 시간 (기본 20ms)
+- DETECT_MAX_INFLIGHT_BATCHES: 동시에 실행할 배치 수 (기본 2)
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from app.services.roboflow_service import detect_products_in_frame_async, detect_products_in_frames_async
+
+load_dotenv()
+
+DETECT_SCHEDULER_ENABLED = os.getenv("DETECT_SCHEDULER_ENABLED", "true").lower() == "true"
+DETECT_CAMERA_MAX_FPS = float(os.getenv("DETECT_CAMERA_MAX_FPS", "2.0"))
+DETECT_CAMERA_QUEUE_SIZE = max(1, int(os.getenv("DETECT_CAMERA_QUEUE_SIZE", "1")))
+DETECT_BATCH_SIZE = max(1, int(os.getenv("DETECT_BATCH_SIZE", "8")))
+DETECT_BATCH_WAIT_MS = float(os.getenv("DETECT_BATCH_WAIT_MS", "20"))
+DETECT_MAX_INFLIGHT_BATCHES = max(1, int(os.getenv("DETECT_MAX_INFLIGHT_BATCHES", "2")))
+
+MIN_FRAME_INTERVAL = 1.0 / DETECT_CAMERA_MAX_FPS if DETECT_CAMERA_MAX_FPS > 0 else 0.0
+
+
+def _dropped_result(reason: str) -> Dict:
+    return {
+        "success": False,
+        "dropped": True,
+        "error": reason,
+        "detected_products": [],
+        "total_count": 0
+    }
+
+
+class CameraQueue:
+    """
+    카메라 1대의 대기 프레임 + 처리율 상태
+    """
+
+    def __init__(self, camera_id: str):
+        self.camera_id = camera_id
+        self.pending: deque = deque()  # (프레임 바이트, future)
+        self.next_allowed = 0.0
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+
+
+class FrameScheduler:
+    """
+    이벤트 루프 1개에서 동작하는 카메라 프레임 스케줄러
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.cameras: Dict[str, CameraQueue] = {}
+        self.order: deque = deque()  # 라운드 로빈 순서
+        self.batches = 0
+        self.batched_frames = 0
+        self._wakeup = asyncio.Event()
+        self._inflight = asyncio.Semaphore(DETECT_MAX_INFLIGHT_BATCHES)
+        self._task = self.loop.create_task(self._run())
+
+    async def submit(self, camera_id: str, data: bytes) -> Dict:
+        """
+        프레임 감지 요청 (차례가 오면 배치로 감지 후 결과 반환)
+
+        Returns:
+            detect_products_in_frame() 형식 결과
+            (대기열에서 밀려난 프레임은 {"success": False, "dropped": True, ...})
+        """
+        queue = self.cameras.get(camera_id)
+        if queue is None:
+            queue = self.cameras[camera_id] = CameraQueue(camera_id)
+            self.order.append(camera_id)
+
+        # 대기열이 가득 차면 가장 오래된 프레임을 버림 (최신 장면 우선)
+        if len(queue.pending) >= DETECT_CAMERA_QUEUE_SIZE:
+            _, stale = queue.pending.popleft()
+            queue.dropped += 1
+            if not stale.done():
+                stale.set_result(_dropped_result("newer frame from the same camera replaced this frame"))
+
+        future = self.loop.create_future()
+        queue.pending.append((data, future))
+        queue.submitted += 1
+        self._wakeup.set()
+        return await future
+
+    def _next_batch(self, now: float, limit: int) -> Tuple[List[Tuple[CameraQueue, bytes, asyncio.Future]], Optional[float]]:
+        """
+        라운드 로빈으로 처리 가능한 카메라에서 1프레임씩 꺼냄
+
+        Returns:
+            (배치, 처리율 상한으로 대기 중인 카메라가 가장 먼저 가능해지는 시각)
+        """
+        batch = []
+        earliest = None
+        for _ in range(len(self.order)):
+            if len(batch) >= limit:
+                break
+            camera_id = self.order[0]
+            self.order.rotate(-1)
+            queue = self.cameras[camera_id]
+            if not queue.pending:
+                continue
+            if queue.next_allowed > now:
+                earliest = queue.next_allowed if earliest is None else min(earliest, queue.next_allowed)
+                continue
+            data, future = queue.pending.popleft()
+            if future.done():
+                continue
+            queue.next_allowed = now + MIN_FRAME_INTERVAL
+            batch.append((queue, data, future))
+        return batch, earliest
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            batch, earliest = self._next_batch(now, DETECT_BATCH_SIZE)
+
+            if not batch:
+                timeout = None if earliest is None else max(earliest - now, 0.0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # 다른 카메라 프레임이 들어올 수 있으면 잠시 기다렸다가 배치 채우기
+            if len(batch) < DETECT_BATCH_SIZE and len(self.cameras) > 1 and DETECT_BATCH_WAIT_MS > 0:
+                await asyncio.sleep(DETECT_BATCH_WAIT_MS / 1000)
+                more, _ = self._next_batch(time.monotonic(), DETECT_BATCH_SIZE - len(batch))
+                batch.extend(more)
+
+            await self._inflight.acquire()
+            self.loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[CameraQueue, bytes, asyncio.Future]]):
+        try:
+            if len(batch) == 1:
+                results = [await detect_products_in_frame_async(batch[0][1])]
+            else:
+                results = await detect_products_in_frames_async([data for _, data, _ in batch])
+        except Exception as e:
+            print(f"[ERROR] FrameScheduler batch: {e!r}")
+            results = [{
+                "success": False,
+                "error": str(e),
+                "detected_products": [],
+                "total_count": 0
+            } for _ in batch]
+        finally:
+            self._inflight.release()
+
+        self.batches += 1
+        self.batched_frames += len(batch)
+        if len(batch) > 1:
+            print(f"[*] Batched detection: {len(batch)} frames from "
+                  f"{', '.join(queue.camera_id for queue, _, _ in batch)}")
+
+        for (queue, _, future), result in zip(batch, results):
+            queue.processed += 1
+            if not future.done():
+                future.set_result(result)
+
+    def forget(self, camera_id: str):
+        """
+        카메라 대기열 삭제 (대기 중인 프레임은 dropped 처리)
+        """
+        queue = self.cameras.pop(camera_id, None)
+        if queue is None:
+            return
+        self.order.remove(camera_id)
+        while queue.pending:
+            _, future = queue.pending.popleft()
+            if not future.done():
+                future.set_result(_dropped_result("camera released"))
+
+    def close(self):
+        """
+        스케줄러 중지 (대기 중인 프레임은 dropped 처리)
+        """
+        self._task.cancel()
+        for queue in self.cameras.values():
+            while queue.pending:
+                _, future = queue.pending.popleft()
+                if not future.done():
+                    future.set_result(_dropped_result("detection scheduler stopped"))
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": True,
+            "batches": self.batches,
+            "batched_frames": self.batched_frames,
+            "avg_batch_size": round(self.batched_frames / self.batches, 2) if self.batches else 0.0,
+            "cameras": {
+                camera_id: {
+                    "submitted": queue.submitted,
+                    "processed": queue.processed,
+                    "dropped": queue.dropped,
+                    "pending": len(queue.pending),
+                }
+                for camera_id, queue in self.cameras.items()
+            },
+        }
+
+
+_scheduler: Optional[FrameScheduler] = None
+
+
+def _get_scheduler() -> FrameScheduler:
+    """
+    현재 이벤트 루프의 스케줄러 (루프가 바뀌면 새로 생성)
+    """
+    global _scheduler
+    if _scheduler is None or _scheduler.loop is not asyncio.get_running_loop():
+        _scheduler = FrameScheduler()
+    return _scheduler
+
+
+async def schedule_detection(camera_id: str, data: bytes) -> Dict:
+    """
+    카메라 프레임 감지 (스케줄러 사용 시 카메라별 대기열/처리율 상한/배치 적용)
+    """
+    if not DETECT_SCHEDULER_ENABLED:
+        return await detect_products_in_frame_async(data)
+    return await _get_scheduler().submit(camera_id, data)
+
+
+def release_scheduled_camera(camera_id: str):
+    """
+    카메라 연결 종료/유휴 시 대기열 삭제 (스케줄러와 같은 이벤트 루프에서만 처리)
+    """
+    if _scheduler is None:
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _scheduler.loop:
+        _scheduler.forget(camera_id)
+    elif not _scheduler.loop.is_closed():
+        _scheduler.loop.call_soon_threadsafe(_scheduler.forget, camera_id)
+
+
+def stop_frame_scheduler():
+    """
+    서버 종료 시 스케줄러 중지
+    """
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.close()
+        _scheduler = None
+
+
+def get_frame_scheduler_stats() -> Dict:
+    """
+    스케줄러 누적 통계 (배치 수/평균 배치 크기/카메라별 처리·폐기 프레임 수)
+    """
+    if not DETECT_SCHEDULER_ENABLED:
+        return {"enabled": False}
+    if _scheduler is None:
+        return {"enabled": True, "batches": 0, "batched_frames": 0, "avg_batch_size": 0.0, "cameras": {}}
+    return _scheduler.stats()
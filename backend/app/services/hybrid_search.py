@@ -0,0 +1,259 @@
+"""
+텍스트 + 이미지 하이브리드 유사도 랭킹
+- 제품명/스펙/표준품명/개별속성을 문자 n-gram TF-IDF 희소 행렬로 미리 구성 (열 단위 CSC, numpy 배열)
+- 쿼리 텍스트 유사도는 희소 행렬-벡터 곱 1회로 전체 카탈로그 동시 계산
+- CLIP 제품별 점수(similarity_index)와 가중 합산 후 argpartition top-k
+- 제품 수/최근 수정 시각이 바뀌면 다음 검색 때 텍스트 인덱스 재구성
+
+설정 (.env):
+- HYBRID_VISUAL_WEIGHT: 이미지 유사도 가중치 (기본 0.6)
+- HYBRID_TEXT_WEIGHT: 텍스트 유사도 가중치 (기본 0.4)
+- TEXT_NGRAM_MIN / TEXT_NGRAM_MAX: 문자 n-gram 범위 (기본 2 ~ 3)
+"""
+import os
+import re
+import json
+import math
+import threading
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.models.product import Product
+from app.services.similarity_index import SimilarityIndex, Filters, top_k_indices
+
+load_dotenv()
+
+HYBRID_VISUAL_WEIGHT = float(os.getenv("HYBRID_VISUAL_WEIGHT", "0.6"))
+HYBRID_TEXT_WEIGHT = float(os.getenv("HYBRID_TEXT_WEIGHT", "0.4"))
+TEXT_NGRAM_MIN = int(os.getenv("TEXT_NGRAM_MIN", "2"))
+TEXT_NGRAM_MAX = int(os.getenv("TEXT_NGRAM_MAX", "3"))
+
+# 텍스트 인덱스에 포함할 제품 필드
+TEXT_FIELDS = ("name", "specs", "standard_name", "attributes")
+
+
+def product_text(name=None, specs=None, standard_name=None, attributes=None) -> str:
+    """
+    제품 텍스트 필드를 하나의 문자열로 결합 (attributes는 JSON이면 "키 값"으로 펼침)
+    """
+    parts = [name, specs, standard_name]
+    if attributes:
+        if isinstance(attributes, str):
+            try:
+                attributes = json.loads(attributes)
+            except ValueError:
+                pass
+        if isinstance(attributes, dict):
+            parts.extend(f"{key} {value}" for key, value in attributes.items())
+        else:
+            parts.append(str(attributes))
+    return " ".join(str(part) for part in parts if part)
+
+
+def char_ngrams(text: str, ngram_min: int = TEXT_NGRAM_MIN, ngram_max: int = TEXT_NGRAM_MAX) -> Counter:
+    """
+    단어 경계를 포함한 문자 n-gram 빈도 (한글/영문/숫자 혼합 품명용)
+    """
+    counts = Counter()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f" {word} "
+        for n in range(ngram_min, ngram_max + 1):
+            for i in range(len(padded) - n + 1):
+                counts[padded[i:i + n]] += 1
+    return counts
+
+
+class TextIndex:
+    """
+    문자 n-gram TF-IDF 희소 행렬 (CSC: 용어별 제품 위치/가중치)
+    """
+
+    def __init__(self):
+        self.qcodes: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.vocab: Dict[str, int] = {}
+        self.idf = np.array([], dtype=np.float32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.array([], dtype=np.int32)
+        self.data = np.array([], dtype=np.float32)
+        self.fingerprint = None
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self.qcodes)
+
+    def build(self, documents: List[Tuple[str, str]]) -> "TextIndex":
+        """
+        문서 목록으로 TF-IDF 행렬 구성
+
+        Args:
+            documents: [(qcode, 텍스트), ...]
+        """
+        counts = [char_ngrams(text) for _, text in documents]
+
+        vocab: Dict[str, int] = {}
+        for doc in counts:
+            for term in doc:
+                vocab.setdefault(term, len(vocab))
+
+        rows, terms, tfs = [], [], []
+        for row, doc in enumerate(counts):
+            rows.extend([row] * len(doc))
+            terms.extend(vocab[term] for term in doc)
+            tfs.extend(doc.values())
+        rows = np.array(rows, dtype=np.int32)
+        terms = np.array(terms, dtype=np.int64)
+
+        # 문서 빈도 -> smooth idf, sublinear tf
+        df = np.bincount(terms, minlength=len(vocab))
+        idf = (np.log((1 + len(documents)) / (1 + df)) + 1).astype(np.float32)
+        weights = (1 + np.log(np.array(tfs, dtype=np.float32))) * idf[terms]
+
+        # 문서(행) 단위 L2 정규화
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(documents)))
+        norms[norms == 0] = 1.0
+        weights = weights / norms[rows]
+
+        # 용어(열) 순서로 정렬 -> CSC
+        order = np.argsort(terms, kind="stable")
+        self.indices = rows[order]
+        self.data = weights[order].astype(np.float32)
+        self.indptr = np.searchsorted(terms[order], np.arange(len(vocab) + 1)).astype(np.int64)
+        self.vocab = vocab
+        self.idf = idf
+        self.qcodes = [qcode for qcode, _ in documents]
+        self.positions = {qcode: i for i, qcode in enumerate(self.qcodes)}
+        self.generation += 1
+        return self
+
+    def score(self, query_text: str) -> np.ndarray:
+        """
+        쿼리 텍스트와 전체 문서의 코사인 유사도 (희소 행렬-벡터 곱 1회)
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        counts = char_ngrams(query_text or "")
+        known = [(self.vocab[term], count) for term, count in counts.items() if term in self.vocab]
+        if not known or len(self) == 0:
+            return scores
+
+        terms = np.array([term for term, _ in known], dtype=np.int64)
+        weights = (1 + np.log(np.array([count for _, count in known], dtype=np.float32))) * self.idf[terms]
+        weights /= np.linalg.norm(weights)
+
+        # 쿼리 용어 열들의 (문서, 가중치)를 한 번에 모아 문서별 합산
+        starts = self.indptr[terms]
+        lengths = self.indptr[terms + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return scores
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = np.arange(total) + offsets
+        contributions = self.data[positions] * np.repeat(weights, lengths)
+        return np.bincount(self.indices[positions], weights=contributions, minlength=len(self)).astype(np.float32)
+
+
+def catalog_text_fingerprint(db: Session) -> Tuple:
+    """
+    제품 테이블 상태 식별값 (제품 수, 최대 id, 최근 수정 시각)
+    """
+    count, max_id, updated = db.query(
+        func.count(Product.id), func.max(Product.id), func.max(Product.updated_at)
+    ).one()
+    return int(count or 0), int(max_id or 0), str(updated)
+
+
+# ==========================
+# 전역 텍스트 인덱스 (프로세스당 1개)
+# ==========================
+_text_index: Optional[TextIndex] = None
+_text_index_lock = threading.Lock()
+_alignment_cache: Dict[Tuple, np.ndarray] = {}
+
+
+def get_text_index(db: Session) -> TextIndex:
+    """
+    전역 텍스트 인덱스 조회 (제품 테이블이 바뀌었으면 재구성)
+    """
+    global _text_index
+    fingerprint = catalog_text_fingerprint(db)
+    with _text_index_lock:
+        if _text_index is not None and _text_index.fingerprint == fingerprint:
+            return _text_index
+
+        columns = [getattr(Product, field) for field in TEXT_FIELDS]
+        rows = db.query(Product.qcode, *columns).all()
+        index = _text_index or TextIndex()
+        index.build([(row[0], product_text(*row[1:])) for row in rows])
+        index.fingerprint = fingerprint
+        _text_index = index
+        print(f"[*] Text index built: {len(index)} products, {len(index.vocab)} n-grams")
+        return index
+
+
+def _align(text_index: TextIndex, index: SimilarityIndex, group_qcodes: List[str]) -> np.ndarray:
+    """
+    이미지 인덱스 제품 순서 -> 텍스트 인덱스 위치 (없으면 -1), 인덱스가 바뀔 때만 다시 계산
+    """
+    key = (id(index), index.generation, text_index.generation, len(group_qcodes))
+    aligned = _alignment_cache.get(key)
+    if aligned is None:
+        aligned = np.array([text_index.positions.get(q, -1) for q in group_qcodes], dtype=np.int64)
+        _alignment_cache.clear()
+        _alignment_cache[key] = aligned
+    return aligned
+
+
+def rank_hybrid(
+    db: Session,
+    index: SimilarityIndex,
+    query_embedding: np.ndarray,
+    query_text: str,
+    top_k: int = 5,
+    filters: Optional[Filters] = None,
+    visual_weight: float = HYBRID_VISUAL_WEIGHT,
+    text_weight: float = HYBRID_TEXT_WEIGHT
+) -> List[Tuple[str, float, float, float]]:
+    """
+    이미지 + 텍스트 유사도 가중 합산 랭킹 (전체 카탈로그 1회 벡터 연산)
+
+    Args:
+        db: 데이터베이스 세션 (텍스트 인덱스 구성용)
+        index: 이미지 유사도 인덱스
+        query_embedding: 쿼리 이미지 임베딩
+        query_text: 사용자가 입력한 제품명/스펙 등
+        top_k: 반환할 상위 N개
+        filters: 메타데이터 필터
+        visual_weight / text_weight: 가중치 (합이 1이 되도록 정규화)
+
+    Returns:
+        [(qcode, 종합 유사도, 이미지 유사도, 텍스트 유사도), ...] 종합 유사도 내림차순 (0~1)
+    """
+    total_weight = visual_weight + text_weight
+    if total_weight <= 0:
+        raise ValueError("HYBRID_VISUAL_WEIGHT + HYBRID_TEXT_WEIGHT must be > 0")
+    visual_weight, text_weight = visual_weight / total_weight, text_weight / total_weight
+
+    group_qcodes, visual, allowed = index.product_scores(query_embedding, filters)
+    if len(group_qcodes) == 0 or top_k <= 0:
+        return []
+
+    text_index = get_text_index(db)
+    text_scores = text_index.score(query_text)
+    aligned = _align(text_index, index, group_qcodes)
+    text = np.where(aligned >= 0, text_scores[np.maximum(aligned, 0)], 0.0).astype(np.float32)
+
+    # 근사 검색으로 점수를 계산하지 않은 제품은 이미지 점수 0
+    visual = np.where(np.isfinite(visual), visual, 0.0).astype(np.float32)
+    combined = visual_weight * visual + text_weight * text
+    if allowed is not None:
+        combined[~allowed] = -np.inf
+
+    top = top_k_indices(combined, top_k)
+    return [
+        (group_qcodes[g], float(combined[g]), float(visual[g]), float(text[g]))
+        for g in top if np.isfinite(combined[g])
+    ]
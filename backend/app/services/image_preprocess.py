@@ -0,0 +1,200 @@
+"""
+추론 요청 전 이미지 전처리
+- 모델 입력 해상도로 축소 후 메모리에서 JPEG/WebP 재인코딩 (원본 PNG 그대로 전송하지 않음)
+- 원본 내용 해시 기준 LRU 캐시 (같은 이미지 반복 업로드 시 재인코딩 생략)
+- 호출마다 절감한 바이트 수 기록
+
+설정 (.env):
+- IMAGE_PREPROCESS_ENABLED: "true" (기본) | "false"
+- CLIP_UPLOAD_SIZE: CLIP 업로드 시 짧은 변 크기 (기본 224, CLIP 입력 해상도)
+- DETECT_INPUT_SIZE: 감지 업로드 시 긴 변 크기 (기본 640, YOLOv8 입력 해상도)
+- IMAGE_UPLOAD_FORMAT: "JPEG" (기본) | "WEBP"
+- IMAGE_UPLOAD_QUALITY: 재인코딩 품질 (기본 90)
+- IMAGE_CACHE_SIZE: 전처리 결과 캐시 개수 (기본 128)
+"""
+import io
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+CLIP_UPLOAD_SIZE = int(os.getenv("CLIP_UPLOAD_SIZE", "224"))
+DETECT_INPUT_SIZE = int(os.getenv("DETECT_INPUT_SIZE", "640"))
+IMAGE_UPLOAD_FORMAT = os.getenv("IMAGE_UPLOAD_FORMAT", "JPEG").upper()
+IMAGE_UPLOAD_QUALITY = int(os.getenv("IMAGE_UPLOAD_QUALITY", "90"))
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "128"))
+
+MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png",
+}
+
+_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "cache_hits": 0,
+    "original_bytes": 0,
+    "prepared_bytes": 0,
+}
+
+
+def _resize_target(width: int, height: int, shortest_side: Optional[int], longest_side: Optional[int]):
+    """
+    축소 배율 계산 (확대는 하지 않음)
+    """
+    scale = 1.0
+    if shortest_side:
+        scale = min(scale, shortest_side / min(width, height))
+    if longest_side:
+        scale = min(scale, longest_side / max(width, height))
+    return scale
+
+
+def _encode(data: bytes, shortest_side: Optional[int], longest_side: Optional[int],
+            image_format: str, quality: int) -> Dict:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        source_format = image.format
+        width, height = image.size
+        scale = _resize_target(width, height, shortest_side, longest_side)
+
+        # 축소가 필요 없고 이미 같은 포맷이면 원본 그대로 사용
+        if scale >= 1.0 and source_format == image_format:
+            return {
+                "data": data,
+                "mime_type": MIME_TYPES.get(image_format, "application/octet-stream"),
+                "width": width,
+                "height": height,
+                "scale": 1.0,
+            }
+
+        image = image.convert("RGB")
+        if scale < 1.0:
+            image = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.BILINEAR
+            )
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+        prepared = buffer.getvalue()
+        prepared_width, prepared_height = image.size
+
+    # 재인코딩 결과가 더 크면 원본 사용
+    if scale >= 1.0 and len(prepared) >= len(data):
+        return {
+            "data": data,
+            "mime_type": MIME_TYPES.get(source_format, "application/octet-stream"),
+            "width": width,
+            "height": height,
+            "scale": 1.0,
+        }
+
+    return {
+        "data": prepared,
+        "mime_type": MIME_TYPES.get(image_format, "application/octet-stream"),
+        "width": prepared_width,
+        "height": prepared_height,
+        # 전처리 이미지 좌표 / 원본 좌표 (박스 좌표 복원용)
+        "scale": prepared_width / width,
+    }
+
+
+def prepare_image(
+    image: Union[str, bytes],
+    shortest_side: Optional[int] = None,
+    longest_side: Optional[int] = None,
+    image_format: str = IMAGE_UPLOAD_FORMAT,
+    quality: int = IMAGE_UPLOAD_QUALITY
+) -> Dict:
+    """
+    추론 요청용 이미지 바이트 준비 (축소 + 재인코딩, 원본 해시 기준 캐시)
+
+    Args:
+        image: 원본 이미지 경로 또는 이미지 바이트 (메모리 프레임)
+        shortest_side: 짧은 변 최대 크기 (CLIP)
+        longest_side: 긴 변 최대 크기 (Object Detection)
+        image_format: 재인코딩 포맷 ("JPEG" | "WEBP")
+        quality: 재인코딩 품질
+
+    Returns:
+        {
+            "data": bytes,
+            "mime_type": "image/jpeg",
+            "width": 224, "height": 298,
+            "scale": 0.112,           # 전처리 크기 / 원본 크기
+            "original_bytes": 2048000,
+            "prepared_bytes": 18000,
+            "cached": False
+        }
+    """
+    if isinstance(image, bytes):
+        data = image
+    else:
+        with open(image, "rb") as image_file:
+            data = image_file.read()
+
+    if not IMAGE_PREPROCESS_ENABLED:
+        return {
+            "data": data,
+            "mime_type": "application/octet-stream",
+            "scale": 1.0,
+            "original_bytes": len(data),
+            "prepared_bytes": len(data),
+            "cached": False,
+        }
+
+    key = (hashlib.sha256(data).hexdigest(), shortest_side, longest_side, image_format, quality)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+
+    if cached is None:
+        try:
+            prepared = _encode(data, shortest_side, longest_side, image_format, quality)
+        except Exception as e:
+            # 디코딩 실패 시 원본 그대로 전송
+            print(f"    [WARN] Image preprocessing failed, sending original: {e}")
+            prepared = {"data": data, "mime_type": "application/octet-stream", "scale": 1.0}
+        with _cache_lock:
+            _cache[key] = prepared
+            while len(_cache) > IMAGE_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    result = dict(cached or prepared)
+    result["original_bytes"] = len(data)
+    result["prepared_bytes"] = len(result["data"])
+    result["cached"] = cached is not None
+
+    with _cache_lock:
+        _stats["calls"] += 1
+        _stats["cache_hits"] += int(result["cached"])
+        _stats["original_bytes"] += result["original_bytes"]
+        _stats["prepared_bytes"] += result["prepared_bytes"]
+
+    saved = result["original_bytes"] - result["prepared_bytes"]
+    print(
+        f"    [PREPROCESS] {result['original_bytes']:,} -> {result['prepared_bytes']:,} bytes "
+        f"(saved {saved:,}{', cached' if result['cached'] else ''})"
+    )
+    return result
+
+
+def get_preprocess_stats() -> Dict:
+    """
+    전처리 누적 통계
+    """
+    with _cache_lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["original_bytes"] - stats["prepared_bytes"]
+    return stats
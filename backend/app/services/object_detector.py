@@ -0,0 +1,260 @@
+"""
+로컬 CPU 객체 감지 백엔드 (YOLOv8 ONNX, ONNX Runtime)
+- detect.roboflow.com 대신 로컬에서 웹캠 프레임 감지 (인터넷 지연/외부 서비스 의존성 제거)
+- 서버 시작 시 1회 로드 + 워밍업 후 재사용
+- 결과는 Roboflow 예측과 같은 형식 ({"x", "y", "width", "height", "confidence", "class"}, 중심 좌표)
+- 배치 축이 동적인 모델(export_detector_onnx.py --dynamic)은 여러 프레임을 한 번에 추론 (detect_batch)
+- 배치 크기가 고정된 모델은 그 크기 단위로 나눠 추론 (마지막 묶음은 빈 프레임으로 채움)
+
+설정 (.env):
+- DETECT_BACKEND: "roboflow" (기본) | "onnx"
+- DETECT_ONNX_MODEL_PATH: ONNX 모델 경로 (기본 models/yolov8_detector.onnx, export_detector_onnx.py로 생성)
+- DETECT_CLASS_NAMES: 클래스 이름 (쉼표 구분, 비우면 모델 메타데이터의 names 사용)
+- DETECT_CONFIDENCE: 최소 confidence (기본 0.4)
+- DETECT_IOU: NMS IoU 임계값 (기본 0.45)
+- DETECT_NUM_THREADS: ONNX Runtime intra-op 스레드 수 (기본 0 = 자동)
+"""
+import io
+import os
+import ast
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Union
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DETECT_BACKEND = os.getenv("DETECT_BACKEND", "roboflow").lower()
+DETECT_ONNX_MODEL_PATH = os.getenv("DETECT_ONNX_MODEL_PATH", os.path.join("models", "yolov8_detector.onnx"))
+DETECT_CLASS_NAMES = os.getenv("DETECT_CLASS_NAMES", "")
+DETECT_CONFIDENCE = float(os.getenv("DETECT_CONFIDENCE", "0.4"))
+DETECT_IOU = float(os.getenv("DETECT_IOU", "0.45"))
+DETECT_NUM_THREADS = int(os.getenv("DETECT_NUM_THREADS", "0"))
+
+# YOLOv8 레터박스 패딩 색
+LETTERBOX_COLOR = 114
+
+
+def letterbox(image, size: int):
+    """
+    비율 유지 축소 후 정사각형 패딩 (YOLOv8 입력 전처리)
+
+    Returns:
+        (CHW float32 배열, 배율, (x 패딩, y 패딩))
+    """
+    from PIL import Image
+
+    width, height = image.size
+    scale = min(size / width, size / height)
+    resized_width, resized_height = round(width * scale), round(height * scale)
+    resized = image.resize((resized_width, resized_height), Image.BILINEAR)
+
+    canvas = Image.new("RGB", (size, size), (LETTERBOX_COLOR,) * 3)
+    pad_x, pad_y = (size - resized_width) // 2, (size - resized_height) // 2
+    canvas.paste(resized, (pad_x, pad_y))
+
+    pixels = np.asarray(canvas, dtype=np.float32) / 255.0
+    return pixels.transpose(2, 0, 1), scale, (pad_x, pad_y)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """
+    박스 1개와 여러 박스의 IoU (x1, y1, x2, y2)
+    """
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    클래스별 NMS (클래스마다 좌표를 떨어뜨려 한 번에 처리)
+
+    Returns:
+        유지할 박스 위치 (점수 내림차순)
+    """
+    if len(boxes) == 0:
+        return np.array([], dtype=np.int64)
+    offset = class_ids[:, None].astype(np.float32) * (boxes.max() + 1)
+    shifted = boxes + offset
+    order = np.argsort(-scores)
+    keep = []
+    while len(order):
+        current = order[0]
+        keep.append(current)
+        if len(order) == 1:
+            break
+        overlaps = box_iou(shifted[current], shifted[order[1:]])
+        order = order[1:][overlaps <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxYoloDetector:
+    """
+    ONNX Runtime CPU 기반 YOLOv8 객체 감지기
+    """
+
+    def __init__(self, model_path: str = DETECT_ONNX_MODEL_PATH):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise Exception("onnxruntime is not installed. Run: pip install onnxruntime")
+
+        if not os.path.exists(model_path):
+            raise Exception(f"Detector ONNX model not found: {model_path} (run export_detector_onnx.py)")
+
+        options = ort.SessionOptions()
+        if DETECT_NUM_THREADS > 0:
+            options.intra_op_num_threads = DETECT_NUM_THREADS
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = model_input.shape[-1] if isinstance(model_input.shape[-1], int) else 640
+        # 고정 배치 크기 (동적 배치 축이면 None -> 받은 프레임 수 그대로 추론)
+        self.batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.supports_batch = self.batch_size is None
+        self.class_names = self._load_class_names()
+        self.model_path = model_path
+        print(f"[*] Detector ONNX model loaded: {model_path} "
+              f"(input: {self.input_size}, classes: {len(self.class_names)}, batch: {self.batch_size or 'dynamic'})")
+
+    def _load_class_names(self) -> List[str]:
+        if DETECT_CLASS_NAMES.strip():
+            return [name.strip() for name in DETECT_CLASS_NAMES.split(",")]
+        # Ultralytics export는 names를 "{0: 'Egg', 1: 'Tangerine'}" 형태로 메타데이터에 저장
+        names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        if names:
+            try:
+                parsed = ast.literal_eval(names)
+                if isinstance(parsed, dict):
+                    return [parsed[i] for i in sorted(parsed)]
+                return list(parsed)
+            except (ValueError, SyntaxError):
+                pass
+        return []
+
+    def warmup(self):
+        """
+        첫 요청 지연을 없애기 위해 빈 입력으로 1회 실행
+        """
+        self._run([np.zeros((3, self.input_size, self.input_size), dtype=np.float32)])
+
+    def _run(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        전처리된 프레임(CHW) 목록 추론 -> 프레임별 출력
+        (고정 배치 모델은 batch_size 단위로 나누고 마지막 묶음은 0으로 채운 뒤 채운 출력은 버림)
+        """
+        if self.batch_size is None:
+            return list(self.session.run(None, {self.input_name: np.stack(frames)})[0])
+
+        outputs = []
+        for start in range(0, len(frames), self.batch_size):
+            chunk = frames[start:start + self.batch_size]
+            batch = np.zeros((self.batch_size,) + chunk[0].shape, dtype=np.float32)
+            batch[:len(chunk)] = chunk
+            outputs.extend(self.session.run(None, {self.input_name: batch})[0][:len(chunk)])
+        return outputs
+
+    def detect(self, image: Union[str, bytes], confidence: float = DETECT_CONFIDENCE,
+               iou_threshold: float = DETECT_IOU) -> List[Dict]:
+        """
+        프레임 1장 감지 (이미지 경로, 메모리의 이미지 바이트 또는 PIL 이미지)
+
+        Returns:
+            Roboflow 형식 예측 목록 (원본 이미지 좌표, 중심 x/y + width/height)
+        """
+        return self.detect_batch([image], confidence, iou_threshold)[0]
+
+    def detect_batch(self, images: List[Union[str, bytes]], confidence: float = DETECT_CONFIDENCE,
+                     iou_threshold: float = DETECT_IOU) -> List[List[Dict]]:
+        """
+        여러 프레임 감지 (동적 배치 모델은 forward pass 1회, 고정 배치 모델은 batch_size 단위)
+
+        Returns:
+            프레임별 Roboflow 형식 예측 목록
+        """
+        inputs = [self._preprocess(image) for image in images]
+        outputs = self._run([pixels for pixels, _, _ in inputs])
+
+        return [
+            self._postprocess(output, scale, padding, confidence, iou_threshold)
+            for output, (_, scale, padding) in zip(outputs, inputs)
+        ]
+
+    def _preprocess(self, image):
+        from PIL import Image
+
+        # 분할 감지 타일은 이미 디코딩된 PIL 이미지
+        if isinstance(image, Image.Image):
+            return letterbox(image.convert("RGB"), self.input_size)
+        source = io.BytesIO(image) if isinstance(image, bytes) else image
+        with Image.open(source) as frame:
+            return letterbox(frame.convert("RGB"), self.input_size)
+
+    def _postprocess(self, output: np.ndarray, scale: float, padding, confidence: float,
+                     iou_threshold: float) -> List[Dict]:
+        pad_x, pad_y = padding
+        # (4 + 클래스 수, 후보 수) -> (후보 수, 4 + 클래스 수)
+        predictions = np.asarray(output, dtype=np.float32).T
+
+        class_scores = predictions[:, 4:]
+        class_ids = np.argmax(class_scores, axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        candidates = scores >= confidence
+        predictions, class_ids, scores = predictions[candidates], class_ids[candidates], scores[candidates]
+
+        # 레터박스 좌표 -> 원본 좌표
+        cx = (predictions[:, 0] - pad_x) / scale
+        cy = (predictions[:, 1] - pad_y) / scale
+        w = predictions[:, 2] / scale
+        h = predictions[:, 3] / scale
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        keep = nms(boxes, scores, class_ids, iou_threshold)
+        return [
+            {
+                "x": float(cx[i]),
+                "y": float(cy[i]),
+                "width": float(w[i]),
+                "height": float(h[i]),
+                "confidence": float(scores[i]),
+                "class": self.class_names[class_ids[i]] if class_ids[i] < len(self.class_names) else str(class_ids[i]),
+                "class_id": int(class_ids[i]),
+            }
+            for i in keep
+        ]
+
+
+_detector: Optional[OnnxYoloDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_object_detector() -> OnnxYoloDetector:
+    """
+    전역 로컬 감지기 조회 (최초 1회 로드)
+    """
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = OnnxYoloDetector()
+        return _detector
+
+
+def load_object_detector():
+    """
+    서버 시작 시 로컬 감지기 미리 로드 + 워밍업 (DETECT_BACKEND=onnx일 때만)
+    """
+    if DETECT_BACKEND != "onnx":
+        return
+    try:
+        get_object_detector().warmup()
+    except Exception as e:
+        print(f"[WARN] Detector ONNX model not loaded: {e}")
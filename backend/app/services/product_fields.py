@@ -0,0 +1,106 @@
+"""
+제품 목록 응답 직렬화
+- ?fields=qcode,name,image_path,current_stock 처럼 필요한 필드만 요청 (sparse fieldset)
+- 요청 필드의 컬럼만 SELECT (ORM 객체 생성 없이 행 튜플로 조회) 후 행 튜플 -> dict
+- 목록 응답은 orjson으로 바로 직렬화 (datetime 포함, jsonable_encoder 재귀 변환 생략 / 미설치 시 기본 JSON)
+- 필드 이름/값 형식은 Product.to_dict()와 동일
+  (image_path는 저장 시 계산해 둔 상대 URL 컬럼 image_url, 날짜는 ISO 문자열)
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Engine, bindparam, inspect, text, update
+
+from app.models.product import Product, to_image_url
+
+# 응답 필드 -> 조회 컬럼 (응답 필드 이름이 컬럼과 다른 경우)
+FIELD_COLUMNS = {"image_path": "image_url"}
+
+# to_dict() 필드 (products 테이블 컬럼, 응답 전용 image_url 컬럼 제외)
+PRODUCT_FIELDS = tuple(
+    column.key for column in Product.__table__.columns if column.key not in FIELD_COLUMNS.values()
+)
+
+
+def init_product_image_urls(engine: Engine) -> int:
+    """
+    image_url 컬럼 추가 (기존 DB) + 값이 없는 제품 채우기 (ORM 밖에서 추가된 행 포함)
+
+    Returns:
+        채운 제품 수
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("products")}
+    with engine.begin() as conn:
+        if "image_url" not in columns:
+            conn.execute(text("ALTER TABLE products ADD COLUMN image_url VARCHAR"))
+            print("[OK] Added products.image_url column")
+
+        rows = conn.execute(
+            Product.__table__.select()
+            .with_only_columns(Product.id, Product.image_path)
+            .where(Product.image_url.is_(None), Product.image_path.is_not(None))
+        ).all()
+        if rows:
+            conn.execute(
+                update(Product.__table__).where(Product.__table__.c.id == bindparam("pid")),
+                [{"pid": row.id, "image_url": to_image_url(row.image_path)} for row in rows]
+            )
+            print(f"[OK] Stored image URLs for {len(rows)} products")
+    return len(rows)
+
+
+def parse_fields(fields: Optional[str], extra: Iterable[str] = ()) -> Optional[List[str]]:
+    """
+    fields 파라미터 파싱 (쉼표 구분, 순서 유지, 중복 제거)
+
+    Args:
+        fields: 요청 필드 목록 문자열 (None/빈 문자열이면 전체 필드)
+        extra: 엔드포인트가 계산해서 붙이는 필드 (예: stock_status)
+
+    Returns:
+        필드 이름 목록, 전체 필드면 None
+
+    Raises:
+        ValueError: 알 수 없는 필드
+    """
+    if not fields or not fields.strip():
+        return None
+
+    allowed = set(PRODUCT_FIELDS) | set(extra)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names or None
+
+
+def field_columns(fields: Optional[List[str]], required: Iterable[str] = ("id",)) -> list:
+    """
+    필드 목록 -> SELECT할 Product 컬럼 (None이면 전체 필드)
+    요청 필드 순서대로, 없는 required 컬럼(예: 커서용 id)은 뒤에 추가
+    """
+    names = list(PRODUCT_FIELDS if fields is None else [name for name in fields if name in PRODUCT_FIELDS])
+    names += [name for name in required if name not in names]
+    return [getattr(Product, FIELD_COLUMNS.get(name, name)).label(name) for name in names]
+
+
+def rows_to_dicts(rows, fields: Optional[List[str]]) -> List[Dict]:
+    """
+    field_columns()로 조회한 행 튜플 -> 요청 필드 dict 목록 (required 컬럼은 제외)
+    계산 필드(stock_status 등)는 None 자리만 두고 호출자가 채움
+    """
+    names = list(PRODUCT_FIELDS if fields is None else fields)
+    if all(name in PRODUCT_FIELDS for name in names):
+        return [dict(zip(names, row)) for row in rows]
+    return [{name: getattr(row, name, None) for name in names} for row in rows]
+
+
+def json_response(payload: Dict):
+    """
+    목록 응답 (orjson 설치 시 바로 바이트로 직렬화, 아니면 dict 그대로 반환해 FastAPI 기본 JSON)
+    """
+    try:
+        from fastapi.responses import ORJSONResponse
+        import orjson  # noqa: F401
+    except ImportError:
+        return payload
+    return ORJSONResponse(payload)
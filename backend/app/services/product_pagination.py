@@ -0,0 +1,163 @@
+"""
+제품 목록 페이지네이션
+- 커서(keyset) 페이지: 마지막 행의 정렬 키 다음부터 조회 (OFFSET처럼 앞 페이지를 건너뛰며 스캔하지 않음)
+  - 검색 없음/LIKE 검색: (id) 커서, id 순
+  - FTS5 검색: (BM25 점수, id) 커서, 관련도 순
+  - 커서는 불투명 문자열 (base64url JSON), 응답의 next_cursor를 다음 요청에 그대로 전달
+- 필터별 전체 개수(total) 캐시: 제품 등록/수정/삭제 시 무효화 (+ TTL로 외부 스크립트 변경 반영)
+
+설정 (.env):
+- PRODUCT_TOTAL_CACHE_SIZE: 캐시할 필터 조합 수 (기본 256)
+- PRODUCT_TOTAL_CACHE_TTL: 캐시 유효 시간(초) (기본 300, 0이면 쓰기 무효화만 사용)
+"""
+import os
+import json
+import time
+import base64
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from app.models.product import Product
+
+load_dotenv()
+
+PRODUCT_TOTAL_CACHE_SIZE = int(os.getenv("PRODUCT_TOTAL_CACHE_SIZE", "256"))
+PRODUCT_TOTAL_CACHE_TTL = float(os.getenv("PRODUCT_TOTAL_CACHE_TTL", "300"))
+
+TOTAL_MODES = ("cached", "exact", "none")
+
+_totals: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+_totals_lock = threading.Lock()
+_generation = 0  # 무효화할 때마다 증가 (COUNT 도중 무효화된 결과는 캐시하지 않음)
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+}
+
+
+def encode_cursor(last_id: int, rank: Optional[float] = None) -> str:
+    """
+    마지막 행 정렬 키 -> 커서 문자열
+    """
+    key = [last_id] if rank is None else [rank, last_id]
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, Optional[float]]:
+    """
+    커서 문자열 -> (마지막 id, 마지막 BM25 점수 또는 None)
+
+    Raises:
+        ValueError: 잘못된 커서
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+        if len(key) == 1:
+            return int(key[0]), None
+        if len(key) == 2:
+            return int(key[1]), float(key[0])
+    except Exception:
+        pass
+    raise ValueError("Invalid cursor")
+
+
+def paginate_products(query: Query, limit: int, cursor: Optional[str] = None,
+                      skip: int = 0, rank=None) -> Tuple[list, Optional[str]]:
+    """
+    제품 목록 한 페이지 조회
+
+    Args:
+        query: 필터를 적용한 Product 컬럼 쿼리 (field_columns(), id 컬럼 포함)
+        limit: 페이지 크기
+        cursor: 이전 응답의 next_cursor (있으면 skip 무시)
+        skip: OFFSET (커서 없이 호출하는 기존 방식)
+        rank: FTS5 검색 시 BM25 점수 컬럼 (apply_product_search 반환값)
+
+    Returns:
+        (제품 컬럼 행 목록 - 검색 시 끝에 search_rank 추가, 다음 페이지 커서 - 마지막 페이지면 None)
+
+    Raises:
+        ValueError: 잘못된 커서 / 정렬 방식과 맞지 않는 커서
+    """
+    if rank is None:
+        query = query.order_by(Product.id)
+    else:
+        query = query.add_columns(rank.label("search_rank"))
+
+    if cursor:
+        last_id, last_rank = decode_cursor(cursor)
+        if rank is None:
+            if last_rank is not None:
+                raise ValueError("Cursor does not match this query (search changed)")
+            query = query.filter(Product.id > last_id)
+        else:
+            if last_rank is None:
+                raise ValueError("Cursor does not match this query (search changed)")
+            query = query.filter(or_(rank > last_rank, and_(rank == last_rank, Product.id > last_id)))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.limit(limit).all()
+
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last_rank = rows[-1].search_rank if rank is not None else None
+        next_cursor = encode_cursor(rows[-1].id, last_rank)
+    return rows, next_cursor
+
+
+def count_products(query: Query, key: Hashable, mode: str = "cached") -> Optional[int]:
+    """
+    필터 조건의 전체 제품 수
+
+    Args:
+        query: 필터를 적용한 Product 쿼리 (페이지/정렬 적용 전)
+        key: 필터 조합 (캐시 키)
+        mode: "cached" (캐시 사용) | "exact" (항상 COUNT) | "none" (세지 않음)
+    """
+    if mode == "none":
+        return None
+
+    now = time.monotonic()
+    with _totals_lock:
+        generation = _generation
+    if mode == "cached":
+        with _totals_lock:
+            entry = _totals.get(key)
+            if entry is not None and (PRODUCT_TOTAL_CACHE_TTL <= 0 or now - entry[1] < PRODUCT_TOTAL_CACHE_TTL):
+                _totals.move_to_end(key)
+                _stats["hits"] += 1
+                return entry[0]
+            _stats["misses"] += 1
+
+    total = query.order_by(None).count()
+    with _totals_lock:
+        if generation == _generation:
+            _totals[key] = (total, now)
+            _totals.move_to_end(key)
+            while len(_totals) > PRODUCT_TOTAL_CACHE_SIZE:
+                _totals.popitem(last=False)
+    return total
+
+
+def invalidate_product_totals():
+    """
+    제품 등록/수정/삭제 후 호출 (캐시된 전체 개수 폐기)
+    """
+    global _generation
+    with _totals_lock:
+        _generation += 1
+        _totals.clear()
+        _stats["invalidations"] += 1
+
+
+def get_product_total_cache_stats() -> Dict:
+    with _totals_lock:
+        return {**_stats, "entries": len(_totals)}
@@ -0,0 +1,159 @@
+"""
+제품 전문 검색 (SQLite FTS5)
+- products 테이블의 검색 컬럼을 FTS5 외부 콘텐츠 테이블(products_fts)로 색인
+- trigram 토크나이저: 띄어쓰기/형태소와 무관하게 3글자 이상 부분 문자열 일치 (한글 제품명/규격 검색에 적합)
+- products INSERT/UPDATE/DELETE 트리거로 자동 동기화 (재고 등 검색과 무관한 컬럼 변경 시에는 갱신 안 함)
+- 검색 결과는 BM25 점수 순 (컬럼별 가중치: 제품명 > Q-CODE > 모델명/엔투비품번 > ...)
+- 3글자 미만 검색어(예: "볼트")는 trigram으로 찾을 수 없어 LIKE로 처리
+"""
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Engine, literal_column, or_, select, table, text
+from sqlalchemy.orm import Query
+
+from app.models.product import Product
+
+FTS_TABLE = "products_fts"
+
+# 검색 컬럼과 BM25 가중치
+SEARCH_COLUMNS = (
+    ("name", 10.0),
+    ("qcode", 8.0),
+    ("model_name", 5.0),
+    ("n2b_product_code", 5.0),
+    ("standard_name", 4.0),
+    ("manufacturer", 3.0),
+    ("material", 2.0),
+    ("specs", 1.0),
+    ("description", 1.0),
+)
+
+TRIGRAM_MIN_LENGTH = 3
+
+_fts_available = False
+
+
+def _column_list(prefix: str = "") -> str:
+    return ", ".join(f"{prefix}{column}" for column, _ in SEARCH_COLUMNS)
+
+
+def init_product_search(engine: Engine) -> bool:
+    """
+    FTS5 색인 테이블 + 동기화 트리거 생성 (없을 때만), 새로 만들었으면 기존 제품 전체 색인
+
+    Returns:
+        FTS5 사용 가능 여부 (SQLite가 아니거나 trigram 미지원이면 LIKE 검색 유지)
+    """
+    global _fts_available
+    if engine.dialect.name != "sqlite":
+        return False
+
+    columns = _column_list()
+    new_columns = _column_list("new.")
+    old_columns = _column_list("old.")
+    statements = [
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_columns});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON products BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_columns});
+        END""",
+    ]
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+            if not exists:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, "
+                    f"content='products', content_rowid='id', tokenize='trigram')"
+                ))
+            for statement in statements:
+                conn.execute(text(statement))
+            if not exists:
+                # 기존 제품 전체 색인
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                print(f"[OK] Product full-text index created ({FTS_TABLE}, trigram)")
+        _fts_available = True
+    except Exception as e:
+        print(f"[WARN] FTS5 product search unavailable, using LIKE search: {e}")
+        _fts_available = False
+    return _fts_available
+
+
+def rebuild_product_search(engine: Engine):
+    """
+    FTS5 색인 전체 재구성 (트리거 밖에서 products를 직접 수정한 경우)
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def split_search_terms(search: str) -> Tuple[List[str], List[str]]:
+    """
+    검색어를 FTS 검색어(3글자 이상) / LIKE 검색어(3글자 미만)로 분리
+    """
+    terms = [term for term in re.split(r"\s+", search.strip()) if term]
+    fts_terms = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+    like_terms = [term for term in terms if len(term) < TRIGRAM_MIN_LENGTH]
+    return fts_terms, like_terms
+
+
+def build_match_query(terms: List[str]) -> str:
+    """
+    FTS5 MATCH 식 (검색어마다 구문 검색, 모두 포함해야 일치)
+    """
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_filter(term: str):
+    pattern = f"%{term}%"
+    return or_(*(getattr(Product, column).like(pattern) for column, _ in SEARCH_COLUMNS))
+
+
+def apply_product_search(query: Query, search: Optional[str]):
+    """
+    제품 목록 쿼리에 검색 조건 적용
+
+    - FTS5 사용 가능: 3글자 이상 검색어는 products_fts MATCH로 찾고 BM25 순 정렬
+    - 3글자 미만 검색어 / FTS5 미지원: 검색 컬럼 LIKE
+    - 검색어가 여러 개면 모두 포함하는 제품만
+
+    Returns:
+        (검색 조건을 적용한 쿼리, BM25 점수 컬럼 - FTS5로 정렬하지 않으면 None)
+    """
+    if not search or not search.strip():
+        return query, None
+
+    fts_terms, like_terms = split_search_terms(search)
+    if not _fts_available:
+        like_terms, fts_terms = fts_terms + like_terms, []
+
+    for term in like_terms:
+        query = query.filter(_like_filter(term))
+
+    if fts_terms:
+        weights = ", ".join(str(weight) for _, weight in SEARCH_COLUMNS)
+        fts = table(FTS_TABLE)
+        matches = (
+            select(
+                literal_column("rowid").label("rowid"),
+                literal_column(f"bm25({FTS_TABLE}, {weights})").label("rank")
+            )
+            .select_from(fts)
+            .where(literal_column(FTS_TABLE).op("MATCH")(build_match_query(fts_terms)))
+            .subquery()
+        )
+        # BM25는 점수가 낮을수록 관련도 높음
+        query = query.join(matches, Product.id == matches.c.rowid).order_by(matches.c.rank, Product.id)
+        return query, matches.c.rank
+
+    return query, None
@@ -0,0 +1,175 @@
+"""
+쿼리 이미지 임베딩 캐시
+- 업로드 이미지 내용(SHA-256) 기준으로 쿼리 임베딩 재사용 (같은 사진 재업로드 시 원격 호출 생략)
+- 메모리 LRU + 디스크(.npy) 2단계, 서버 재시작 후에도 디스크 캐시 유지
+- 임베딩 모델별로 분리 저장
+- 메모리/디스크 적중, 미스 횟수 기록
+
+설정 (.env):
+- QUERY_CACHE_SIZE: 메모리 LRU 항목 수 (기본 256)
+- QUERY_CACHE_DIR: 디스크 캐시 폴더 (기본 cache/query_embeddings)
+- QUERY_CACHE_DISK_ENABLED: "true" (기본) | "false"
+"""
+import os
+import re
+import asyncio
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+from app.services.clip_encoder import get_embedding_model_name
+from app.services.embedding_store import compute_image_hash
+from app.services.roboflow_service import get_clip_embedding, get_clip_embedding_async
+
+load_dotenv()
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", os.path.join("cache", "query_embeddings"))
+QUERY_CACHE_DISK_ENABLED = os.getenv("QUERY_CACHE_DISK_ENABLED", "true").lower() == "true"
+
+_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+}
+
+
+def _disk_path(image_hash: str, model: str) -> str:
+    model_dir = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+    return os.path.join(QUERY_CACHE_DIR, model_dir, f"{image_hash}.npy")
+
+
+def _remember(key: str, vector: np.ndarray):
+    with _cache_lock:
+        _cache[key] = vector
+        _cache.move_to_end(key)
+        while len(_cache) > QUERY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _load_from_disk(path: str) -> Optional[np.ndarray]:
+    if not QUERY_CACHE_DISK_ENABLED or not os.path.exists(path):
+        return None
+    try:
+        return np.load(path).astype(np.float32)
+    except Exception as e:
+        print(f"    [WARN] Ignoring unreadable query cache entry {path}: {e}")
+        return None
+
+
+def _save_to_disk(path: str, vector: np.ndarray):
+    if not QUERY_CACHE_DISK_ENABLED:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, vector)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"    [WARN] Query cache write failed: {e}")
+
+
+def get_query_embedding(image_path: str) -> Dict:
+    """
+    쿼리 이미지 임베딩 조회 (메모리 -> 디스크 -> 인코딩 순)
+
+    Args:
+        image_path: 업로드 이미지 경로
+
+    Returns:
+        {
+            "embedding": numpy array,
+            "image_hash": "ab12...",
+            "cache": "memory" | "disk" | "miss"
+        }
+    """
+    cached, key, path = _lookup(image_path)
+    if cached is not None:
+        return cached
+
+    vector = np.asarray(get_clip_embedding(image_path), dtype=np.float32).reshape(-1)
+    return _store(key, path, vector)
+
+
+async def get_query_embedding_async(image_path: str) -> Dict:
+    """
+    get_query_embedding()의 비동기 버전 (캐시 조회는 스레드, 미스 시 인코딩은 await)
+    """
+    cached, key, path = await asyncio.to_thread(_lookup, image_path)
+    if cached is not None:
+        return cached
+
+    vector = np.asarray(await get_clip_embedding_async(image_path), dtype=np.float32).reshape(-1)
+    return await asyncio.to_thread(_store, key, path, vector)
+
+
+def _lookup(image_path: str):
+    """
+    메모리 -> 디스크 순으로 조회
+
+    Returns:
+        (적중 시 결과 dict 또는 None, 캐시 키, 디스크 경로)
+    """
+    model = get_embedding_model_name()
+    image_hash = compute_image_hash(image_path)
+    key = f"{model}:{image_hash}"
+
+    with _cache_lock:
+        vector = _cache.get(key)
+        if vector is not None:
+            _cache.move_to_end(key)
+            _stats["memory_hits"] += 1
+    if vector is not None:
+        print(f"    [QUERY CACHE] memory hit {image_hash[:12]}")
+        return {"embedding": vector, "image_hash": image_hash, "cache": "memory"}, key, None
+
+    path = _disk_path(image_hash, model)
+    vector = _load_from_disk(path)
+    if vector is not None:
+        _remember(key, vector)
+        with _cache_lock:
+            _stats["disk_hits"] += 1
+        print(f"    [QUERY CACHE] disk hit {image_hash[:12]}")
+        return {"embedding": vector, "image_hash": image_hash, "cache": "disk"}, key, path
+    return None, key, path
+
+
+def _store(key: str, path: str, vector: np.ndarray) -> Dict:
+    """
+    새로 인코딩한 임베딩을 메모리/디스크에 저장
+    """
+    image_hash = key.rsplit(":", 1)[1]
+    _remember(key, vector)
+    _save_to_disk(path, vector)
+    with _cache_lock:
+        _stats["misses"] += 1
+    print(f"    [QUERY CACHE] miss {image_hash[:12]}")
+    return {"embedding": vector, "image_hash": image_hash, "cache": "miss"}
+
+
+def get_query_cache_stats() -> Dict:
+    """
+    쿼리 캐시 누적 통계
+    """
+    with _cache_lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_cache)
+    stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+    return stats
+
+
+def clear_query_cache(disk: bool = False):
+    """
+    메모리 캐시 비우기 (disk=True면 디스크 캐시도 삭제)
+    """
+    with _cache_lock:
+        _cache.clear()
+    if disk and os.path.isdir(QUERY_CACHE_DIR):
+        import shutil
+        shutil.rmtree(QUERY_CACHE_DIR, ignore_errors=True)
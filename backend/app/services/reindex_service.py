@@ -0,0 +1,254 @@
+"""
+카탈로그 임베딩 재색인 작업
+- 전체 제품 뷰 이미지를 제한된 수의 워커로 동시에 임베딩 (공용 HTTP 커넥션 풀 사용)
+- 이미 저장된 이미지(내용 해시 기준)는 건너뜀
+- 배치마다 DB 커밋 + 체크포인트 기록 → 중단 후 다시 실행하면 남은 이미지만 처리
+- 처리량(images/sec) 기록
+
+설정 (.env):
+- REINDEX_WORKERS: 동시 워커 수 (기본 8)
+- REINDEX_CHECKPOINT_PATH: 체크포인트 파일 (기본 cache/reindex_checkpoint.json)
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+from app.database import SessionLocal
+from app.models.product import Product
+from app.models.embedding import ProductEmbedding
+from app.services.embedding_store import (
+    EMBEDDING_MODEL,
+    compute_image_hash,
+    list_product_views,
+    new_embedding_row,
+    sync_product_embeddings
+)
+from app.services.roboflow_service import get_clip_embeddings, get_clip_batch_size
+
+load_dotenv()
+
+REINDEX_WORKERS = int(os.getenv("REINDEX_WORKERS", "8"))
+REINDEX_CHECKPOINT_PATH = os.getenv("REINDEX_CHECKPOINT_PATH", os.path.join("cache", "reindex_checkpoint.json"))
+
+_job: Dict = {"status": "idle"}
+_job_lock = threading.Lock()
+
+
+def get_reindex_status() -> Dict:
+    """
+    현재(또는 마지막) 재색인 작업 상태
+    """
+    with _job_lock:
+        return dict(_job)
+
+
+def _update_job(**fields):
+    with _job_lock:
+        _job.update(fields)
+
+
+def _load_checkpoint(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable reindex checkpoint: {e}")
+        return {}
+    if checkpoint.get("model") != EMBEDDING_MODEL:
+        return {}
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: Dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_reindex(
+    workers: int = REINDEX_WORKERS,
+    resume: bool = True,
+    retry_failed: bool = True,
+    checkpoint_path: str = REINDEX_CHECKPOINT_PATH
+) -> Dict:
+    """
+    전체 카탈로그 임베딩 재색인
+
+    Args:
+        workers: 동시 임베딩 워커 수
+        resume: 체크포인트의 이전 진행 상황 이어받기
+        retry_failed: 이전 실행에서 실패한 이미지 재시도 여부
+        checkpoint_path: 체크포인트 파일 경로
+
+    Returns:
+        작업 결과 (get_reindex_status()와 같은 형식)
+    """
+    if _claim_job(workers) is None:
+        raise Exception("Reindex job is already running")
+    return _run_claimed_job(workers, resume, retry_failed, checkpoint_path)
+
+
+def _claim_job(workers: int) -> Optional[Dict]:
+    """
+    작업 상태를 "running"으로 초기화 (확인 + 설정을 락 안에서 한 번에, 이미 실행 중이면 None)
+    """
+    with _job_lock:
+        if _job.get("status") == "running":
+            return None
+        _job.clear()
+        _job.update({
+            "status": "running",
+            "model": EMBEDDING_MODEL,
+            "workers": workers,
+            "started_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "total_images": 0,
+            "skipped_images": 0,
+            "embedded_images": 0,
+            "failed_images": 0,
+            "images_per_second": 0.0,
+            "synced_products": 0,
+            "error": None,
+        })
+        return dict(_job)
+
+
+def _run_claimed_job(workers: int, resume: bool, retry_failed: bool, checkpoint_path: str) -> Dict:
+    """
+    _claim_job()으로 상태를 잡은 뒤 실제 재색인 수행
+    """
+    checkpoint = _load_checkpoint(checkpoint_path) if resume else {}
+    failed: Dict[str, str] = checkpoint.get("failed", {})
+    if checkpoint:
+        print(f"[*] Resuming reindex: {checkpoint.get('embedded_images', 0)} images embedded previously, "
+              f"{len(failed)} failed")
+    checkpoint = {
+        "model": EMBEDDING_MODEL,
+        "started_at": _job["started_at"],
+        "embedded_images": checkpoint.get("embedded_images", 0),
+        "failed": failed,
+    }
+
+    db = SessionLocal()
+    try:
+        products = db.query(Product).filter(Product.image_path.isnot(None)).all()
+        views = [(product.qcode, path) for product in products for path in list_product_views(product)]
+        _update_job(total_products=len(products), total_images=len(views))
+        print(f"[*] Reindex: {len(products)} products, {len(views)} view images, {workers} workers")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 1. 이미지 내용 해시 (파일 I/O 병렬 처리)
+            paths = [path for _, path in views]
+            hashes = dict(zip(paths, executor.map(compute_image_hash, paths)))
+
+            # 2. 저장되지 않은 이미지만 선택 (같은 내용은 1번만 임베딩)
+            stored = {
+                image_hash for (image_hash,) in db.query(ProductEmbedding.image_hash)
+                .filter(ProductEmbedding.model == EMBEDDING_MODEL)
+                .distinct()
+            }
+            pending: Dict[str, tuple] = {}
+            for qcode, path in views:
+                image_hash = hashes[path]
+                if image_hash in stored or image_hash in pending:
+                    continue
+                if not retry_failed and path in failed:
+                    continue
+                pending[image_hash] = (qcode, path)
+
+            skipped = len(views) - len(pending)
+            _update_job(skipped_images=skipped)
+            print(f"    Already indexed: {skipped}, to embed: {len(pending)}")
+
+            # 3. 배치 단위 동시 임베딩, 완료되는 대로 커밋 + 체크포인트
+            items = list(pending.items())
+            batch_size = get_clip_batch_size()
+            batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+            futures = {
+                executor.submit(get_clip_embeddings, [path for _, (_, path) in batch]): batch
+                for batch in batches
+            }
+
+            start = time.perf_counter()
+            embedded = 0
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    for _, (_, path) in batch:
+                        failed[path] = str(e)
+                    print(f"    [ERROR] Embedding batch failed: {e}")
+                else:
+                    for (image_hash, (qcode, path)), vector in zip(batch, vectors):
+                        db.add(new_embedding_row(qcode, path, image_hash, vector))
+                        failed.pop(path, None)
+                    db.commit()
+                    embedded += len(batch)
+                    checkpoint["embedded_images"] += len(batch)
+
+                elapsed = time.perf_counter() - start
+                rate = embedded / elapsed if elapsed > 0 else 0.0
+                checkpoint["updated_at"] = datetime.utcnow().isoformat()
+                _save_checkpoint(checkpoint_path, checkpoint)
+                _update_job(
+                    embedded_images=embedded,
+                    failed_images=len(failed),
+                    images_per_second=round(rate, 2)
+                )
+                print(f"    [{embedded + len(failed)}/{len(items)}] {rate:.1f} images/sec")
+
+        # 4. 제품별 동기화 (추가 인코딩 없음): 오래된 임베딩 정리 + 유사도 인덱스 갱신
+        synced = 0
+        for product in products:
+            try:
+                if sync_product_embeddings(db, product, embed_missing=False):
+                    synced += 1
+            except Exception as e:
+                db.rollback()
+                print(f"    [ERROR] Sync {product.qcode}: {e}")
+
+        _update_job(
+            status="completed",
+            synced_products=synced,
+            finished_at=datetime.utcnow().isoformat()
+        )
+        print(f"[OK] Reindex complete: {embedded} embedded, {len(failed)} failed, {synced} products synced")
+
+    except Exception as e:
+        db.rollback()
+        _update_job(status="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+        print(f"[ERROR] run_reindex: {e}")
+    finally:
+        db.close()
+
+    return get_reindex_status()
+
+
+def start_reindex_background(workers: int = REINDEX_WORKERS, resume: bool = True) -> Optional[Dict]:
+    """
+    재색인 작업을 백그라운드 스레드로 시작
+
+    Returns:
+        시작 시점 상태, 이미 실행 중이면 None
+    """
+    state = _claim_job(workers)
+    if state is None:
+        return None
+    thread = threading.Thread(
+        target=_run_claimed_job,
+        args=(workers, resume, True, REINDEX_CHECKPOINT_PATH),
+        name="catalog-reindex",
+        daemon=True
+    )
+    thread.start()
+    return state
@@ -0,0 +1,121 @@
+"""
+폴링 조회 응답 캐시 + ETag (조건부 GET)
+- 전역 데이터 버전: 제품/재고를 쓰는 곳에서 bump_data_version() 호출
+- 같은 요청(경로 + 파라미터)은 데이터 버전이 그대로면 직렬화해 둔 응답 바이트를 재사용 (DB 조회/직렬화 생략)
+- ETag: 응답 바이트 해시 (strong), If-None-Match가 일치하면 본문 없이 304
+- Cache-Control: no-cache -> 브라우저가 캐시한 응답을 매번 ETag로 재검증 (프론트엔드 fetch 수정 불필요)
+- TTL이 지나면 다시 만들어 비교 (서버 밖 스크립트가 DB를 바꾼 경우 반영, 내용이 같으면 ETag 유지)
+
+설정 (.env):
+- RESPONSE_CACHE_SIZE: 캐시할 요청 수 (기본 64)
+- RESPONSE_CACHE_TTL: 캐시 유효 시간(초) (기본 60, 0이면 데이터 버전만으로 판단)
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+from dotenv import load_dotenv
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+load_dotenv()
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "64"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+_data_version = 0
+_cache: "OrderedDict[Hashable, Dict]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def bump_data_version() -> int:
+    """
+    제품/재고 쓰기 후 호출 (캐시된 조회 응답 무효화)
+    """
+    global _data_version
+    with _lock:
+        _data_version += 1
+        return _data_version
+
+
+def get_data_version() -> int:
+    return _data_version
+
+
+def encode_json(payload: Dict) -> bytes:
+    """
+    응답 JSON 바이트 (orjson 설치 시 orjson, 아니면 FastAPI 기본과 같은 json.dumps)
+    """
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match 헤더에 ETag가 있는지 (여러 개/W/ 접두사/* 허용)
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _lookup(key: Hashable, version: int, now: float) -> Optional[Dict]:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        _cache.move_to_end(key)
+        if entry["version"] != version:
+            return None
+        if RESPONSE_CACHE_TTL > 0 and now - entry["built_at"] >= RESPONSE_CACHE_TTL:
+            return None
+        return entry
+
+
+def _store(key: Hashable, version: int, now: float, body: bytes) -> Dict:
+    entry = {
+        "version": version,
+        "built_at": now,
+        "body": body,
+        "etag": '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+    }
+    with _lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > RESPONSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+
+def cached_json_response(key: Hashable, build: Callable[[], Dict], if_none_match: Optional[str] = None) -> Response:
+    """
+    캐시/ETag를 적용한 JSON 응답
+
+    Args:
+        key: 요청 식별 키 (경로 + 응답에 영향을 주는 파라미터)
+        build: 응답 dict를 만드는 함수 (캐시 미스일 때만 호출)
+        if_none_match: 요청의 If-None-Match 헤더
+
+    Returns:
+        304 (ETag 일치) 또는 200 JSON 응답 (ETag, X-Cache: hit/miss 헤더 포함)
+    """
+    # 응답을 만들기 전 버전으로 저장 (만드는 도중 쓰기가 있으면 다음 요청에서 다시 만듦)
+    version = get_data_version()
+    now = time.monotonic()
+    entry = _lookup(key, version, now)
+    cache_status = "hit"
+    if entry is None:
+        entry = _store(key, version, now, encode_json(build()))
+        cache_status = "miss"
+
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "X-Cache": cache_status}
+    if etag_matches(if_none_match, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
@@ -1,15 +1,37 @@
 """
 Roboflow 서비스
-- CLIP 기반 이미지 유사도 검색
-- Object Detection 기반 재고 카운트
+- CLIP 기반 이미지 유사도 검색 (CLIP_BACKEND=onnx이면 로컬 CPU 인코더 사용)
+- Object Detection 기반 재고 카운트 (DETECT_BACKEND=onnx이면 로컬 CPU YOLOv8 사용)
+  (DETECT_SLICED=true면 고해상도 프레임을 타일로 나눠 병렬 감지 후 병합, sliced_inference)
+- async 라우트용 비동기 API (*_async): 공용 httpx.AsyncClient로 이벤트 루프를 막지 않고 호출,
+  이미지 전처리/로컬 추론/DB 작업은 스레드에서 실행
+
+설정 (.env):
+- ROBOFLOW_POOL_SIZE: 커넥션 풀 크기 (기본 16)
+- ROBOFLOW_TIMEOUT: 요청 타임아웃 초 (기본 30)
+- ROBOFLOW_CONNECT_TIMEOUT: 연결 타임아웃 초 (기본 5, 비동기 클라이언트)
+- ROBOFLOW_INFERENCE_URL: Object Detection 엔드포인트 (기본 https://detect.roboflow.com, 자체 호스팅 inference 서버 사용 시 변경)
 """
+import io
 import os
+import asyncio
 import numpy as np
+import httpx
 import requests
 import base64
-from typing import List, Dict, Optional
+import threading
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional, Union
+from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
+from app.database import SessionLocal
+from app.models.product import Product
+from app.services.clip_encoder import CLIP_BACKEND, get_clip_encoder
+from app.services.object_detector import DETECT_BACKEND, get_object_detector
+from app.services.image_preprocess import prepare_image, CLIP_UPLOAD_SIZE, DETECT_INPUT_SIZE
+from app.services.sliced_inference import DETECT_SLICED, detect_sliced, detect_sliced_async, parallel_tiles
+
 load_dotenv()
 
 ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
@@ -18,18 +40,129 @@ ROBOFLOW_MODEL_ID = os.getenv("ROBOFLOW_MODEL_ID", "")  # Object Detection 모
 # Roboflow API 엔드포인트
 CLIP_EMBED_URL = "https://infer.roboflow.com/clip/embed_image"
 CLIP_COMPARE_URL = "https://infer.roboflow.com/clip/compare"
-INFERENCE_URL = "https://detect.roboflow.com"
+INFERENCE_URL = os.getenv("ROBOFLOW_INFERENCE_URL", "https://detect.roboflow.com").rstrip("/")
+
+# HTTP 커넥션 풀 (요청마다 TCP/TLS 연결을 새로 맺지 않도록 재사용)
+ROBOFLOW_POOL_SIZE = int(os.getenv("ROBOFLOW_POOL_SIZE", "16"))
+ROBOFLOW_TIMEOUT = float(os.getenv("ROBOFLOW_TIMEOUT", "30"))
+ROBOFLOW_CONNECT_TIMEOUT = float(os.getenv("ROBOFLOW_CONNECT_TIMEOUT", "5"))
+
+# 클래스 이름 매핑 (Roboflow 학습 시 사용한 이름 -> Q-CODE)
+CLASS_NAME_TO_QCODE = {
+    "Tangerine": "TANGERINE-001",  # 탄제린 (귤)
+    "Egg": "EGG-001",  # 계란
+    "Steel Plate": "STEEL-PLATE-001",  # 철판 (강판)
+    "Steel plate": "STEEL-PLATE-001",  # 철판 (대소문자 변형)
+    # 추가 매핑이 필요하면 여기에 추가:
+    # "Apple": "Q1208172",
+    # "Banana": "Q13425723",
+}
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    Roboflow 요청용 공용 HTTP 세션 (스레드 간 커넥션 풀 공유)
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=ROBOFLOW_POOL_SIZE,
+                pool_maxsize=ROBOFLOW_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Roboflow 요청용 공용 비동기 HTTP 클라이언트 (동시 요청 간 커넥션 풀 공유)
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ROBOFLOW_POOL_SIZE,
+                max_keepalive_connections=ROBOFLOW_POOL_SIZE
+            ),
+            timeout=httpx.Timeout(ROBOFLOW_TIMEOUT, connect=ROBOFLOW_CONNECT_TIMEOUT)
+        )
+    return _async_client
+
+
+async def close_async_http_client():
+    """
+    서버 종료 시 비동기 클라이언트 커넥션 정리
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
 
 
 def encode_image_to_base64(image_path: str) -> str:
     """
-    이미지를 Base64로 인코딩
+    이미지를 CLIP 입력 해상도로 축소/재인코딩 후 Base64로 인코딩
     """
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+    prepared = prepare_image(image_path, shortest_side=CLIP_UPLOAD_SIZE)
+    return base64.b64encode(prepared["data"]).decode("utf-8")
 
 
 def get_clip_embedding(image_path: str) -> np.ndarray:
+    """
+    이미지 CLIP 임베딩 생성
+    CLIP_BACKEND 설정에 따라 로컬 ONNX 인코더 또는 Roboflow CLIP API 사용
+
+    Args:
+        image_path: 이미지 파일 경로
+
+    Returns:
+        numpy array: CLIP 임베딩 벡터
+    """
+    if CLIP_BACKEND == "onnx":
+        return get_clip_encoder().encode([image_path])[0]
+    return get_clip_embedding_roboflow(image_path)
+
+
+def get_clip_embeddings(image_paths: List[str]) -> np.ndarray:
+    """
+    여러 이미지 CLIP 임베딩 생성 (로컬 ONNX는 배치 forward pass, Roboflow는 1장씩 호출)
+
+    Returns:
+        numpy array: (N, D) CLIP 임베딩
+    """
+    if CLIP_BACKEND == "onnx":
+        return get_clip_encoder().encode(image_paths)
+    return np.vstack([get_clip_embedding_roboflow(path) for path in image_paths])
+
+
+async def get_clip_embedding_async(image_path: str) -> np.ndarray:
+    """
+    get_clip_embedding()의 비동기 버전 (로컬 ONNX는 스레드에서 인코딩)
+    """
+    if CLIP_BACKEND == "onnx":
+        embeddings = await asyncio.to_thread(get_clip_encoder().encode, [image_path])
+        return embeddings[0]
+    return await get_clip_embedding_roboflow_async(image_path)
+
+
+def get_clip_batch_size() -> int:
+    """
+    한 번에 임베딩할 이미지 수 (Roboflow API는 요청당 1장)
+    """
+    if CLIP_BACKEND == "onnx":
+        return get_clip_encoder().batch_size
+    return 1
+
+
+def get_clip_embedding_roboflow(image_path: str) -> np.ndarray:
     """
     Roboflow CLIP API로 이미지 임베딩 생성
 
@@ -40,112 +173,105 @@ def get_clip_embedding(image_path: str) -> np.ndarray:
         numpy array: CLIP 임베딩 벡터
     """
     try:
-        # API 키 확인
-        if not ROBOFLOW_API_KEY:
-            raise Exception("ROBOFLOW_API_KEY not set in environment")
-
-        print(f"    Using API key: {ROBOFLOW_API_KEY[:10]}...")
-
-        # 이미지를 base64로 인코딩
-        image_base64 = encode_image_to_base64(image_path)
-        print(f"    Image encoded (base64 length: {len(image_base64)} chars)")
-
-        # JSON 페이로드 구성
-        payload = {
-            "image": {
-                "type": "base64",
-                "value": image_base64
-            }
-        }
+        payload = _clip_embed_payload(image_path)
 
         # API 요청
         print(f"    Sending request to: {CLIP_EMBED_URL}")
-        response = requests.post(
+        response = get_http_session().post(
             CLIP_EMBED_URL,
             params={"api_key": ROBOFLOW_API_KEY},
-            json=payload
+            json=payload,
+            timeout=ROBOFLOW_TIMEOUT
         )
+        return _parse_clip_response(response)
 
-        print(f"    Response status: {response.status_code}")
-        print(f"    Response body: {response.text[:200]}...")
+    except Exception as e:
+        print(f"[ERROR] get_clip_embedding_roboflow: {e}")
+        raise
 
-        if response.status_code != 200:
-            raise Exception(f"CLIP API error: {response.status_code} - {response.text}")
 
-        result = response.json()
+async def get_clip_embedding_roboflow_async(image_path: str) -> np.ndarray:
+    """
+    get_clip_embedding_roboflow()의 비동기 버전 (이미지 인코딩은 스레드, API 호출은 httpx)
+    """
+    try:
+        payload = await asyncio.to_thread(_clip_embed_payload, image_path)
 
-        # 임베딩 추출
-        if "embeddings" in result:
-            return np.array(result["embeddings"][0])  # 첫 번째 임베딩
-        else:
-            raise Exception(f"No embeddings in response: {result}")
+        print(f"    Sending request to: {CLIP_EMBED_URL} (async)")
+        response = await get_async_http_client().post(
+            CLIP_EMBED_URL,
+            params={"api_key": ROBOFLOW_API_KEY},
+            json=payload
+        )
+        return _parse_clip_response(response)
 
     except Exception as e:
-        print(f"[ERROR] get_clip_embedding: {e}")
+        print(f"[ERROR] get_clip_embedding_roboflow_async: {e!r}")
         raise
 
 
-def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
+def _clip_embed_payload(image_path: str) -> Dict:
     """
-    두 벡터 간 코사인 유사도 계산
-
-    Args:
-        vec1: 첫 번째 벡터
-        vec2: 두 번째 벡터
-
-    Returns:
-        float: 코사인 유사도 (0~1)
+    CLIP embed_image 요청 JSON 페이로드 (축소/재인코딩한 Base64 이미지)
     """
-    dot_product = np.dot(vec1, vec2)
-    norm1 = np.linalg.norm(vec1)
-    norm2 = np.linalg.norm(vec2)
-
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
+    # API 키 확인
+    if not ROBOFLOW_API_KEY:
+        raise Exception("ROBOFLOW_API_KEY not set in environment")
 
-    return float(dot_product / (norm1 * norm2))
+    print(f"    Using API key: {ROBOFLOW_API_KEY[:10]}...")
 
+    # 이미지를 base64로 인코딩
+    image_base64 = encode_image_to_base64(image_path)
+    print(f"    Image encoded (base64 length: {len(image_base64)} chars)")
 
-def convert_to_relative_path(image_path: str) -> str:
-    """
-    절대 경로를 프론트엔드용 상대 URL로 변환
+    return {
+        "image": {
+            "type": "base64",
+            "value": image_base64
+        }
+    }
 
-    Args:
-        image_path: 절대 경로
 
-    Returns:
-        str: 상대 URL 경로
+def _parse_clip_response(response) -> np.ndarray:
     """
-    if not image_path:
-        return image_path
+    CLIP embed_image 응답에서 임베딩 추출 (requests / httpx 응답 공용)
+    """
+    print(f"    Response status: {response.status_code}")
+    print(f"    Response body: {response.text[:200]}...")
 
-    # Convert Windows backslashes to forward slashes
-    image_url = image_path.replace("\\", "/")
+    if response.status_code != 200:
+        raise Exception(f"CLIP API error: {response.status_code} - {response.text}")
 
-    # Extract path after "product_list_picture/"
-    if "product_list_picture/" in image_url:
-        relative_path = image_url.split("product_list_picture/")[1]
-        return f"product_list_picture/{relative_path}"
-    # Extract path after "uploads/"
-    elif "uploads/" in image_url:
-        relative_path = image_url.split("uploads/")[1]
-        return f"uploads/{relative_path}"
+    result = response.json()
 
-    return image_url
+    # 임베딩 추출
+    if "embeddings" in result:
+        return np.array(result["embeddings"][0])  # 첫 번째 임베딩
+    else:
+        raise Exception(f"No embeddings in response: {result}")
 
 
 def search_similar_products_roboflow(
     query_image_path: str,
-    existing_products: List[Dict],
-    top_k: int = 5
+    db: Session,
+    top_k: int = 5,
+    filters: Optional[Dict] = None,
+    query_text: Optional[str] = None,
+    query: Optional[Dict] = None
 ) -> Dict:
     """
     Roboflow CLIP으로 유사 제품 검색
+    기존 제품 임베딩은 embedding_store에 저장된 값을 사용 (원격 호출은 쿼리 이미지 1회)
+    제품 정보는 상위 top_k 제품만 DB에서 조회
 
     Args:
         query_image_path: 신규 업로드 이미지 경로
-        existing_products: DB의 기존 제품 리스트 (dict 형태)
+        db: 데이터베이스 세션 (임베딩 저장소/제품 조회용)
         top_k: 반환할 상위 N개
+        filters: 메타데이터 필터 {"category", "manufacturer", "sourcing_group", "leaf_class"}
+                 (지정한 조건에 맞는 제품만 점수 계산)
+        query_text: 사용자 입력 제품명/스펙 (있으면 텍스트 TF-IDF 유사도와 가중 합산)
+        query: 미리 구한 쿼리 임베딩 (get_query_embedding() 결과, 없으면 여기서 생성)
 
     Returns:
         {
@@ -154,62 +280,65 @@ def search_similar_products_roboflow(
             "error": "..." (실패 시)
         }
     """
-    try:
-        print(f"[*] Roboflow CLIP: Generating embedding for query image...")
+    # embedding_store가 get_clip_embedding을 사용하므로 순환 import 방지
+    from app.services.embedding_store import EMBEDDING_MODEL
+    from app.services.similarity_index import get_similarity_index
+    from app.services.query_cache import get_query_embedding
+    from app.services.hybrid_search import rank_hybrid
 
-        # 1. 신규 이미지 임베딩 생성
-        query_embedding = get_clip_embedding(query_image_path)
-        print(f"    Query embedding shape: {query_embedding.shape}")
+    try:
+        print(f"[*] CLIP ({CLIP_BACKEND}): Generating embedding for query image...")
+
+        # 1. 신규 이미지 임베딩 생성 (같은 이미지는 쿼리 캐시에서 재사용)
+        if query is None:
+            query = get_query_embedding(query_image_path)
+        query_embedding = query["embedding"]
+        print(f"    Query embedding shape: {query_embedding.shape} (cache: {query['cache']})")
+
+        # 2. 저장된 임베딩 인덱스 조회 (임베딩 생성은 제품 등록/서버 시작 백필/재색인 작업에서만)
+        index = get_similarity_index(db, EMBEDDING_MODEL)
+        print(f"    Similarity index: {len(index)} view embeddings, {index.product_count} products ({index.mode})")
+
+        # 3. 인덱스 검색 (필터에 맞는 뷰만 한 번에 점수 계산 후 제품별 집계)
+        #    텍스트 입력이 있으면 전체 카탈로그 텍스트 유사도와 가중 합산
+        if query_text and query_text.strip():
+            ranked = rank_hybrid(db, index, query_embedding, query_text, top_k, filters=filters)
+        else:
+            ranked = [
+                (qcode, similarity, similarity, 0.0)
+                for qcode, similarity in index.search(query_embedding, top_k, filters=filters)
+            ]
+        if filters:
+            print(f"    Filters: {filters}")
+
+        # image_path는 저장된 프론트엔드용 상대 URL
+        ranked_qcodes = [qcode for qcode, *_ in ranked]
+        products_by_qcode = {
+            p.qcode: p.to_dict()
+            for p in db.query(Product).filter(Product.qcode.in_(ranked_qcodes)).all()
+        } if ranked_qcodes else {}
 
-        # 2. 각 기존 제품과 유사도 계산
         similarities = []
-
-        for idx, product in enumerate(existing_products):
-            # 제품 이미지가 없으면 스킵
-            if not product.get("image_path"):
+        for qcode, similarity, visual_similarity, text_similarity in ranked:
+            product = products_by_qcode.get(qcode)
+            if product is None:
                 continue
 
-            product_image_path = product["image_path"]
-            print(f"    [DEBUG] Checking {product.get('qcode', 'unknown')}: {product_image_path}")
+            # 제품 정보에 유사도 추가
+            product_with_score = product.copy()
+            product_with_score["similarity"] = float(similarity * 100)  # 퍼센트로 변환
+            product_with_score["visual_similarity"] = float(visual_similarity * 100)
+            product_with_score["text_similarity"] = float(text_similarity * 100)
 
-            if not os.path.exists(product_image_path):
-                print(f"    [SKIP] Product {product.get('qcode', 'unknown')}: image not found at {product_image_path}")
-                continue
-
-            try:
-                # 제품 이미지 임베딩 생성
-                product_embedding = get_clip_embedding(product["image_path"])
-
-                # 코사인 유사도 계산
-                similarity = cosine_similarity(query_embedding, product_embedding)
-
-                # 제품 정보에 유사도 추가
-                product_with_score = product.copy()
-                product_with_score["similarity"] = float(similarity * 100)  # 퍼센트로 변환
-                product_with_score["visual_similarity"] = float(similarity * 100)
-                product_with_score["text_similarity"] = 0
-
-                similarities.append(product_with_score)
-
-                print(f"    [{idx+1}/{len(existing_products)}] {product.get('qcode', 'unknown')}: {similarity*100:.1f}%")
-
-            except Exception as e:
-                print(f"    [ERROR] Processing product {product.get('qcode', 'unknown')}: {e}")
-                continue
-
-        # 3. 유사도 높은 순 정렬
-        similarities.sort(key=lambda x: x["similarity"], reverse=True)
-
-        # 4. 이미지 경로를 프론트엔드용 상대 경로로 변환
-        for product in similarities[:top_k]:
-            if product.get("image_path"):
-                product["image_path"] = convert_to_relative_path(product["image_path"])
+            similarities.append(product_with_score)
+            print(f"    {qcode}: {similarity*100:.1f}% (visual {visual_similarity*100:.1f}%, text {text_similarity*100:.1f}%)")
 
         print(f"[OK] Found {len(similarities)} similar products")
 
         return {
             "success": True,
-            "similar_products": similarities[:top_k]
+            "similar_products": similarities[:top_k],
+            "query_cache": query["cache"]
         }
 
     except Exception as e:
@@ -221,12 +350,188 @@ def search_similar_products_roboflow(
         }
 
 
-def detect_products_in_frame(image_path: str) -> Dict:
+def _search_in_own_session(
+    query_image_path: str,
+    top_k: int,
+    filters: Optional[Dict],
+    query_text: Optional[str],
+    query: Optional[Dict]
+) -> Dict:
+    """
+    워커 스레드 전용 세션으로 검색 (요청 세션은 스레드 간에 공유하지 않음)
+    """
+    db = SessionLocal()
+    try:
+        return search_similar_products_roboflow(query_image_path, db, top_k, filters, query_text, query)
+    finally:
+        db.close()
+
+
+async def search_similar_products_roboflow_async(
+    query_image_path: str,
+    top_k: int = 5,
+    filters: Optional[Dict] = None,
+    query_text: Optional[str] = None
+) -> Dict:
     """
-    Roboflow Object Detection으로 웹캠 프레임에서 Q-CODE 제품 감지 및 개수 카운트
+    search_similar_products_roboflow()의 비동기 버전
+    쿼리 임베딩(원격 호출)은 await, 인덱스 검색/DB 조회는 스레드에서 실행
+    (스레드 안에서 새 세션을 열어 사용하므로 요청 세션을 받지 않음)
+    """
+    from app.services.query_cache import get_query_embedding_async
+
+    try:
+        print(f"[*] CLIP ({CLIP_BACKEND}): Generating embedding for query image (async)...")
+        query = await get_query_embedding_async(query_image_path)
+    except Exception as e:
+        print(f"[ERROR] search_similar_products_roboflow_async: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "similar_products": []
+        }
+
+    return await asyncio.to_thread(
+        _search_in_own_session,
+        query_image_path, top_k, filters, query_text, query
+    )
+
+
+def _detect_request(image: Union[str, bytes]) -> Dict:
+    """
+    Roboflow Inference API 요청 구성 (모델 입력 해상도로 축소/재인코딩한 Multipart 파일)
+    """
+    # 모델 ID 확인
+    if not ROBOFLOW_MODEL_ID:
+        raise Exception("ROBOFLOW_MODEL_ID not set in .env. Please train a model first.")
+    if not ROBOFLOW_API_KEY:
+        raise Exception("ROBOFLOW_API_KEY not set in environment")
+
+    print(f"    Model ID: {ROBOFLOW_MODEL_ID}")
+
+    # Roboflow Inference API 호출 (Multipart 방식)
+    url = f"{INFERENCE_URL}/{ROBOFLOW_MODEL_ID}"
+    print(f"    Request URL: {url}")
+    print(f"    API Key: {ROBOFLOW_API_KEY[:10]}...{ROBOFLOW_API_KEY[-4:]}")
+    filename = "frame.jpg" if isinstance(image, bytes) else os.path.basename(image)
+    print(f"    Image: {filename if isinstance(image, bytes) else image}")
+
+    prepared = prepare_image(image, longest_side=DETECT_INPUT_SIZE)
+    return {
+        "url": url,
+        "params": {"api_key": ROBOFLOW_API_KEY},
+        "files": {"file": (filename, prepared["data"], prepared["mime_type"])},
+        "scale": prepared["scale"],
+    }
+
+
+def _parse_detect_response(response, scale: float) -> List[Dict]:
+    """
+    Inference API 응답에서 예측 추출 (requests / httpx 응답 공용)
+    축소된 이미지 기준 박스 좌표를 원본 프레임 좌표로 복원
+    """
+    print(f"    Response Status: {response.status_code}")
+    if response.status_code != 200:
+        print(f"    Response Body: {response.text}")
+        raise Exception(f"Inference API error: {response.status_code} - {response.text}")
+
+    result = response.json()
+    detections = result.get("predictions", [])
+
+    if scale != 1.0:
+        for detection in detections:
+            for key in ("x", "y", "width", "height"):
+                if detection.get(key) is not None:
+                    detection[key] = detection[key] / scale
+    return detections
+
+
+def detect_frame_roboflow(image: Union[str, bytes]) -> List[Dict]:
+    """
+    Roboflow Inference API로 프레임 감지 (이미지 경로 또는 메모리의 이미지 바이트)
+
+    Returns:
+        예측 목록 (원본 프레임 좌표)
+    """
+    request = _detect_request(image)
+    response = get_http_session().post(
+        request["url"],
+        params=request["params"],
+        files=request["files"],
+        timeout=ROBOFLOW_TIMEOUT
+    )
+    return _parse_detect_response(response, request["scale"])
+
+
+async def detect_frame_roboflow_async(image: Union[str, bytes]) -> List[Dict]:
+    """
+    detect_frame_roboflow()의 비동기 버전 (이미지 전처리는 스레드, API 호출은 httpx)
+    """
+    request = await asyncio.to_thread(_detect_request, image)
+    response = await get_async_http_client().post(
+        request["url"],
+        params=request["params"],
+        files=request["files"]
+    )
+    return _parse_detect_response(response, request["scale"])
+
+
+def _tile_bytes(tile) -> bytes:
+    """
+    분할 감지 타일(PIL 이미지)을 API 업로드용 JPEG로 인코딩
+    """
+    buffer = io.BytesIO()
+    tile.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def _detect_tiles(tiles: list) -> List[List[Dict]]:
+    """
+    분할 감지 타일 목록 감지
+    (배치 지원 ONNX 모델은 forward pass 1회, 그 외 ONNX는 코어 수만큼 스레드 병렬, Roboflow는 동시 요청)
+    """
+    if DETECT_BACKEND == "onnx":
+        detector = get_object_detector()
+        if detector.supports_batch:
+            return detector.detect_batch(tiles)
+        return parallel_tiles(detector.detect)(tiles)
+    return parallel_tiles(lambda tile: detect_frame_roboflow(_tile_bytes(tile)))(tiles)
+
+
+async def _detect_tile_async(tile) -> List[Dict]:
+    data = await asyncio.to_thread(_tile_bytes, tile)
+    return await detect_frame_roboflow_async(data)
+
+
+def _detect_frame(image: Union[str, bytes]) -> List[Dict]:
+    """
+    프레임 감지 (로컬 ONNX 또는 Roboflow API, 같은 예측 형식)
+    """
+    if DETECT_SLICED:
+        return detect_sliced(image, _detect_tiles)
+    if DETECT_BACKEND == "onnx":
+        return get_object_detector().detect(image)
+    return detect_frame_roboflow(image)
+
+
+async def _detect_frame_async(image: Union[str, bytes]) -> List[Dict]:
+    """
+    _detect_frame()의 비동기 버전 (로컬 추론은 스레드, Roboflow API는 await)
+    """
+    if DETECT_BACKEND == "onnx":
+        return await asyncio.to_thread(_detect_frame, image)
+    if DETECT_SLICED:
+        return await detect_sliced_async(image, _detect_tile_async)
+    return await detect_frame_roboflow_async(image)
+
+
+def detect_products_in_frame(image: Union[str, bytes]) -> Dict:
+    """
+    Object Detection으로 웹캠 프레임에서 Q-CODE 제품 감지 및 개수 카운트
+    DETECT_BACKEND 설정에 따라 로컬 ONNX YOLOv8 또는 Roboflow Inference API 사용
 
     Args:
-        image_path: 웹캠 프레임 이미지 경로
+        image: 웹캠 프레임 이미지 경로 또는 이미지 바이트 (디스크에 저장하지 않은 프레임)
 
     Returns:
         {
@@ -239,108 +544,114 @@ def detect_products_in_frame(image_path: str) -> Dict:
             "error": "..." (실패 시)
         }
     """
-    # 클래스 이름 매핑 (Roboflow 학습 시 사용한 이름 -> Q-CODE)
-    CLASS_NAME_TO_QCODE = {
-        "Tangerine": "TANGERINE-001",  # 탄제린 (귤)
-        "Egg": "EGG-001",  # 계란
-        "Steel Plate": "STEEL-PLATE-001",  # 철판 (강판)
-        "Steel plate": "STEEL-PLATE-001",  # 철판 (대소문자 변형)
-        # 추가 매핑이 필요하면 여기에 추가:
-        # "Apple": "Q1208172",
-        # "Banana": "Q13425723",
-    }
+    try:
+        print(f"[*] Object Detection ({DETECT_BACKEND}): Detecting products in frame...")
 
+        return summarize_detections(_detect_frame(image))
+
+    except Exception as e:
+        print(f"[ERROR] detect_products_in_frame: {e}")
+        return _detection_error(e)
+
+
+async def detect_products_in_frame_async(image: Union[str, bytes]) -> Dict:
+    """
+    detect_products_in_frame()의 비동기 버전
+    (Roboflow API는 httpx로 await, 로컬 ONNX 추론은 스레드에서 실행)
+    """
     try:
-        # 모델 ID 확인
-        if not ROBOFLOW_MODEL_ID:
-            return {
-                "success": False,
-                "error": "ROBOFLOW_MODEL_ID not set in .env. Please train a model first.",
-                "detected_products": [],
-                "total_count": 0
-            }
-
-        print(f"[*] Roboflow Object Detection: Detecting products in frame...")
-        print(f"    Model ID: {ROBOFLOW_MODEL_ID}")
-
-        # Roboflow Inference API 호출 (Multipart 방식)
-        url = f"{INFERENCE_URL}/{ROBOFLOW_MODEL_ID}"
-        print(f"    Request URL: {url}")
-        print(f"    API Key: {ROBOFLOW_API_KEY[:10]}...{ROBOFLOW_API_KEY[-4:]}")
-        print(f"    Image path: {image_path}")
-
-        # Multipart/form-data로 전송
-        with open(image_path, "rb") as image_file:
-            response = requests.post(
-                url,
-                params={"api_key": ROBOFLOW_API_KEY},
-                files={"file": image_file}
-            )
+        print(f"[*] Object Detection ({DETECT_BACKEND}): Detecting products in frame (async)...")
 
-        print(f"    Response Status: {response.status_code}")
-        if response.status_code != 200:
-            print(f"    Response Body: {response.text}")
-            raise Exception(f"Inference API error: {response.status_code} - {response.text}")
+        return summarize_detections(await _detect_frame_async(image))
 
-        result = response.json()
+    except Exception as e:
+        print(f"[ERROR] detect_products_in_frame_async: {e!r}")
+        return _detection_error(e)
 
-        # 각 클래스(Q-CODE)별 개수 카운트
-        detections = result.get("predictions", [])
-        print(f"    [DEBUG] Total predictions: {len(detections)}")
-        if detections:
-            print(f"    [DEBUG] First prediction: {detections[0]}")
-        product_counts = {}
 
-        for detection in detections:
-            class_name = detection.get("class", "unknown")
-            confidence = detection.get("confidence", 0.0)
-            print(f"    [DEBUG] Detected class: '{class_name}', confidence: {confidence:.2f}")
-
-            # 클래스 이름을 Q-CODE로 변환
-            qcode = CLASS_NAME_TO_QCODE.get(class_name, class_name)
-
-            if qcode not in product_counts:
-                product_counts[qcode] = {"count": 0, "confidences": [], "boxes": []}
-
-            product_counts[qcode]["count"] += 1
-            product_counts[qcode]["confidences"].append(confidence)
-            # 바운딩 박스 정보 저장
-            product_counts[qcode]["boxes"].append({
-                "x": detection.get("x"),
-                "y": detection.get("y"),
-                "width": detection.get("width"),
-                "height": detection.get("height"),
-                "confidence": confidence
-            })
-
-        # 평균 confidence 계산
-        detected_products = []
-        for qcode, data in product_counts.items():
-            avg_confidence = sum(data["confidences"]) / len(data["confidences"])
-            detected_products.append({
-                "qcode": qcode,
-                "count": data["count"],
-                "confidence": float(avg_confidence),
-                "bounding_boxes": data["boxes"]  # 바운딩 박스 정보 추가
-            })
-            print(f"    [DETECTED] {qcode}: {data['count']} items (conf: {avg_confidence:.2f})")
-
-        total_count = len(detections)
-
-        print(f"[OK] Detected {len(detected_products)} product types, {total_count} items total")
+async def detect_products_in_frames_async(images: List[Union[str, bytes]]) -> List[Dict]:
+    """
+    여러 프레임(여러 카메라) 한 번에 감지
+    - 로컬 ONNX: 배치 지원 모델이면 forward pass 1회 (스레드에서 실행)
+    - Roboflow API: 프레임별 요청을 공용 커넥션 풀로 동시에 전송
+    - 분할 감지(DETECT_SLICED): 프레임별로 타일 분할 감지를 동시에 실행
 
-        return {
-            "success": True,
-            "detected_products": detected_products,
-            "total_count": total_count,
-            "raw_predictions": detections  # 전체 예측 결과도 포함
-        }
+    Returns:
+        프레임 순서대로 detect_products_in_frame() 형식 결과
+    """
+    # 분할 감지는 프레임마다 타일 배치를 따로 구성
+    if DETECT_BACKEND != "onnx" or DETECT_SLICED:
+        return list(await asyncio.gather(*(detect_products_in_frame_async(image) for image in images)))
+
+    try:
+        print(f"[*] Object Detection (onnx): Detecting products in {len(images)} frames (batch)...")
+        batches = await asyncio.to_thread(get_object_detector().detect_batch, images)
+        return [summarize_detections(detections) for detections in batches]
 
     except Exception as e:
-        print(f"[ERROR] detect_products_in_frame: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "detected_products": [],
-            "total_count": 0
-        }
+        print(f"[ERROR] detect_products_in_frames_async: {e!r}")
+        return [_detection_error(e) for _ in images]
+
+
+def _detection_error(error: Exception) -> Dict:
+    return {
+        "success": False,
+        "error": str(error) or repr(error),
+        "detected_products": [],
+        "total_count": 0
+    }
+
+
+def summarize_detections(detections: List[Dict]) -> Dict:
+    """
+    예측 목록을 Q-CODE별 수량/평균 confidence/바운딩 박스로 집계
+    """
+    print(f"    [DEBUG] Total predictions: {len(detections)}")
+    if detections:
+        print(f"    [DEBUG] First prediction: {detections[0]}")
+    product_counts = {}
+
+    for detection in detections:
+        class_name = detection.get("class", "unknown")
+        confidence = detection.get("confidence", 0.0)
+        print(f"    [DEBUG] Detected class: '{class_name}', confidence: {confidence:.2f}")
+
+        # 클래스 이름을 Q-CODE로 변환
+        qcode = CLASS_NAME_TO_QCODE.get(class_name, class_name)
+
+        if qcode not in product_counts:
+            product_counts[qcode] = {"count": 0, "confidences": [], "boxes": []}
+
+        product_counts[qcode]["count"] += 1
+        product_counts[qcode]["confidences"].append(confidence)
+        # 바운딩 박스 정보 저장
+        product_counts[qcode]["boxes"].append({
+            "x": detection.get("x"),
+            "y": detection.get("y"),
+            "width": detection.get("width"),
+            "height": detection.get("height"),
+            "confidence": confidence
+        })
+
+    # 평균 confidence 계산
+    detected_products = []
+    for qcode, data in product_counts.items():
+        avg_confidence = sum(data["confidences"]) / len(data["confidences"])
+        detected_products.append({
+            "qcode": qcode,
+            "count": data["count"],
+            "confidence": float(avg_confidence),
+            "bounding_boxes": data["boxes"]  # 바운딩 박스 정보 추가
+        })
+        print(f"    [DETECTED] {qcode}: {data['count']} items (conf: {avg_confidence:.2f})")
+
+    total_count = len(detections)
+
+    print(f"[OK] Detected {len(detected_products)} product types, {total_count} items total")
+
+    return {
+        "success": True,
+        "detected_products": detected_products,
+        "total_count": total_count,
+        "raw_predictions": detections  # 전체 예측 결과도 포함
+    }
@@ -0,0 +1,752 @@
+"""
+인메모리 유사도 검색 엔진
+- 전체 카탈로그 임베딩을 L2 정규화된 float32 행렬 1개로 유지
+- exact: 행렬-벡터 곱 1회 + argpartition top-k
+- ivf: k-means 클러스터(inverted list) 중 nprobe개만 탐색하는 근사 검색
+- 제품당 여러 뷰 임베딩을 같은 qcode로 저장, 검색 시 제품별 점수 집계 (max 또는 상위 뷰 평균)
+- 제품 등록/삭제 시 증분 갱신, 디스크에 저장 후 재시작 시 재사용
+- 메타데이터 필터 (category, manufacturer, sourcing_group, leaf_class):
+  필드별 행 단위 코드 배열을 미리 구성해 두고 필터를 행 비트마스크로 변환, 일치하는 행만 점수 계산
+
+설정 (.env):
+- SIMILARITY_INDEX_MODE: "exact" (기본) | "ivf"
+- SIMILARITY_INDEX_PATH: 인덱스 저장 경로 (기본 cache/similarity_index.npz)
+- IVF_NLIST: 클러스터 수 (기본 0 = 4*sqrt(N) 자동)
+- IVF_NPROBE: 검색 시 탐색할 클러스터 수 (기본 8)
+- IVF_MIN_TRAIN: 이 개수 미만이면 학습 없이 전체 탐색 (기본 1000)
+- VIEW_AGGREGATION: "max" (기본) | "mean_top" (상위 VIEW_TOP_M개 뷰 평균)
+- VIEW_TOP_M: mean_top 집계 시 사용할 뷰 수 (기본 3)
+"""
+import os
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.models.product import Product
+from app.models.embedding import ProductEmbedding
+
+load_dotenv()
+
+SIMILARITY_INDEX_MODE = os.getenv("SIMILARITY_INDEX_MODE", "exact").lower()
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", os.path.join("cache", "similarity_index.npz"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+IVF_MIN_TRAIN = int(os.getenv("IVF_MIN_TRAIN", "1000"))
+VIEW_AGGREGATION = os.getenv("VIEW_AGGREGATION", "max").lower()
+VIEW_TOP_M = int(os.getenv("VIEW_TOP_M", "3"))
+
+# 검색 필터로 사용할 수 있는 제품 필드
+FILTER_FIELDS = ("category", "manufacturer", "sourcing_group", "leaf_class")
+
+# 필터 조건: {필드: 값 또는 값 목록} (목록은 OR, 필드끼리는 AND)
+Filters = Dict[str, Union[str, List[str]]]
+
+# 필터 조합별 행 비트마스크 캐시 크기
+FILTER_MASK_CACHE_SIZE = 64
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    행 단위 L2 정규화 (0 벡터는 그대로 유지)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    점수 상위 top_k 위치 (내림차순)
+    """
+    k = min(top_k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+def aggregate_views(groups: np.ndarray, scores: np.ndarray, n_groups: int,
+                    method: str = VIEW_AGGREGATION, top_m: int = VIEW_TOP_M) -> np.ndarray:
+    """
+    뷰(행)별 점수를 제품(그룹)별 점수로 집계
+
+    Args:
+        groups: 각 뷰의 제품 그룹 번호
+        scores: 각 뷰의 코사인 유사도
+        n_groups: 전체 그룹 수
+        method: "max" | "mean_top"
+        top_m: mean_top 집계 시 사용할 상위 뷰 수
+
+    Returns:
+        그룹별 점수 (뷰가 없는 그룹은 -inf)
+    """
+    if method == "mean_top" and top_m > 1:
+        # 그룹 내 점수 내림차순 정렬 후 그룹별 순위 계산
+        order = np.lexsort((-scores, groups))
+        sorted_groups = groups[order]
+        sorted_scores = scores[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        lengths = np.diff(np.r_[starts, len(order)])
+        rank = np.arange(len(order)) - np.repeat(starts, lengths)
+        keep = rank < top_m
+
+        sums = np.zeros(n_groups, dtype=np.float32)
+        counts = np.zeros(n_groups, dtype=np.float32)
+        np.add.at(sums, sorted_groups[keep], sorted_scores[keep])
+        np.add.at(counts, sorted_groups[keep], 1)
+        aggregated = np.full(n_groups, -np.inf, dtype=np.float32)
+        np.divide(sums, counts, out=aggregated, where=counts > 0)
+        return aggregated
+
+    aggregated = np.full(n_groups, -np.inf, dtype=np.float32)
+    np.maximum.at(aggregated, groups, scores)
+    return aggregated
+
+
+def product_metadata(product: Product) -> Dict[str, Optional[str]]:
+    """
+    인덱스 필터용 제품 메타데이터
+    """
+    return {field: getattr(product, field) for field in FILTER_FIELDS}
+
+
+def normalize_filters(filters: Optional[Filters]) -> Optional[Tuple]:
+    """
+    필터 조건 정리 (빈 값 제거, 캐시 키로 쓸 수 있게 정렬된 튜플로 변환)
+
+    Returns:
+        ((필드, (값, ...)), ...) 또는 조건이 없으면 None
+    """
+    if not filters:
+        return None
+    normalized = []
+    for field, values in filters.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field: {field} (use one of {list(FILTER_FIELDS)})")
+        if values is None or values == "" or values == []:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        normalized.append((field, tuple(sorted(set(values)))))
+    return tuple(sorted(normalized)) or None
+
+
+def catalog_fingerprint(db: Session, model: str) -> Tuple[str, ...]:
+    """
+    임베딩 저장소 상태 식별값 (모델, 행 수, 최대 id, id 합계, 최근 생성 시각) - 디스크 인덱스 재사용 여부 판단용
+    (삭제 + 재생성처럼 행 수/최대 id가 그대로인 변경도 id 합계/생성 시각으로 구분)
+    """
+    count, max_id, id_sum, created = db.query(
+        func.count(ProductEmbedding.id), func.max(ProductEmbedding.id),
+        func.sum(ProductEmbedding.id), func.max(ProductEmbedding.created_at)
+    ).filter(ProductEmbedding.model == model).one()
+    return model, str(int(count or 0)), str(int(max_id or 0)), str(int(id_sum or 0)), str(created)
+
+
+class SimilarityIndex:
+    """
+    정규화된 임베딩 행렬 + 병렬 qcode 배열 기반 코사인 유사도 검색 (exact)
+    """
+    mode = "exact"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.qcodes = np.array([], dtype=object)
+        self.fingerprint: Tuple[str, ...] = ()
+        # 뷰(행) -> 제품 그룹 번호 (제품별 점수 집계용)
+        self.groups = np.array([], dtype=np.int32)
+        self.group_qcodes: List[str] = []
+        self._group_ids = {}
+        # 필터용 메타데이터: qcode -> {필드: 값}, 필드별 행 코드 배열 + 값 사전
+        self.metadata: Dict[str, Dict[str, Optional[str]]] = {}
+        self._row_codes: Dict[str, np.ndarray] = {}
+        self._vocab: Dict[str, Dict[Optional[str], int]] = {}
+        self._mask_cache: Dict[Tuple, np.ndarray] = {}
+        # 행/메타데이터가 바뀔 때마다 증가 (외부 정렬 캐시 무효화용)
+        self.generation = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.qcodes)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @property
+    def product_count(self) -> int:
+        return len(self.group_qcodes)
+
+    def _build_groups(self):
+        self.group_qcodes = list(dict.fromkeys(self.qcodes.tolist()))
+        self._group_ids = {qcode: i for i, qcode in enumerate(self.group_qcodes)}
+        self.groups = np.array([self._group_ids[q] for q in self.qcodes], dtype=np.int32)
+        self._build_filter_columns()
+
+    def _build_filter_columns(self):
+        """
+        필드별 값 코드를 제품 그룹 -> 행 순서로 펼쳐 둠 (필터 시 정수 비교 1회로 비트마스크 생성)
+        """
+        for field in FILTER_FIELDS:
+            vocab: Dict[Optional[str], int] = {}
+            group_codes = np.array([
+                vocab.setdefault(self.metadata.get(qcode, {}).get(field), len(vocab))
+                for qcode in self.group_qcodes
+            ], dtype=np.int32)
+            self._vocab[field] = vocab
+            self._row_codes[field] = group_codes[self.groups] if len(self.groups) else np.array([], dtype=np.int32)
+        self._mask_cache = {}
+        self.generation += 1
+
+    def filter_mask(self, filters: Optional[Filters]) -> Optional[np.ndarray]:
+        """
+        필터 조건 -> 행 비트마스크 (조건이 없으면 None)
+        """
+        key = normalize_filters(filters)
+        if key is None:
+            return None
+        with self._lock:
+            mask = self._mask_cache.get(key)
+            if mask is not None:
+                return mask
+            mask = np.ones(len(self), dtype=bool)
+            for field, values in key:
+                vocab = self._vocab.get(field, {})
+                codes = [vocab[value] for value in values if value in vocab]
+                if not codes:
+                    mask[:] = False
+                    break
+                mask &= np.isin(self._row_codes[field], codes)
+            if len(self._mask_cache) >= FILTER_MASK_CACHE_SIZE:
+                self._mask_cache.pop(next(iter(self._mask_cache)))
+            self._mask_cache[key] = mask
+            return mask
+
+    def load_metadata(self, db: Session):
+        """
+        DB에서 필터용 제품 메타데이터 조회 (인덱스에 있는 제품만)
+        """
+        columns = [getattr(Product, field) for field in FILTER_FIELDS]
+        rows = db.query(Product.qcode, *columns).all()
+        with self._lock:
+            indexed = self._group_ids
+            self.metadata = {
+                row[0]: dict(zip(FILTER_FIELDS, row[1:]))
+                for row in rows if row[0] in indexed
+            }
+            self._build_filter_columns()
+
+    def set_metadata(self, qcode: str, metadata: Dict[str, Optional[str]]):
+        """
+        제품 메타데이터 변경 반영 (임베딩 변경 없이 필터 값만 수정된 경우)
+        """
+        with self._lock:
+            if qcode not in self._group_ids:
+                return
+            self.metadata[qcode] = {field: metadata.get(field) for field in FILTER_FIELDS}
+            self._build_filter_columns()
+
+    def _group_id(self, qcode: str) -> int:
+        if qcode not in self._group_ids:
+            self._group_ids[qcode] = len(self.group_qcodes)
+            self.group_qcodes.append(qcode)
+        return self._group_ids[qcode]
+
+    # ---------- 구성 ----------
+
+    def load(self, db: Session) -> "SimilarityIndex":
+        """
+        DB에 저장된 모든 뷰 임베딩으로 행렬 구성
+        (대표 이미지 임베딩이 현재 image_path와 다른 제품은 오래된 것으로 보고 제외)
+        """
+        current_qcodes = db.query(ProductEmbedding.qcode)\
+            .join(Product, Product.qcode == ProductEmbedding.qcode)\
+            .filter(ProductEmbedding.image_path == Product.image_path)\
+            .filter(ProductEmbedding.model == self.model)
+
+        rows = db.query(ProductEmbedding.qcode, ProductEmbedding.dim, ProductEmbedding.vector)\
+            .filter(ProductEmbedding.qcode.in_(current_qcodes))\
+            .filter(ProductEmbedding.model == self.model)\
+            .order_by(ProductEmbedding.qcode, ProductEmbedding.id)\
+            .all()
+
+        if rows:
+            # 차원이 다른 임베딩은 제외 (첫 번째 행 기준)
+            dim = rows[0].dim
+            rows = [row for row in rows if row.dim == dim]
+            buffer = b"".join(row.vector for row in rows)
+            matrix = np.frombuffer(buffer, dtype=np.float32).reshape(len(rows), dim)
+            qcodes = [row.qcode for row in rows]
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            qcodes = []
+
+        with self._lock:
+            self.matrix = normalize_rows(matrix) if len(qcodes) else matrix
+            self.qcodes = np.array(qcodes, dtype=object)
+            self.fingerprint = catalog_fingerprint(db, self.model)
+            self._build_groups()
+            self._rebuild()
+        self.load_metadata(db)
+        return self
+
+    def _rebuild(self):
+        """
+        행렬 전체가 바뀐 뒤 호출 (하위 클래스에서 보조 구조 재구성)
+        """
+        pass
+
+    # ---------- 증분 갱신 ----------
+
+    def upsert(self, qcode: str, vectors: np.ndarray, metadata: Optional[Dict[str, Optional[str]]] = None):
+        """
+        제품 임베딩 교체 (기존 행 삭제 후 추가)
+
+        Args:
+            qcode: 제품 Q-CODE
+            vectors: (k, D) 또는 (D,) 임베딩
+            metadata: 필터용 제품 메타데이터 (None이면 기존 값 유지)
+        """
+        vectors = normalize_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        with self._lock:
+            self.remove(qcode)
+            if len(self) and vectors.shape[1] != self.dim:
+                print(f"[WARN] Similarity index: dimension mismatch for {qcode}, skipped")
+                return
+            start = len(self)
+            self.matrix = np.vstack([self.matrix, vectors]) if len(self) else vectors
+            self.qcodes = np.concatenate([self.qcodes, np.array([qcode] * len(vectors), dtype=object)])
+            group = self._group_id(qcode)
+            self.groups = np.concatenate([self.groups, np.full(len(vectors), group, dtype=np.int32)])
+            if metadata is not None:
+                self.metadata[qcode] = {field: metadata.get(field) for field in FILTER_FIELDS}
+            self._build_filter_columns()
+            self._added(np.arange(start, len(self)))
+
+    def remove(self, qcode: str):
+        """
+        제품 임베딩 삭제
+        """
+        with self._lock:
+            keep = self.qcodes != qcode
+            if keep.all():
+                return
+            self.matrix = self.matrix[keep]
+            self.qcodes = self.qcodes[keep]
+            self.metadata.pop(qcode, None)
+            self._build_groups()
+            self._removed(keep)
+
+    def _added(self, rows: np.ndarray):
+        pass
+
+    def _removed(self, keep: np.ndarray):
+        pass
+
+    # ---------- 검색 ----------
+
+    def _prepare_query(self, query: np.ndarray) -> np.ndarray:
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(-1))
+        if query.shape[0] != self.dim:
+            raise ValueError(
+                f"Query dimension {query.shape[0]} does not match index dimension {self.dim}"
+            )
+        return query
+
+    def _rank_products(self, rows: Optional[np.ndarray], scores: np.ndarray,
+                       groups: np.ndarray, group_qcodes: List[str], top_k: int) -> List[Tuple[str, float]]:
+        """
+        뷰 점수를 제품별로 집계한 뒤 상위 top_k 제품 선택
+
+        Args:
+            rows: 점수를 계산한 행 번호 (None이면 전체 행)
+            scores: 해당 행들의 코사인 유사도
+        """
+        row_groups = groups if rows is None else groups[rows]
+        if rows is None and len(groups) == len(group_qcodes):
+            # 제품당 뷰가 1개면 집계 불필요
+            product_scores = np.empty(len(group_qcodes), dtype=np.float32)
+            product_scores[row_groups] = scores
+        else:
+            product_scores = aggregate_views(row_groups, scores, len(group_qcodes))
+
+        top = top_k_indices(product_scores, top_k)
+        return [
+            (group_qcodes[g], float(product_scores[g]))
+            for g in top if np.isfinite(product_scores[g])
+        ]
+
+    def search(self, query: np.ndarray, top_k: int = 5,
+               filters: Optional[Filters] = None) -> List[Tuple[str, float]]:
+        """
+        코사인 유사도 상위 top_k 제품 검색 (제품별 뷰 점수 집계)
+
+        Args:
+            query: 쿼리 임베딩 벡터
+            top_k: 반환할 상위 N개
+            filters: 메타데이터 필터 (예: {"category": "볼트", "manufacturer": ["A사", "B사"]})
+
+        Returns:
+            [(qcode, 코사인 유사도), ...] 유사도 내림차순
+        """
+        with self._lock:
+            matrix, groups, group_qcodes = self.matrix, self.groups, list(self.group_qcodes)
+            mask = self.filter_mask(filters)
+        if len(groups) == 0 or top_k <= 0:
+            return []
+
+        query = self._prepare_query(query)
+        if mask is not None:
+            # 필터에 맞는 행만 점수 계산
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return []
+            scores = matrix[rows] @ query
+            return self._rank_products(rows, scores, groups, group_qcodes, top_k)
+
+        scores = matrix @ query
+        return self._rank_products(None, scores, groups, group_qcodes, top_k)
+
+    def _probe_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """
+        점수를 계산할 후보 행 (None이면 전체 행, 근사 인덱스에서 재정의)
+        """
+        return None
+
+    def product_scores(self, query: np.ndarray, filters: Optional[Filters] = None
+                       ) -> Tuple[List[str], np.ndarray, Optional[np.ndarray]]:
+        """
+        전체 제품별 시각 유사도 (하이브리드 랭킹용, top-k 선택 없이 반환)
+
+        Returns:
+            (group_qcodes, 제품별 점수 - 점수 계산하지 않은 제품은 -inf,
+             필터 허용 제품 마스크 - 필터 없으면 None)
+        """
+        with self._lock:
+            matrix, groups, group_qcodes = self.matrix, self.groups, list(self.group_qcodes)
+            mask = self.filter_mask(filters)
+            if len(groups) == 0:
+                return group_qcodes, np.array([], dtype=np.float32), None
+            query = self._prepare_query(query)
+            rows = self._probe_rows(query)
+
+        allowed = None
+        if mask is not None:
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+            allowed = np.zeros(len(group_qcodes), dtype=bool)
+            allowed[groups[mask]] = True
+
+        if rows is None:
+            scores = matrix @ query
+            return group_qcodes, aggregate_views(groups, scores, len(group_qcodes)), allowed
+
+        scores = matrix[rows] @ query
+        return group_qcodes, aggregate_views(groups[rows], scores, len(group_qcodes)), allowed
+
+    # ---------- 디스크 저장 ----------
+
+    def _extra_arrays(self) -> dict:
+        return {}
+
+    def _restore_extra(self, data):
+        self._build_groups()
+        self._rebuild()
+
+    def save(self, path: str):
+        """
+        인덱스를 npz 파일로 저장
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                mode=np.array(self.mode),
+                model=np.array(self.model),
+                fingerprint=np.array(self.fingerprint, dtype=str),
+                matrix=self.matrix,
+                qcodes=np.array(self.qcodes.tolist(), dtype=str),
+                **self._extra_arrays()
+            )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load_file(cls, path: str, model: str) -> Optional["SimilarityIndex"]:
+        """
+        저장된 인덱스 불러오기 (모드/모델이 다르면 None)
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["mode"]) != cls.mode or str(data["model"]) != model:
+                return None
+            index = cls(model)
+            index.matrix = data["matrix"].astype(np.float32)
+            index.qcodes = np.array(data["qcodes"].tolist(), dtype=object)
+            index.fingerprint = tuple(str(v) for v in data["fingerprint"].tolist())
+            index._restore_extra(data)
+        return index
+
+
+class IVFSimilarityIndex(SimilarityIndex):
+    """
+    IVF (inverted file) 근사 최근접 이웃 인덱스
+    - 구면 k-means로 nlist개 클러스터 중심 학습
+    - 검색 시 쿼리와 가까운 nprobe개 클러스터의 행만 점수 계산
+    - IVF_MIN_TRAIN 미만이면 학습하지 않고 exact 검색
+    """
+    mode = "ivf"
+
+    def __init__(self, model: str, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE):
+        super().__init__(model)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.assignments = np.array([], dtype=np.int32)
+        self.lists: List[np.ndarray] = []
+
+    @property
+    def trained(self) -> bool:
+        return len(self.centroids) > 0
+
+    def _rebuild(self):
+        if len(self) >= IVF_MIN_TRAIN:
+            self.train()
+        else:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self.assignments = np.array([], dtype=np.int32)
+            self.lists = []
+
+    def train(self, iterations: int = 10, seed: int = 0):
+        """
+        구면 k-means 학습 후 전체 행을 클러스터에 배정
+        """
+        n = len(self)
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, nlist * 64)
+        sample = self.matrix[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            # 빈 클러스터는 임의 샘플로 다시 시작
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids
+        self.assignments = self._assign(self.matrix)
+        self._build_lists()
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if len(vectors) == 0:
+            return np.array([], dtype=np.int32)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _build_lists(self):
+        order = np.argsort(self.assignments, kind="stable")
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def _added(self, rows: np.ndarray):
+        if not self.trained:
+            if len(self) >= IVF_MIN_TRAIN:
+                self.train()
+            return
+        labels = self._assign(self.matrix[rows])
+        self.assignments = np.concatenate([self.assignments, labels])
+        for label in np.unique(labels):
+            self.lists[label] = np.concatenate([self.lists[label], rows[labels == label]])
+
+    def _removed(self, keep: np.ndarray):
+        if not self.trained:
+            return
+        self.assignments = self.assignments[keep]
+        self._build_lists()
+
+    def search(self, query: np.ndarray, top_k: int = 5, filters: Optional[Filters] = None,
+               nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        nprobe개 클러스터의 뷰만 탐색하는 근사 top-k 제품 검색 (필터는 후보 행에 적용)
+        """
+        with self._lock:
+            if not self.trained:
+                return super().search(query, top_k, filters)
+            matrix, groups, group_qcodes = self.matrix, self.groups, list(self.group_qcodes)
+            lists, centroids = list(self.lists), self.centroids
+            mask = self.filter_mask(filters)
+        if len(groups) == 0 or top_k <= 0:
+            return []
+
+        query = self._prepare_query(query)
+        probes = top_k_indices(centroids @ query, nprobe or self.nprobe)
+        candidates = np.concatenate([lists[p] for p in probes])
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if len(candidates) == 0:
+            return []
+
+        scores = matrix[candidates] @ query
+        return self._rank_products(candidates, scores, groups, group_qcodes, top_k)
+
+    def _probe_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if not self.trained:
+            return None
+        probes = top_k_indices(self.centroids @ query, self.nprobe)
+        return np.concatenate([self.lists[p] for p in probes])
+
+    def _extra_arrays(self) -> dict:
+        return {
+            "nlist": np.array(self.nlist),
+            "nprobe": np.array(self.nprobe),
+            "centroids": self.centroids,
+            "assignments": self.assignments,
+        }
+
+    def _restore_extra(self, data):
+        # nprobe는 검색 시 설정값(IVF_NPROBE) 그대로 사용, 저장된 값은 무시
+        self._build_groups()
+        if int(data["nlist"]) != self.nlist:
+            # 클러스터 수 설정(IVF_NLIST)이 바뀌었으면 저장된 클러스터 대신 다시 학습
+            print(f"[*] IVF_NLIST changed ({int(data['nlist'])} -> {self.nlist}), retraining clusters")
+            self._rebuild()
+            return
+        self.centroids = data["centroids"].astype(np.float32)
+        self.assignments = data["assignments"].astype(np.int32)
+        if self.trained:
+            self._build_lists()
+
+
+INDEX_CLASSES = {
+    "exact": SimilarityIndex,
+    "ivf": IVFSimilarityIndex,
+}
+
+
+def create_similarity_index(model: str, mode: str = SIMILARITY_INDEX_MODE) -> SimilarityIndex:
+    """
+    설정된 모드의 빈 인덱스 생성
+    """
+    if mode not in INDEX_CLASSES:
+        raise ValueError(f"Unknown SIMILARITY_INDEX_MODE: {mode} (use one of {list(INDEX_CLASSES)})")
+    return INDEX_CLASSES[mode](model)
+
+
+# ==========================
+# 전역 인덱스 (프로세스당 1개)
+# ==========================
+_index: Optional[SimilarityIndex] = None
+_index_version = -1    # 인덱스 구성 당시 저장소 버전
+_store_version = 0     # 증분 갱신이 불가능한 변경 시 증가
+_index_lock = threading.Lock()
+
+
+def invalidate_similarity_index():
+    """
+    전체 재구성이 필요할 때 호출 - 다음 검색 때 DB에서 인덱스 재구성
+    """
+    global _store_version
+    _store_version += 1
+
+
+def get_similarity_index(db: Session, model: str) -> SimilarityIndex:
+    """
+    전역 유사도 인덱스 조회
+    - 디스크 인덱스가 현재 저장소와 일치하면 재사용
+    - 아니면 DB에서 재구성 후 디스크에 저장
+    """
+    global _index, _index_version
+    with _index_lock:
+        if _index is not None and _index_version == _store_version and _index.model == model:
+            return _index
+
+        version = _store_version
+        index_class = INDEX_CLASSES.get(SIMILARITY_INDEX_MODE, SimilarityIndex)
+
+        index = None
+        if _index is None:
+            try:
+                index = index_class.load_file(SIMILARITY_INDEX_PATH, model)
+            except Exception as e:
+                print(f"[WARN] Failed to load similarity index file: {e}")
+            if index is not None and index.fingerprint != catalog_fingerprint(db, model):
+                index = None
+            if index is not None:
+                # 필터 메타데이터는 저장하지 않고 항상 DB 기준으로 조회
+                index.load_metadata(db)
+                print(f"[*] Similarity index loaded from disk: {len(index)} embeddings ({index.mode})")
+
+        if index is None:
+            index = create_similarity_index(model).load(db)
+            print(f"[*] Similarity index built: {len(index)} embeddings ({index.mode})")
+            try:
+                index.save(SIMILARITY_INDEX_PATH)
+            except Exception as e:
+                print(f"[WARN] Failed to save similarity index: {e}")
+
+        _index = index
+        _index_version = version
+        return _index
+
+
+def update_similarity_index(db: Session, qcode: str, vectors: Optional[np.ndarray], model: str,
+                            metadata: Optional[Dict[str, Optional[str]]] = None):
+    """
+    제품 등록/이미지 변경/삭제 시 인덱스 증분 갱신
+
+    Args:
+        db: 데이터베이스 세션 (저장소 식별값 갱신용)
+        qcode: 제품 Q-CODE
+        vectors: 새 임베딩 (None이면 삭제)
+        model: 임베딩 모델 이름
+        metadata: 필터용 제품 메타데이터 (None이면 DB에서 조회)
+    """
+    with _index_lock:
+        index = _index
+        if index is None or index.model != model:
+            return
+        if vectors is None:
+            index.remove(qcode)
+        else:
+            if metadata is None:
+                product = db.query(Product).filter(Product.qcode == qcode).first()
+                metadata = product_metadata(product) if product else {}
+            index.upsert(qcode, vectors, metadata)
+        index.fingerprint = catalog_fingerprint(db, model)
+
+
+def update_similarity_metadata(product: Product):
+    """
+    제품 정보(카테고리 등) 수정 시 인덱스 필터 메타데이터 갱신
+    """
+    with _index_lock:
+        if _index is None:
+            return
+        _index.set_metadata(product.qcode, product_metadata(product))
+
+
+def save_similarity_index():
+    """
+    현재 인덱스를 디스크에 저장 (서버 종료 시 호출)
+    """
+    with _index_lock:
+        if _index is None:
+            return
+        try:
+            _index.save(SIMILARITY_INDEX_PATH)
+            print(f"[*] Similarity index saved: {SIMILARITY_INDEX_PATH}")
+        except Exception as e:
+            print(f"[WARN] Failed to save similarity index: {e}")
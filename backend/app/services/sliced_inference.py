@@ -0,0 +1,206 @@
+"""
+고해상도 선반 이미지 분할 감지 (Sliced inference)
+- 큰 프레임을 겹치는 타일로 나눠 감지 (작은 와셔/나사도 모델 입력 해상도에서 감지되도록)
+- 타일은 CPU 코어(스레드) 또는 동시 API 요청으로 병렬 감지
+- 타일 좌표 -> 원본 좌표로 옮긴 뒤, 타일 경계에서 중복/잘린 박스를 행렬 기반 NMS로 병합
+  (겹침 기준: 작은 박스 대비 교집합 IoS, 같은 그룹 박스는 합집합 박스로 병합)
+
+설정 (.env):
+- DETECT_SLICED: "false" (기본) | "true"
+- DETECT_SLICE_SIZE: 타일 크기 (기본 DETECT_INPUT_SIZE = 640)
+- DETECT_SLICE_OVERLAP: 타일 겹침 비율 (기본 0.2)
+- DETECT_SLICE_FULL_FRAME: 전체 프레임도 함께 감지 (큰 물체용, 기본 "false")
+- DETECT_SLICE_MERGE_THRESHOLD: 같은 물체로 병합할 최소 IoS (기본 0.5)
+- DETECT_SLICE_WORKERS: 타일 병렬 감지 스레드 수 (기본 CPU 코어 수)
+"""
+import io
+import os
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+
+from app.services.image_preprocess import DETECT_INPUT_SIZE
+
+load_dotenv()
+
+DETECT_SLICED = os.getenv("DETECT_SLICED", "false").lower() == "true"
+DETECT_SLICE_SIZE = int(os.getenv("DETECT_SLICE_SIZE", str(DETECT_INPUT_SIZE)))
+DETECT_SLICE_OVERLAP = float(os.getenv("DETECT_SLICE_OVERLAP", "0.2"))
+DETECT_SLICE_FULL_FRAME = os.getenv("DETECT_SLICE_FULL_FRAME", "false").lower() == "true"
+DETECT_SLICE_MERGE_THRESHOLD = float(os.getenv("DETECT_SLICE_MERGE_THRESHOLD", "0.5"))
+DETECT_SLICE_WORKERS = int(os.getenv("DETECT_SLICE_WORKERS", "0")) or (os.cpu_count() or 4)
+
+# 타일 목록 -> 타일별 예측 목록 (Roboflow 형식, 타일 좌표)
+TileDetector = Callable[[list], List[List[Dict]]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DETECT_SLICE_WORKERS, thread_name_prefix="slice")
+        return _executor
+
+
+def tile_grid(width: int, height: int, size: int = DETECT_SLICE_SIZE,
+              overlap: float = DETECT_SLICE_OVERLAP) -> List[Tuple[int, int, int, int]]:
+    """
+    겹치는 타일 좌표 (x1, y1, x2, y2), 마지막 타일은 이미지 끝에 맞춤
+    """
+    step = max(1, int(size * (1 - overlap)))
+
+    def starts(length: int) -> List[int]:
+        if length <= size:
+            return [0]
+        positions = list(range(0, length - size, step))
+        positions.append(length - size)
+        return positions
+
+    return [
+        (x, y, min(x + size, width), min(y + size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def slice_frame(image: Union[str, bytes]):
+    """
+    프레임을 타일로 분할
+
+    Returns:
+        (타일 PIL 이미지 목록, 타일 원점 (x, y) 목록, 전체 프레임 PIL 이미지)
+        프레임이 타일 1장 크기 이하면 타일 목록은 비어 있음
+    """
+    from PIL import Image
+
+    source = io.BytesIO(image) if isinstance(image, bytes) else image
+    with Image.open(source) as opened:
+        frame = opened.convert("RGB")
+
+    grid = tile_grid(*frame.size)
+    if len(grid) <= 1:
+        return [], [], frame
+    return [frame.crop(box) for box in grid], [(box[0], box[1]) for box in grid], frame
+
+
+def parallel_tiles(detect_tile: Callable) -> TileDetector:
+    """
+    타일 1장 감지 함수를 스레드 풀 병렬 감지 함수로 변환
+    (ONNX Runtime 추론/HTTP 대기는 GIL을 놓으므로 코어/동시 요청 수만큼 병렬)
+    """
+    def detect_tiles(tiles: list) -> List[List[Dict]]:
+        return list(_get_executor().map(detect_tile, tiles))
+    return detect_tiles
+
+
+def _to_corners(detections: List[Dict]) -> np.ndarray:
+    values = np.array([[d["x"], d["y"], d["width"], d["height"]] for d in detections], dtype=np.float32)
+    half = values[:, 2:] / 2
+    return np.hstack([values[:, :2] - half, values[:, :2] + half])
+
+
+def merge_detections(detections: List[Dict], threshold: float = DETECT_SLICE_MERGE_THRESHOLD) -> List[Dict]:
+    """
+    타일 간 중복 박스 병합 (클래스별, 점수 내림차순 greedy)
+    겹침 행렬(IoS)을 한 번에 계산한 뒤, 남은 박스 중 가장 높은 점수 박스가
+    겹치는 박스들을 흡수하고 합집합 박스로 확장 (타일 경계에서 잘린 물체 복원)
+    """
+    if len(detections) <= 1:
+        return detections
+
+    scores = np.array([d.get("confidence", 0.0) for d in detections], dtype=np.float32)
+    order = np.argsort(-scores)
+    detections = [detections[i] for i in order]
+    boxes = _to_corners(detections)
+    classes = np.array([d.get("class") for d in detections], dtype=object)
+
+    # 교집합 / 작은 박스 넓이 (잘린 박스는 온전한 박스에 거의 포함되므로 IoU보다 IoS가 적합)
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    overlap = intersection / np.maximum(np.minimum(areas[:, None], areas[None, :]), 1e-9)
+    same = (overlap >= threshold) & (classes[:, None] == classes[None, :])
+
+    merged = []
+    suppressed = np.zeros(len(detections), dtype=bool)
+    for i in range(len(detections)):
+        if suppressed[i]:
+            continue
+        group = same[i] & ~suppressed
+        group[i] = True
+        suppressed |= group
+
+        bx1, by1 = boxes[group, 0].min(), boxes[group, 1].min()
+        bx2, by2 = boxes[group, 2].max(), boxes[group, 3].max()
+        detection = dict(detections[i])
+        detection.update({
+            "x": float((bx1 + bx2) / 2),
+            "y": float((by1 + by2) / 2),
+            "width": float(bx2 - bx1),
+            "height": float(by2 - by1),
+        })
+        merged.append(detection)
+    return merged
+
+
+def _offset(tile_detections: List[List[Dict]], origins: List[Tuple[int, int]]) -> List[Dict]:
+    """
+    타일 좌표 -> 원본 프레임 좌표
+    """
+    detections = []
+    for predictions, (ox, oy) in zip(tile_detections, origins):
+        for prediction in predictions:
+            detection = dict(prediction)
+            detection["x"] = prediction["x"] + ox
+            detection["y"] = prediction["y"] + oy
+            detections.append(detection)
+    return detections
+
+
+def _merge(tile_detections: List[List[Dict]], origins: List[Tuple[int, int]], tile_count: int) -> List[Dict]:
+    detections = merge_detections(_offset(tile_detections, origins))
+    print(f"    [SLICED] {tile_count} tiles -> {len(detections)} detections after merge")
+    return detections
+
+
+def detect_sliced(image: Union[str, bytes], detect_tiles: TileDetector) -> List[Dict]:
+    """
+    프레임 분할 감지 (작은 프레임은 분할 없이 1회 감지)
+
+    Args:
+        image: 프레임 이미지 경로 또는 바이트
+        detect_tiles: 타일(PIL 이미지) 목록 -> 타일별 예측 목록
+
+    Returns:
+        원본 프레임 좌표의 Roboflow 형식 예측 목록
+    """
+    tiles, origins, frame = slice_frame(image)
+    if not tiles:
+        return detect_tiles([frame])[0]
+
+    if DETECT_SLICE_FULL_FRAME:
+        tiles, origins = tiles + [frame], origins + [(0, 0)]
+    return _merge(detect_tiles(tiles), origins, len(tiles))
+
+
+async def detect_sliced_async(image: Union[str, bytes], detect_tile_async: Callable) -> List[Dict]:
+    """
+    detect_sliced()의 비동기 버전 (타일마다 비동기 감지를 동시에 실행, 분할/병합은 스레드)
+    """
+    tiles, origins, frame = await asyncio.to_thread(slice_frame, image)
+    if not tiles:
+        return await detect_tile_async(frame)
+
+    if DETECT_SLICE_FULL_FRAME:
+        tiles, origins = tiles + [frame], origins + [(0, 0)]
+    tile_detections = await asyncio.gather(*(detect_tile_async(tile) for tile in tiles))
+    return await asyncio.to_thread(_merge, list(tile_detections), origins, len(tiles))
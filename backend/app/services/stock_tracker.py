@@ -0,0 +1,208 @@
+"""
+카메라별 다중 프레임 추적 + 재고 수량 안정화
+- 프레임 간 박스를 IoU(겹치지 않으면 중심점 거리)로 연결해 같은 물체를 추적
+- 몇 프레임 놓친 물체도 잠시 유지 (감지 깜빡임 흡수)
+- Q-CODE별 수량을 최근 프레임 창의 중앙값으로 평활화
+- 평활화 수량이 N 프레임 연속 같을 때만 재고 반영 대상으로 표시 (매 프레임 DB 쓰기 방지)
+
+설정 (.env):
+- TRACK_IOU_THRESHOLD: 같은 물체로 볼 최소 IoU (기본 0.3)
+- TRACK_MAX_CENTER_DISTANCE: IoU가 낮을 때 같은 물체로 볼 최대 중심 거리 (박스 크기 대비, 기본 0.5)
+- TRACK_MAX_MISSES: 감지되지 않아도 유지할 프레임 수 (기본 2)
+- TRACK_MIN_HITS: 수량에 포함되기 위한 최소 감지 프레임 수 (기본 2)
+- STOCK_SMOOTHING_WINDOW: 수량 평활화 프레임 수 (기본 5)
+- STOCK_STABLE_FRAMES: 재고 반영에 필요한 연속 안정 프레임 수 (기본 3)
+"""
+import os
+import threading
+import numpy as np
+from collections import deque
+from typing import Dict, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+TRACK_MAX_CENTER_DISTANCE = float(os.getenv("TRACK_MAX_CENTER_DISTANCE", "0.5"))
+TRACK_MAX_MISSES = int(os.getenv("TRACK_MAX_MISSES", "2"))
+TRACK_MIN_HITS = int(os.getenv("TRACK_MIN_HITS", "2"))
+STOCK_SMOOTHING_WINDOW = int(os.getenv("STOCK_SMOOTHING_WINDOW", "5"))
+STOCK_STABLE_FRAMES = int(os.getenv("STOCK_STABLE_FRAMES", "3"))
+
+
+def _to_corners(boxes: List[Dict]) -> np.ndarray:
+    """
+    Roboflow 형식(중심 x/y + width/height) -> (x1, y1, x2, y2)
+    """
+    if not boxes:
+        return np.zeros((0, 4), dtype=np.float32)
+    values = np.array([[b["x"], b["y"], b["width"], b["height"]] for b in boxes], dtype=np.float32)
+    half = values[:, 2:] / 2
+    return np.hstack([values[:, :2] - half, values[:, :2] + half])
+
+
+def _pairwise_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def _match_score(tracks: np.ndarray, detections: np.ndarray) -> np.ndarray:
+    """
+    트랙-감지 연결 점수 (IoU, 겹치지 않으면 중심 거리 기반 점수, 연결 불가는 0)
+    """
+    iou = _pairwise_iou(tracks, detections)
+    centers_t = (tracks[:, :2] + tracks[:, 2:]) / 2
+    centers_d = (detections[:, :2] + detections[:, 2:]) / 2
+    distance = np.linalg.norm(centers_t[:, None] - centers_d[None], axis=2)
+    size = np.maximum((tracks[:, 2:] - tracks[:, :2]).max(axis=1), 1e-9)[:, None]
+    relative = distance / size
+
+    score = np.where(iou >= TRACK_IOU_THRESHOLD, 1.0 + iou, 0.0)
+    # IoU가 낮아도 가까우면 (빠른 이동/박스 흔들림) 낮은 점수로 연결
+    near = (score == 0) & (relative <= TRACK_MAX_CENTER_DISTANCE)
+    score[near] = 1.0 - relative[near]
+    return score
+
+
+class QcodeState:
+    """
+    Q-CODE 1개의 트랙 목록 + 수량 이력
+    """
+
+    def __init__(self):
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.misses = np.zeros(0, dtype=np.int32)
+        self.counts = deque(maxlen=STOCK_SMOOTHING_WINDOW)
+        self.smoothed = None
+        self.stable_frames = 0
+        self.confidence = 0.0
+
+    def update(self, detections: List[Dict]) -> int:
+        """
+        이번 프레임 감지 박스로 트랙 갱신 후 확정된 트랙 수 반환
+        """
+        boxes = _to_corners(detections)
+        matched_tracks = np.zeros(len(self.boxes), dtype=bool)
+        matched_detections = np.zeros(len(boxes), dtype=bool)
+
+        if len(self.boxes) and len(boxes):
+            score = _match_score(self.boxes, boxes)
+            # 점수 높은 쌍부터 탐욕적 1:1 연결
+            for flat in np.argsort(-score, axis=None):
+                t, d = np.unravel_index(flat, score.shape)
+                if score[t, d] <= 0:
+                    break
+                if matched_tracks[t] or matched_detections[d]:
+                    continue
+                matched_tracks[t] = matched_detections[d] = True
+                self.boxes[t] = boxes[d]
+
+        self.hits[matched_tracks] += 1
+        self.misses[matched_tracks] = 0
+        self.misses[~matched_tracks] += 1
+
+        # 새 물체 트랙 추가, 오래 놓친 트랙 제거
+        new = ~matched_detections
+        self.boxes = np.vstack([self.boxes, boxes[new]])
+        self.hits = np.concatenate([self.hits, np.ones(int(new.sum()), dtype=np.int32)])
+        self.misses = np.concatenate([self.misses, np.zeros(int(new.sum()), dtype=np.int32)])
+        alive = self.misses <= TRACK_MAX_MISSES
+        self.boxes, self.hits, self.misses = self.boxes[alive], self.hits[alive], self.misses[alive]
+
+        if detections:
+            self.confidence = float(np.mean([d.get("confidence", 0.0) for d in detections]))
+        return int((self.hits >= TRACK_MIN_HITS).sum())
+
+    def observe(self, count: int):
+        """
+        프레임 수량 기록 후 평활화 수량/안정 프레임 수 갱신
+        """
+        self.counts.append(count)
+        smoothed = int(round(float(np.median(self.counts))))
+        if smoothed == self.smoothed:
+            self.stable_frames += 1
+        else:
+            self.smoothed = smoothed
+            self.stable_frames = 1
+
+    @property
+    def is_active(self) -> bool:
+        # 0개가 된 제품도 0이 안정될 때까지는 유지 (재고 0 반영)
+        return len(self.boxes) > 0 or (self.smoothed or 0) > 0 or self.stable_frames < STOCK_STABLE_FRAMES
+
+
+class CameraTracker:
+    """
+    카메라 1대의 Q-CODE별 추적 상태
+    """
+
+    def __init__(self):
+        self.states: Dict[str, QcodeState] = {}
+        self.frames = 0
+
+    def update(self, detected_products: List[Dict]) -> List[Dict]:
+        """
+        프레임 감지 결과 반영
+
+        Args:
+            detected_products: detect_products_in_frame()의 detected_products
+
+        Returns:
+            [{"qcode", "raw_count", "smoothed_count", "stable_frames", "stable", "confidence"}, ...]
+            (이번 프레임에 감지됐거나 추적 중인 Q-CODE)
+        """
+        self.frames += 1
+        by_qcode = {p["qcode"]: p for p in detected_products}
+
+        results = []
+        for qcode in set(by_qcode) | set(self.states):
+            detected = by_qcode.get(qcode)
+            state = self.states.setdefault(qcode, QcodeState())
+            boxes = detected.get("bounding_boxes") if detected else []
+            if detected and not boxes:
+                # 박스 정보가 없으면 수량만큼 위치 없는 감지로 처리 (추적 없이 수량만 평활화)
+                state.observe(detected["count"])
+            else:
+                state.observe(state.update(boxes or []))
+
+            results.append({
+                "qcode": qcode,
+                "raw_count": detected["count"] if detected else 0,
+                "smoothed_count": state.smoothed,
+                "stable_frames": state.stable_frames,
+                "stable": state.stable_frames >= STOCK_STABLE_FRAMES,
+                "confidence": detected["confidence"] if detected else state.confidence,
+            })
+
+            if not state.is_active:
+                del self.states[qcode]
+
+        return results
+
+
+_trackers: Dict[str, CameraTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def update_camera_tracker(camera_id: str, detected_products: List[Dict]) -> List[Dict]:
+    """
+    카메라 추적기에 프레임 감지 결과 반영 (카메라별 순차 처리)
+    """
+    with _trackers_lock:
+        tracker = _trackers.setdefault(camera_id, CameraTracker())
+        return tracker.update(detected_products)
+
+
+def reset_camera_tracker(camera_id: str):
+    """
+    카메라 추적 상태 초기화
+    """
+    with _trackers_lock:
+        _trackers.pop(camera_id, None)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+감지 API 동시성 벤치마크
+로컬 스텁 Inference 서버(고정 지연)를 띄우고, 동시 요청 수별 처리량 비교
+- blocking: 이벤트 루프에서 동기 detect_products_in_frame() 호출 (기존 async 라우트 방식)
+- async: detect_products_in_frame_async() await (공용 httpx.AsyncClient)
+
+사용법:
+    python benchmark_async_detection.py --latency 200 --requests 64
+    python benchmark_async_detection.py --concurrency 1 4 16 64
+"""
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Async detection concurrency benchmark")
+    parser.add_argument("--latency", type=float, default=200, help="스텁 서버 응답 지연 (ms)")
+    parser.add_argument("--requests", type=int, default=64, help="모드/동시성마다 보낼 요청 수")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--port", type=int, default=0, help="스텁 서버 포트 (0 = 자동)")
+    return parser.parse_args()
+
+
+def start_stub_server(latency_ms: float, port: int) -> ThreadingHTTPServer:
+    """
+    Roboflow Inference API 형식으로 응답하는 스텁 서버 (요청마다 latency_ms 대기)
+    """
+    body = json.dumps({
+        "predictions": [
+            {"x": 100, "y": 100, "width": 50, "height": 50, "confidence": 0.9, "class": "Egg"}
+        ]
+    }).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_frame() -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (120, 120, 120)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+async def run_mode(mode: str, frame: bytes, total: int, concurrency: int) -> float:
+    """
+    동시성 concurrency로 total건 처리 후 초당 처리량 반환
+    """
+    from app.services import roboflow_service
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            if mode == "blocking":
+                result = roboflow_service.detect_products_in_frame(frame)
+            else:
+                result = await roboflow_service.detect_products_in_frame_async(frame)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def benchmark(args, frame: bytes):
+    from app.services.roboflow_service import close_async_http_client
+
+    rows = []
+    for concurrency in args.concurrency:
+        blocking = await run_mode("blocking", frame, args.requests, concurrency)
+        concurrent = await run_mode("async", frame, args.requests, concurrency)
+        rows.append((concurrency, blocking, concurrent))
+    await close_async_http_client()
+    return rows
+
+
+def main():
+    args = parse_args()
+    server = start_stub_server(args.latency, args.port)
+    host, port = server.server_address
+
+    # 서비스 import 전에 스텁 서버로 설정 (.env보다 우선)
+    os.environ["DETECT_BACKEND"] = "roboflow"
+    os.environ["ROBOFLOW_INFERENCE_URL"] = f"http://{host}:{port}"
+    os.environ.setdefault("ROBOFLOW_API_KEY", "benchmark-key")
+    os.environ.setdefault("ROBOFLOW_MODEL_ID", "benchmark/1")
+    os.environ["ROBOFLOW_POOL_SIZE"] = str(max(args.concurrency))
+
+    # 프로젝트 루트를 Python 경로에 추가
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    print("=" * 60)
+    print("  Async Detection Concurrency Benchmark")
+    print("=" * 60)
+    print(f"    Stub latency: {args.latency:.0f} ms, requests per run: {args.requests}")
+
+    frame = make_frame()
+
+    # 서비스 로그는 숨기고 결과 표만 출력
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        rows = asyncio.run(benchmark(args, frame))
+    finally:
+        sys.stdout = stdout
+        server.shutdown()
+
+    print()
+    print(f"    {'in-flight':>9}  {'blocking req/s':>14}  {'async req/s':>11}  {'speedup':>7}")
+    for concurrency, blocking, concurrent in rows:
+        print(f"    {concurrency:>9}  {blocking:>14.1f}  {concurrent:>11.1f}  {concurrent / blocking:>6.1f}x")
+    print()
+    print(f"    Upper bound at {args.latency:.0f} ms latency: {1000 / args.latency:.1f} req/s per in-flight request")
+
+
+if __name__ == "__main__":
+    main()
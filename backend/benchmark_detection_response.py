@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+감지 응답 형식 벤치마크
+프레임 1장 응답의 크기와 직렬화 시간 비교 (full JSON / compact JSON / compact MessagePack)
+FastAPI와 같은 방식(jsonable_encoder + json.dumps)으로 JSON 직렬화
+
+사용법:
+    python benchmark_detection_response.py --products 5 --boxes 40
+    python benchmark_detection_response.py --products 20 --boxes 300 --repeat 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.product import Product
+from app.services.detection_response import format_detection_response
+
+
+def make_result(product_count: int, box_count: int) -> dict:
+    """
+    record_detection_result()와 같은 형식의 합성 감지 결과
+    """
+    rng = random.Random(0)
+    products = []
+    for i in range(product_count):
+        product = Product(
+            id=i + 1, qcode=f"Q-2601-{i:04d}", name=f"육각 볼트 M{5 + i} x {20 + i}mm",
+            category="체결류", description="아연도금 육각 볼트", image_path=f"product_list_picture/bolt_{i}.jpg",
+            diameter=f"M{5 + i}", length=f"{20 + i}mm", material="SUS304", specs="KS B 1002",
+            n2b_product_code=f"N2B{i:06d}", sourcing_group="기계부품", leaf_class="볼트",
+            standard_name="육각볼트", model_name=f"HB-{i}", manufacturer="대한정밀",
+            is_standardized=True, is_public=True, attributes={"강도": "8.8", "표면처리": "아연도금"},
+            purchase_count=12, average_rating=4.5, last_price=120.0, current_stock=30,
+            min_stock=10, max_stock=100, reorder_point=20, stock_unit="개", low_stock_alert=True,
+        )
+        info = product.to_dict()
+        info.update({
+            "detected_count": box_count // max(product_count, 1),
+            "smoothed_count": box_count // max(product_count, 1),
+            "stable_frames": 3,
+            "stock_committed": i == 0,
+            "confidence": 0.87,
+            "quantity_change": 1 if i == 0 else 0,
+        })
+        products.append(info)
+
+    predictions = [
+        {
+            "x": rng.uniform(0, 1920), "y": rng.uniform(0, 1080),
+            "width": rng.uniform(10, 80), "height": rng.uniform(10, 80),
+            "confidence": rng.uniform(0.4, 0.99),
+            "class": f"Bolt M{5 + rng.randrange(product_count)}",
+            "class_id": rng.randrange(product_count),
+            "detection_id": f"{rng.getrandbits(128):032x}",
+        }
+        for _ in range(box_count)
+    ]
+    return {
+        "success": True,
+        "message": f"{product_count}개 제품 감지됨",
+        "detected_products": products,
+        "total_count": box_count,
+        "stock_updates": 1,
+        "detection_method": "roboflow_yolov8",
+        "frame_path": None,
+        "raw_predictions": predictions,
+        "frame_skipped": False,
+    }
+
+
+def measure(encode, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = encode()
+    elapsed = (time.perf_counter() - start) / repeat * 1e6
+    return len(payload), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection response size / serialization benchmark")
+    parser.add_argument("--products", type=int, default=5, help="감지된 제품 종류 수")
+    parser.add_argument("--boxes", type=int, default=40, help="바운딩 박스 수")
+    parser.add_argument("--repeat", type=int, default=1000, help="반복 횟수")
+    args = parser.parse_args()
+
+    result = make_result(args.products, args.boxes)
+
+    def as_json(body):
+        return json.dumps(jsonable_encoder(body), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    rows = [
+        ("full (JSON)", measure(lambda: as_json(format_detection_response(result, "full")), args.repeat)),
+        ("compact (JSON)", measure(lambda: as_json(format_detection_response(result, "compact")), args.repeat)),
+    ]
+    try:
+        rows.append(("compact (msgpack)", measure(lambda: format_detection_response(result, "msgpack"), args.repeat)))
+    except Exception as e:
+        print(f"[WARN] msgpack skipped: {e}")
+
+    print("=" * 60)
+    print("  Detection Response Benchmark")
+    print("=" * 60)
+    print(f"    Products: {args.products}, boxes: {args.boxes}, repeat: {args.repeat}")
+    print()
+    full_size, full_time = rows[0][1]
+    print(f"    {'format':<18} {'bytes':>8} {'vs full':>8} {'encode us':>10} {'vs full':>8}")
+    for name, (size, elapsed) in rows:
+        print(f"    {name:<18} {size:>8} {size / full_size:>7.0%} {elapsed:>10.1f} {elapsed / full_time:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+제품 목록 직렬화 벤치마크
+임시 SQLite DB에 합성 제품을 넣고 목록 응답 1회(조회 + 직렬화)에 걸리는 시간 비교
+- ORM: db.query(Product) -> to_dict() -> jsonable_encoder + json.dumps (FastAPI 기본 응답과 같은 방식)
+- rows: 컬럼 행 튜플 -> dict -> orjson (/api/products, /api/inventory/current 응답 방식)
+- rows (fields): ?fields=qcode,name,image_path,current_stock
+
+사용법:
+    python benchmark_product_serialization.py --rows 10000
+    python benchmark_product_serialization.py --rows 50000 --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.product import Product, to_image_url
+import app.models.inventory  # noqa: F401  (관계 매핑 등록)
+import app.models.embedding  # noqa: F401
+from app.services.product_fields import field_columns, parse_fields, rows_to_dicts
+
+
+def make_rows(count: int) -> list:
+    """
+    합성 제품 행 (Windows 절대 경로 이미지, 카탈로그/재고 정보 포함)
+    """
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        image_path = f"C:\\Users\\posco\\project\\product_list_picture\\bolt_{i}\\front.jpg"
+        rows.append({
+            "qcode": f"Q-2601-{i:06d}", "name": f"육각 볼트 M{5 + i % 20} x {20 + i % 50}mm",
+            "category": "체결류", "description": "아연도금 육각 볼트", "image_path": image_path,
+            "image_url": to_image_url(image_path),
+            "diameter": f"M{5 + i % 20}", "length": f"{20 + i % 50}mm", "material": "SUS304",
+            "specs": "KS B 1002", "n2b_product_code": f"N2B{i:06d}", "sourcing_group": "기계부품",
+            "leaf_class": "볼트", "standard_name": "육각볼트", "model_name": f"HB-{i}",
+            "manufacturer": "대한정밀", "is_standardized": True, "is_public": True,
+            "attributes": {"강도": "8.8", "표면처리": "아연도금"},
+            "purchase_count": i % 30, "average_rating": 4.5, "last_price": 120.0,
+            "last_order_date": now, "current_stock": i % 100, "min_stock": 10, "max_stock": 100,
+            "reorder_point": 20, "stock_unit": "개", "low_stock_alert": True,
+            "created_at": now, "updated_at": now,
+        })
+    return rows
+
+
+def measure(run, repeat: int):
+    run()  # 워밍업
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = run()
+    elapsed = (time.perf_counter() - start) / repeat
+    return len(payload), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product list serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000, help="제품 수")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수")
+    args = parser.parse_args()
+
+    try:
+        import orjson
+    except ImportError:
+        print("[ERROR] orjson is not installed. Run: pip install orjson")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Product.__table__), make_rows(args.rows))
+        db = sessionmaker(bind=engine)()
+
+        def as_json(body):
+            return json.dumps(jsonable_encoder(body), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        def orm_path():
+            db.expunge_all()
+            return as_json({"products": [p.to_dict() for p in db.query(Product).all()]})
+
+        def rows_path(field_names=None):
+            rows = db.query(*field_columns(field_names)).all()
+            return orjson.dumps({"products": rows_to_dicts(rows, field_names)})
+
+        lean_fields = parse_fields("qcode,name,image_path,current_stock")
+        results = [
+            ("ORM + to_dict + json", measure(orm_path, args.repeat)),
+            ("rows + orjson", measure(rows_path, args.repeat)),
+            ("rows + orjson (4 fields)", measure(lambda: rows_path(lean_fields), args.repeat)),
+        ]
+        db.close()
+        engine.dispose()
+
+    print("=" * 70)
+    print("  Product List Serialization Benchmark")
+    print("=" * 70)
+    print(f"    Rows: {args.rows}, repeat: {args.repeat}")
+    print()
+    base_time = results[0][1][1]
+    print(f"    {'path':<26} {'bytes':>10} {'ms':>8} {'rows/s':>10} {'speedup':>8}")
+    for name, (size, elapsed) in results:
+        print(f"    {name:<26} {size:>10} {elapsed * 1000:>8.1f} {args.rows / elapsed:>10.0f} {base_time / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+유사도 인덱스 recall / latency 벤치마크
+exact 검색 결과를 정답으로 IVF 인덱스의 nprobe별 recall@k와 쿼리 지연 시간 측정
+
+사용법:
+    python benchmark_similarity_index.py --size 200000 --dim 512 --queries 200
+    python benchmark_similarity_index.py --nlist 2048 --nprobe 1 4 8 16 32 64
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 벤치마크에서는 크기와 무관하게 IVF 학습
+os.environ.setdefault("IVF_MIN_TRAIN", "1")
+
+from app.services.similarity_index import (
+    SimilarityIndex,
+    IVFSimilarityIndex,
+    normalize_rows
+)
+
+
+def make_vectors(centers: np.ndarray, count: int, noise: float, seed: int):
+    """
+    제품군 중심 주변에 흩어진 합성 임베딩 생성 (실제 카탈로그처럼 유사 제품군 형성)
+    """
+    rng = np.random.default_rng(seed)
+    dim = centers.shape[1]
+    labels = rng.integers(0, len(centers), size=count)
+    noise_vectors = rng.normal(size=(count, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(centers[labels] + noise * noise_vectors)
+
+
+def fill_index(index: SimilarityIndex, vectors: np.ndarray):
+    index.matrix = vectors
+    index.qcodes = np.array([f"Q{i}" for i in range(len(vectors))], dtype=object)
+    index._build_groups()
+    return index
+
+
+def time_queries(index, queries, top_k, **kwargs):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append([qcode for qcode, _ in index.search(query, top_k, **kwargs)])
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similarity index recall vs latency benchmark")
+    parser.add_argument("--size", type=int, default=100000, help="카탈로그 임베딩 수")
+    parser.add_argument("--dim", type=int, default=512, help="임베딩 차원")
+    parser.add_argument("--clusters", type=int, default=500, help="합성 데이터 제품군 수")
+    parser.add_argument("--noise", type=float, default=1.0, help="제품군 내 분산 (클수록 어려움)")
+    parser.add_argument("--queries", type=int, default=100, help="쿼리 수")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF 클러스터 수 (0 = 4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Similarity Index Benchmark")
+    print("=" * 60)
+    print(f"    Catalog: {args.size} x {args.dim}, queries: {args.queries}, top-k: {args.top_k}")
+
+    centers = normalize_rows(np.random.default_rng(0).normal(size=(args.clusters, args.dim)))
+    vectors = make_vectors(centers, args.size, args.noise, seed=1)
+    queries = make_vectors(centers, args.queries, args.noise, seed=2)
+
+    exact = fill_index(SimilarityIndex("benchmark"), vectors)
+    truth, exact_ms = time_queries(exact, queries, args.top_k)
+
+    ivf = fill_index(IVFSimilarityIndex("benchmark", nlist=args.nlist), vectors)
+    start = time.perf_counter()
+    ivf.train()
+    train_s = time.perf_counter() - start
+    print(f"    IVF trained: nlist={len(ivf.centroids)} in {train_s:.1f}s")
+    print()
+
+    print(f"    {'mode':<14}{'recall@' + str(args.top_k):>12}{'ms/query':>12}{'speedup':>10}")
+    print(f"    {'exact':<14}{1.0:>12.3f}{exact_ms:>12.2f}{1.0:>10.1f}")
+
+    for nprobe in args.nprobe:
+        if nprobe > len(ivf.centroids):
+            break
+        results, ivf_ms = time_queries(ivf, queries, args.top_k, nprobe=nprobe)
+        recall = np.mean([
+            len(set(found) & set(expected)) / len(expected)
+            for found, expected in zip(results, truth)
+        ])
+        print(f"    {'ivf/' + str(nprobe):<14}{recall:>12.3f}{ivf_ms:>12.2f}{exact_ms / ivf_ms:>10.1f}")
+
+    print()
+    print("[*] Tune IVF_NPROBE in .env to the smallest value with acceptable recall")
+
+
+if __name__ == "__main__":
+    main()
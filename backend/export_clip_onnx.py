@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+CLIP 이미지 인코더를 ONNX로 내보내기 (로컬 CPU 인코더용, CLIP_BACKEND=onnx)
+
+필요 패키지 (내보내기 시에만):
+    pip install torch transformers
+
+사용법:
+    python export_clip_onnx.py
+    python export_clip_onnx.py --model openai/clip-vit-base-patch16 --output models/clip_vision.onnx
+"""
+import os
+import argparse
+
+
+def export_clip_onnx(model_name: str, output_path: str):
+    """
+    CLIPVisionModelWithProjection을 동적 배치 ONNX 모델로 저장
+    입력: pixel_values (N, 3, 224, 224), 출력: image_embeds (N, D)
+    """
+    import torch
+    from transformers import CLIPVisionModelWithProjection
+
+    print(f"[*] Loading {model_name}...")
+    model = CLIPVisionModelWithProjection.from_pretrained(model_name)
+    model.eval()
+
+    class ImageEmbedder(torch.nn.Module):
+        def __init__(self, vision_model):
+            super().__init__()
+            self.vision_model = vision_model
+
+        def forward(self, pixel_values):
+            return self.vision_model(pixel_values=pixel_values).image_embeds
+
+    size = model.config.image_size
+    dummy = torch.zeros(1, 3, size, size, dtype=torch.float32)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    print(f"[*] Exporting to {output_path}...")
+    torch.onnx.export(
+        ImageEmbedder(model),
+        dummy,
+        output_path,
+        input_names=["pixel_values"],
+        output_names=["image_embeds"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+        opset_version=17
+    )
+
+    print(f"[OK] Exported CLIP image encoder ({size}x{size})")
+    print(f"    Set in .env: CLIP_BACKEND=onnx, CLIP_ONNX_MODEL_PATH={output_path}")
+    print("    Then rebuild catalog embeddings (new model = new embedding space)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export CLIP image encoder to ONNX")
+    parser.add_argument("--model", default="openai/clip-vit-base-patch16", help="Hugging Face CLIP 모델")
+    parser.add_argument("--output", default=os.path.join("models", "clip_vision.onnx"))
+    args = parser.parse_args()
+
+    export_clip_onnx(args.model, args.output)
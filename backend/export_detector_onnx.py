@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+YOLOv8 객체 감지 모델을 ONNX로 내보내기 (로컬 CPU 감지기용, DETECT_BACKEND=onnx)
+
+Roboflow에서 학습한 모델은 Versions > Export (YOLOv8 PyTorch) 또는
+Deploy > Download Weights로 best.pt를 받은 뒤 내보냅니다.
+
+필요 패키지 (내보내기 시에만):
+    pip install ultralytics
+
+사용법:
+    python export_detector_onnx.py --weights best.pt
+    python export_detector_onnx.py --weights best.pt --imgsz 640 --output models/yolov8_detector.onnx
+    python export_detector_onnx.py --weights best.pt --dynamic   # 여러 카메라 프레임 배치 추론용
+"""
+import os
+import shutil
+import argparse
+
+
+def export_detector_onnx(weights: str, output_path: str, imgsz: int, dynamic: bool = False):
+    """
+    YOLOv8 가중치를 ONNX로 저장 (클래스 이름은 모델 메타데이터 names에 포함)
+    입력: images (1, 3, imgsz, imgsz), 출력: (1, 4 + 클래스 수, 후보 수)
+    dynamic=True면 배치 축이 동적 (batch, 3, imgsz, imgsz)
+    """
+    from ultralytics import YOLO
+
+    print(f"[*] Loading {weights}...")
+    model = YOLO(weights)
+    print(f"    Classes: {model.names}")
+
+    print(f"[*] Exporting (imgsz={imgsz}, dynamic batch={dynamic})...")
+    exported = model.export(format="onnx", imgsz=imgsz, opset=17, simplify=True, dynamic=dynamic)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    shutil.move(exported, output_path)
+
+    print(f"[OK] Exported detector: {output_path}")
+    print(f"    Set in .env: DETECT_BACKEND=onnx, DETECT_ONNX_MODEL_PATH={output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export YOLOv8 detector to ONNX")
+    parser.add_argument("--weights", required=True, help="YOLOv8 가중치 파일 (.pt)")
+    parser.add_argument("--imgsz", type=int, default=640, help="입력 해상도")
+    parser.add_argument("--output", default=os.path.join("models", "yolov8_detector.onnx"))
+    parser.add_argument("--dynamic", action="store_true", help="동적 배치 축 (여러 프레임 배치 추론)")
+    args = parser.parse_args()
+
+    export_detector_onnx(args.weights, args.output, args.imgsz, args.dynamic)
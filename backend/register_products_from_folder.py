@@ -2,6 +2,7 @@
 """
 product_list_picture 폴더의 제품들을 DB에 자동 등록
 각 Q-CODE당 대표 이미지 1장씩 등록
+등록 시 폴더 내 모든 뷰 이미지의 CLIP 임베딩을 1회 생성하여 저장 (멀티뷰 검색용)
 """
 import os
 import sys
@@ -14,14 +15,32 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from app.database import Base
 from app.models.product import Product
+from app.services.embedding_store import list_view_images, sync_product_embeddings
 
 # 설정
 PRODUCT_LIST_DIR = "../product_list_picture"
 DATABASE_URL = "sqlite:///./qcode.db"
 
-def register_products():
+def store_embedding(db, product):
+    """
+    제품 뷰 이미지 임베딩 저장 (이미 저장된 이미지는 원격 호출 없음)
+    """
+    try:
+        embeddings = sync_product_embeddings(db, product)
+        if embeddings:
+            print(f"    [OK] {len(embeddings)} view embeddings stored (dim: {embeddings[0].dim})")
+        return bool(embeddings)
+    except Exception as e:
+        db.rollback()
+        print(f"    [WARN] Embedding failed: {e}")
+        return False
+
+def register_products(embed=True):
     """
     product_list_picture의 제품들을 DB에 등록
+
+    Args:
+        embed: True면 제품마다 임베딩을 바로 생성 (False면 reindex_catalog.py에서 일괄 처리)
     """
     # DB 파일이 존재하는지 확인하고 재생성
     db_file = "qcode.db"
@@ -62,18 +81,13 @@ def register_products():
         existing = db.query(Product).filter(Product.qcode == qcode).first()
         if existing:
             print(f"    [SKIP] Already exists in database")
+            if embed:
+                store_embedding(db, existing)
             skipped_count += 1
             continue
 
-        # 첫 번째 이미지 찾기 (origin 제외)
-        images = []
-        for img_file in sorted(qcode_dir.iterdir()):
-            if not img_file.is_file():
-                continue
-            if "origin" in img_file.name.lower():
-                continue
-            if img_file.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif']:
-                images.append(img_file)
+        # 뷰 이미지 목록 (origin 제외)
+        images = [Path(path) for path in list_view_images(str(qcode_dir))]
 
         if not images:
             print(f"    [ERROR] No valid images found")
@@ -117,6 +131,8 @@ def register_products():
         print(f"        Name: {name}")
         print(f"        Image: {image_path}")
         print(f"        Available images: {len(images)} files")
+        if embed:
+            store_embedding(db, new_product)
         print()
 
         registered_count += 1
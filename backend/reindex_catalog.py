@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+카탈로그 임베딩 재색인
+- product_list_picture 폴더의 신규 제품 등록 (register_products_from_folder.py)
+- 전체 제품 뷰 이미지를 동시 워커로 임베딩, 이미 저장된 이미지는 건너뜀
+- 중단(Ctrl+C) 후 다시 실행하면 남은 이미지만 이어서 처리
+
+사용법:
+    python reindex_catalog.py
+    python reindex_catalog.py --workers 16
+    python reindex_catalog.py --no-register --fresh
+"""
+import os
+import sys
+import argparse
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.database import init_db
+from app.services.reindex_service import REINDEX_WORKERS, run_reindex
+from register_products_from_folder import register_products
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild catalog CLIP embeddings")
+    parser.add_argument("--workers", type=int, default=REINDEX_WORKERS, help="동시 임베딩 워커 수")
+    parser.add_argument("--no-register", action="store_true", help="폴더 제품 등록 단계 생략")
+    parser.add_argument("--fresh", action="store_true", help="체크포인트 무시 (저장된 임베딩은 계속 재사용)")
+    parser.add_argument("--skip-failed", action="store_true", help="이전 실행에서 실패한 이미지 재시도 안 함")
+    args = parser.parse_args()
+
+    init_db()
+
+    if not args.no_register:
+        register_products(embed=False)
+
+    result = run_reindex(
+        workers=args.workers,
+        resume=not args.fresh,
+        retry_failed=not args.skip_failed
+    )
+
+    print()
+    print("=" * 60)
+    print(f"  Reindex {result['status']}")
+    print(f"    Images: {result.get('total_images', 0)} total, {result.get('skipped_images', 0)} already indexed")
+    print(f"    Embedded: {result.get('embedded_images', 0)}, failed: {result.get('failed_images', 0)}")
+    print(f"    Throughput: {result.get('images_per_second', 0)} images/sec")
+    print("=" * 60)
+
+    return 0 if result["status"] == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,9 +25,30 @@ ChartJS.register(
   Filler
 );
 
+// WebSocket 스트림 감지 (서버가 밀리면 오래된 프레임은 버리고 최신 프레임만 처리)
+const DETECT_STREAM_URL = 'ws://localhost:8000/api/ws/detect';
+const STREAM_FRAME_INTERVAL = 500; // 스트림 모드 프레임 전송 간격 (ms)
+const HTTP_SCAN_INTERVAL = 3000;   // WebSocket 연결 실패 시 HTTP 폴링 간격 (ms)
+const CAMERA_ID_KEY = 'qcode_camera_id';
+
+// 기기(브라우저)별 고정 카메라 ID (서버의 장면 비교/추적/재고 안정화 상태를 기기별로 분리)
+const getCameraId = () => {
+  let cameraId = localStorage.getItem(CAMERA_ID_KEY);
+  if (!cameraId) {
+    const random = window.crypto?.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    cameraId = `cam-${random}`;
+    localStorage.setItem(CAMERA_ID_KEY, cameraId);
+  }
+  return cameraId;
+};
+
 const LiveInventory = () => {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
+  const streamRef = useRef(null);           // 감지 WebSocket
+  const selectedProductsRef = useRef([]);   // interval 콜백에서 최신 선택 목록 참조
 
   // 상태 관리
   const [detectedProducts, setDetectedProducts] = useState([]);
@@ -112,6 +133,25 @@ const LiveInventory = () => {
     };
   }, [selectedDeviceId]);
 
+  // 선택 제품 변경 시 스트림에도 반영
+  useEffect(() => {
+    selectedProductsRef.current = selectedProducts;
+    const ws = streamRef.current;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ selected_qcodes: selectedProducts.join(',') }));
+    }
+  }, [selectedProducts]);
+
+  // 컴포넌트 언마운트 시 스트림 종료
+  useEffect(() => {
+    return () => {
+      if (streamRef.current) {
+        streamRef.current.onclose = null;
+        streamRef.current.close();
+      }
+    };
+  }, []);
+
   // 제품 목록 가져오기
   useEffect(() => {
     fetchAvailableProducts();
@@ -209,7 +249,8 @@ const LiveInventory = () => {
   // 사용 가능한 제품 목록 조회
   const fetchAvailableProducts = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/products');
+      // 선택 목록에는 Q-CODE/제품명만 필요
+      const response = await fetch('http://localhost:8000/api/products?fields=qcode,name');
       const data = await response.json();
       setAvailableProducts(data.products || []);
     } catch (error) {
@@ -220,7 +261,8 @@ const LiveInventory = () => {
   // 현재 재고 현황 조회
   const fetchCurrentInventory = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/inventory/current');
+      const fields = 'qcode,name,current_stock,stock_unit,min_stock,reorder_point,stock_status';
+      const response = await fetch(`http://localhost:8000/api/inventory/current?fields=${fields}`);
       const data = await response.json();
       setCurrentInventory(data.products || []);
     } catch (error) {
@@ -339,6 +381,65 @@ const LiveInventory = () => {
     setSelectedProducts([]);
   };
 
+  // 감지 결과 반영 (HTTP 응답 / WebSocket 메시지 공통)
+  const handleDetectionResult = (data) => {
+    const canvas = canvasRef.current;
+    const video = videoRef.current;
+    if (canvas && video && (canvas.width !== video.videoWidth || canvas.height !== video.videoHeight)) {
+      canvas.width = video.videoWidth;
+      canvas.height = video.videoHeight;
+    }
+
+    // 바운딩 박스 그리기 (새 결과로 업데이트)
+    if (canvas && data.raw_predictions && data.raw_predictions.length > 0) {
+      console.log('[LiveInventory] 바운딩 박스 그리기:', data.raw_predictions.length, '개');
+      const ctx = canvas.getContext('2d');
+      ctx.clearRect(0, 0, canvas.width, canvas.height); // 이전 박스 지우기
+      drawBoundingBoxes(canvas, data.raw_predictions); // 새 박스 그리기
+    } else {
+      // 감지된 것이 없으면 기존 박스 유지 (clearRect 하지 않음)
+      console.log('[LiveInventory] 감지 없음, 기존 박스 유지');
+    }
+
+    if (data.success && data.detected_products && data.detected_products.length > 0) {
+      console.log('[LiveInventory] 제품 감지됨:', data.detected_products.length, '개');
+      // 감지된 제품들을 감지 이력에 추가
+      const now = new Date();
+      const newDetections = data.detected_products.map(product => ({
+        ...product,
+        detectedAt: now,
+        count: product.detected_count || 0,
+        confidence: product.confidence || 0
+      }));
+
+      setDetectedProducts(prev => [...newDetections, ...prev].slice(0, 50)); // 최대 50개 유지
+
+      // 재고 현황 갱신
+      fetchCurrentInventory();
+      fetchAlerts();
+    } else {
+      console.log('[LiveInventory] 감지된 제품 없음 또는 실패:', data);
+    }
+  };
+
+  // 스트림으로 프레임 전송 (이전 프레임이 아직 전송 중이면 건너뜀)
+  const sendStreamFrame = () => {
+    const ws = streamRef.current;
+    const video = videoRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN || !video || !video.videoWidth) return;
+    if (ws.bufferedAmount > 0) return;
+
+    const tempCanvas = document.createElement('canvas');
+    tempCanvas.width = video.videoWidth;
+    tempCanvas.height = video.videoHeight;
+    tempCanvas.getContext('2d').drawImage(video, 0, 0, tempCanvas.width, tempCanvas.height);
+    tempCanvas.toBlob((blob) => {
+      if (blob && ws.readyState === WebSocket.OPEN) {
+        ws.send(blob);
+      }
+    }, 'image/jpeg', 0.8);
+  };
+
   // 프레임 캡처 및 Q-CODE 감지 (다중 제품 지원)
   const captureAndDetect = async () => {
     if (!videoRef.current || isProcessing) return;
@@ -376,11 +477,13 @@ const LiveInventory = () => {
         console.log('[LiveInventory] Blob 생성 완료, API 호출 중...');
         const formData = new FormData();
         formData.append('file', blob, 'frame.jpg');
+        formData.append('camera_id', getCameraId());
 
         // 선택된 제품이 있으면 추가
-        if (selectedProducts.length > 0) {
-          formData.append('selected_qcodes', selectedProducts.join(','));
-          console.log('[LiveInventory] 선택된 제품:', selectedProducts.join(','));
+        const selected = selectedProductsRef.current;
+        if (selected.length > 0) {
+          formData.append('selected_qcodes', selected.join(','));
+          console.log('[LiveInventory] 선택된 제품:', selected.join(','));
         } else {
           console.log('[LiveInventory] 전체 제품 감지 모드');
         }
@@ -397,37 +500,7 @@ const LiveInventory = () => {
 
           const data = await response.json();
           console.log('[LiveInventory] API 응답 데이터:', data);
-
-          // 바운딩 박스 그리기 (새 결과로 업데이트)
-          if (data.raw_predictions && data.raw_predictions.length > 0) {
-            console.log('[LiveInventory] 바운딩 박스 그리기:', data.raw_predictions.length, '개');
-            const ctx = canvas.getContext('2d');
-            ctx.clearRect(0, 0, canvas.width, canvas.height); // 이전 박스 지우기
-            drawBoundingBoxes(canvas, data.raw_predictions); // 새 박스 그리기
-          } else {
-            // 감지된 것이 없으면 기존 박스 유지 (clearRect 하지 않음)
-            console.log('[LiveInventory] 감지 없음, 기존 박스 유지');
-          }
-
-          if (data.success && data.detected_products && data.detected_products.length > 0) {
-            console.log('[LiveInventory] 제품 감지됨:', data.detected_products.length, '개');
-            // 감지된 제품들을 감지 이력에 추가
-            const now = new Date();
-            const newDetections = data.detected_products.map(product => ({
-              ...product,
-              detectedAt: now,
-              count: product.detected_count || 0,
-              confidence: product.confidence || 0
-            }));
-
-            setDetectedProducts(prev => [...newDetections, ...prev].slice(0, 50)); // 최대 50개 유지
-
-            // 재고 현황 갱신
-            fetchCurrentInventory();
-            fetchAlerts();
-          } else {
-            console.log('[LiveInventory] 감지된 제품 없음 또는 실패:', data);
-          }
+          handleDetectionResult(data);
         } catch (error) {
           console.error('[LiveInventory] Q-CODE 감지 API 호출 실패:', error);
         } finally {
@@ -440,23 +513,59 @@ const LiveInventory = () => {
     }
   };
 
-  // 스캔 시작
+  // HTTP 폴링 스캔 (WebSocket 사용 불가 시)
+  const startHttpScanning = () => {
+    // 3초마다 프레임 캡처 및 감지
+    const interval = setInterval(() => {
+      captureAndDetect();
+    }, HTTP_SCAN_INTERVAL);
+
+    setScanInterval(interval);
+  };
+
+  // 스캔 시작 (WebSocket 스트림 우선)
   const startScanning = () => {
     if (isScanning) return;
 
     setIsScanning(true);
     setDetectedProducts([]);
 
-    // 3초마다 프레임 캡처 및 감지 (Gemini 응답 시간 고려)
-    const interval = setInterval(() => {
-      captureAndDetect();
-    }, 3000);
+    const selected = selectedProductsRef.current.join(',');
+    const params = new URLSearchParams({ selected_qcodes: selected, camera_id: getCameraId() });
+    const ws = new WebSocket(`${DETECT_STREAM_URL}?${params.toString()}`);
+    ws.binaryType = 'arraybuffer';
+    streamRef.current = ws;
 
-    setScanInterval(interval);
+    ws.onopen = () => {
+      console.log('[LiveInventory] 감지 스트림 연결됨');
+      setScanInterval(setInterval(sendStreamFrame, STREAM_FRAME_INTERVAL));
+    };
+
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      console.log('[LiveInventory] 스트림 결과:', data.frame_seq, `(dropped ${data.dropped_frames}, ${data.latency_ms}ms)`);
+      handleDetectionResult(data);
+    };
+
+    ws.onclose = () => {
+      // 연결 실패/끊김 시 HTTP 폴링으로 전환
+      console.warn('[LiveInventory] 감지 스트림 종료, HTTP 폴링으로 전환');
+      streamRef.current = null;
+      setScanInterval(prev => {
+        if (prev) clearInterval(prev);
+        return null;
+      });
+      startHttpScanning();
+    };
   };
 
   // 스캔 중지
   const stopScanning = () => {
+    if (streamRef.current) {
+      streamRef.current.onclose = null;
+      streamRef.current.close();
+      streamRef.current = null;
+    }
     if (scanInterval) {
       clearInterval(scanInterval);
       setScanInterval(null);
@@ -25,7 +25,11 @@ const ProductRegister = () => {
 
     try {
       // GET /api/products 검색 API 활용
-      const params = new URLSearchParams({ search: searchText });
+      // 검색 결과 카드에 표시하는 필드만 요청
+      const params = new URLSearchParams({
+        search: searchText,
+        fields: 'id,qcode,name,description,image_path,category,manufacturer,material,diameter,length,purchase_count,average_rating'
+      });
       const response = await fetch(`http://localhost:8000/api/products?${params.toString()}`);
       const data = await response.json();
 